@@ -1,19 +1,2643 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import json
+import csv
+import time
+import bisect
 import datetime
 import hashlib
+import hmac
+import math
 import random
 import string
 import os
+import sys
+import array
+import base64
+import threading
+import collections
+import copy
+import secrets
+import html
+import zlib
+import concurrent.futures
+import http.server
+import http.client
+import urllib.parse
 
 # Password Generator Function
 def generate_password():
     characters = string.ascii_letters + string.digits + "@#%&"
     return ''.join(random.choice(characters) for _ in range(12))
 
-class SchoolSystem(tk.Tk):
+# ===================== DATA STORE =====================
+# The data is split into sections so startup only reads what login needs:
+#   school_data.json          -> users (the credential index), next_student_id and the data version
+#   school_data.results.json  -> results in the compact column format, read the first time a screen needs them
+#   school_data.logs.jsonl    -> login logs, one JSON object per line, append only
+#   school_data.journal.jsonl -> one line per save with the records it changed
+#   school_data.seq           -> the next free student number, shared by all copies
+#   school_data.lock          -> held while a copy of the program writes
+# An old single-file school_data.json is split into this layout the first time it is opened.
+#
+# Several copies of the program may share the same files (e.g. on a network drive). Every save
+# takes the lock, first replays the journal lines written by the other copies since this copy's
+# version, then writes and appends its own changed records. Copies that are only reading pick up
+# the journal in sync(), so they reload just the changed records instead of the whole file.
+DATA_LAYOUT = 2
+JOURNAL_KEEP = 2000  # journal lines kept when it is compacted
+
+def write_json_atomic(path, payload, indent=4):
+    # Write to a temporary file first so a crash never leaves a half written data file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(payload, file, indent=indent)
+        size = file.tell()
+    os.replace(tmp_path, path)
+    return size
+
+class FileLock:
+    # Exclusive lock shared by every process that opens the same data file
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a+")
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    self.file.seek(0)
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        else:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == "nt":
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+class SchoolData(dict):
+    LAZY_SECTIONS = ("results", "login_logs")
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.section_paths = {"results": base + ".results.json", "login_logs": base + ".logs.jsonl"}
+        self.journal_path = base + ".journal.jsonl"
+        self.seq_path = base + ".seq"
+        self.lock = FileLock(base + ".lock")
+        self.version = 0
+        self.journal_position = (None, 0)  # (inode, byte offset) read so far
+        self.dirty_users = set()
+        self.dirty_results = set()  # (student_id, term) or (student_id, None) for the whole student
+        self.last_save = {"payload_bytes": 0, "records": 0}
+
+    @classmethod
+    def create(cls, path):
+        data = cls(path)
+        with data.lock:
+            if os.path.exists(path):
+                # Another copy created it first
+                return cls.open(path)
+            data.update({"users": {}, "next_student_id": 1000001, "results": {}, "login_logs": []})
+            data._write(rewrite_logs=True)
+            data._mark_journal_read()
+        return data
+
+    @classmethod
+    def open(cls, path):
+        data = cls(path)
+        with data.lock:
+            with open(path, "r") as file:
+                main = json.load(file)
+            legacy = main.get("layout") != DATA_LAYOUT
+            main.pop("layout", None)
+            data.version = main.pop("version", 0)
+            data.update(main)
+            if legacy:
+                # Old single-file layout: everything was just read anyway, split it once
+                data.setdefault("results", {})
+                data.setdefault("login_logs", [])
+                data._write(rewrite_logs=True)
+            data._mark_journal_read()
+        return data
+
+    def __getitem__(self, key):
+        if key in self.LAZY_SECTIONS and not dict.__contains__(self, key):
+            self._load_section(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return key in self.LAZY_SECTIONS or dict.__contains__(self, key)
+
+    def is_loaded(self, section):
+        return dict.__contains__(self, section)
+
+    def _load_section(self, section):
+        path = self.section_paths[section]
+        if section == "results":
+            value = {}
+            if os.path.exists(path):
+                with open(path, "r") as file:
+                    value = unpack_results(json.load(file))
+        else:
+            value = []
+            if os.path.exists(path):
+                with open(path, "r") as file:
+                    value = [json.loads(line) for line in file if line.strip()]
+        dict.__setitem__(self, section, value)
+
+    # ---------- change tracking ----------
+    def touch_user(self, uid):
+        self.dirty_users.add(uid)
+
+    def touch_result(self, student_id, term=None):
+        self.dirty_results.add((student_id, term))
+
+    def reserve_student_ids(self, count=1):
+        # Student numbers are handed out under the lock so two copies never give out the same number
+        with self.lock:
+            first = self["next_student_id"]
+            if os.path.exists(self.seq_path):
+                with open(self.seq_path, "r") as file:
+                    first = max(first, int(file.read().strip() or 0))
+            with open(self.seq_path, "w") as file:
+                file.write(str(first + count))
+            self["next_student_id"] = first + count
+        return first
+
+    # ---------- journal ----------
+    def _mark_journal_read(self):
+        try:
+            stat = os.stat(self.journal_path)
+            self.journal_position = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            self.journal_position = (None, 0)
+
+    def _read_journal(self):
+        # Returns the complete journal lines this copy has not read yet
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return []
+        inode, offset = self.journal_position
+        if inode == stat.st_ino and offset == stat.st_size:
+            return []
+        if inode != stat.st_ino or stat.st_size < offset:
+            offset = 0  # compacted by another copy, start again from the top
+        with open(self.journal_path, "rb") as file:
+            file.seek(offset)
+            chunk = file.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self.journal_position = (stat.st_ino, offset + len(complete))
+        return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+    def _append_journal(self, entry):
+        entry["version"] = self.version
+        with open(self.journal_path, "ab") as file:
+            file.write(json.dumps(entry).encode() + b"\n")
+        self._mark_journal_read()
+
+    def _reload(self):
+        # Too far behind the journal: read the files again but keep this copy's unsaved records
+        pending_users = {uid: self["users"].get(uid) for uid in self.dirty_users}
+        pending_results = {key: self._result_value(key) for key in self.dirty_results} if self.is_loaded("results") else {}
+        with open(self.path, "r") as file:
+            main = json.load(file)
+        main.pop("layout", None)
+        self.version = main.pop("version", 0)
+        for key, value in main.items():
+            dict.__setitem__(self, key, value)
+        if self.is_loaded("results"):
+            self._load_section("results")
+        for uid, record in pending_users.items():
+            self._put_user(uid, record)
+        for key, value in pending_results.items():
+            self._put_result(key, value)
+        self._mark_journal_read()
+
+    def _result_value(self, key):
+        student_id, term = key
+        terms = self["results"].get(student_id)
+        if term is None or terms is None:
+            return terms
+        return terms.get(term)
+
+    def _put_user(self, uid, record):
+        if record is None:
+            self["users"].pop(uid, None)
+        else:
+            self["users"][uid] = record
+
+    def _put_result(self, key, value):
+        results = self["results"]
+        student_id, term = key
+        if term is None:
+            if value is None:
+                results.pop(student_id, None)
+            else:
+                results[student_id] = value
+        elif value is None:
+            results.get(student_id, {}).pop(term, None)
+        else:
+            results.setdefault(student_id, {})[term] = value
+
+    def sync(self, locked=False):
+        # Applies the records other copies saved since this copy last looked. Records this copy
+        # changed but has not saved yet are kept. Returns the changed keys, or None after a full reload.
+        entries = self._read_journal()
+        if not entries:
+            return {"users": set(), "results": set()}
+        if entries[0]["version"] > self.version + 1:
+            if locked:
+                self._reload()
+            else:
+                with self.lock:
+                    self._reload()
+            return None
+
+        changed = {"users": set(), "results": set()}
+        for entry in entries:
+            if entry["version"] <= self.version:
+                continue
+            self.version = entry["version"]
+            if "next_student_id" in entry:
+                dict.__setitem__(self, "next_student_id", max(self["next_student_id"], entry["next_student_id"]))
+            for uid, record in entry.get("users", []):
+                if uid not in self.dirty_users:
+                    self._put_user(uid, record)
+                    changed["users"].add(uid)
+            # Results that are not loaded yet will be read from the file, which already has these
+            if self.is_loaded("results"):
+                for student_id, term, value in entry.get("results", []):
+                    key = (student_id, term)
+                    if key not in self.dirty_results and (student_id, None) not in self.dirty_results:
+                        self._put_result(key, value)
+                        changed["results"].add(key)
+        return changed
+
+    # ---------- saving ----------
+    def append_log(self, entry):
+        # Appending one line is O(1); the log file is never rewritten
+        with open(self.section_paths["login_logs"], "a") as file:
+            file.write(json.dumps(entry) + "\n")
+        if self.is_loaded("login_logs"):
+            dict.__getitem__(self, "login_logs").append(entry)
+
+    def _write(self, rewrite_logs=False, version=None):
+        # Returns the number of bytes written
+        written = 0
+        main = {"layout": DATA_LAYOUT, "version": self.version if version is None else version}
+        main.update({k: v for k, v in dict.items(self) if k not in self.LAZY_SECTIONS})
+        # Results that were never loaded have not changed, so their file is left alone
+        if self.is_loaded("results"):
+            written += write_json_atomic(self.section_paths["results"], pack_results(dict.__getitem__(self, "results")), indent=None)
+        if rewrite_logs:
+            tmp_path = self.section_paths["login_logs"] + ".tmp"
+            with open(tmp_path, "w") as file:
+                for entry in dict.__getitem__(self, "login_logs"):
+                    file.write(json.dumps(entry) + "\n")
+                written += file.tell()
+            os.replace(tmp_path, self.section_paths["login_logs"])
+        return written + write_json_atomic(self.path, main)
+
+    def save(self, rewrite_logs=False):
+        # Returns what sync() returned for the records other copies changed in the meantime
+        with self.lock:
+            changed = self.sync(locked=True)
+            entry = {
+                "pid": os.getpid(),
+                "next_student_id": self["next_student_id"],
+                "users": [[uid, self["users"].get(uid)] for uid in self.dirty_users],
+                "results": [[sid, term, self._result_value((sid, term))] for sid, term in self.dirty_results]
+            }
+            # The version only moves once the files are written, so a failed save can be retried
+            payload_bytes = self._write(rewrite_logs, self.version + 1)
+            self.version += 1
+            self.last_save = {"payload_bytes": payload_bytes,
+                              "records": len(self.dirty_users) + len(self.dirty_results)}
+            self._append_journal(entry)
+            self.dirty_users.clear()
+            self.dirty_results.clear()
+            self._compact_journal()
+        return changed
+
+    def _compact_journal(self):
+        if self.journal_position[1] < JOURNAL_KEEP * 2 * 512:
+            return
+        with open(self.journal_path, "rb") as file:
+            lines = file.readlines()
+        if len(lines) <= JOURNAL_KEEP * 2:
+            return
+        tmp_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.writelines(lines[-JOURNAL_KEEP:])
+        os.replace(tmp_path, self.journal_path)
+        self._mark_journal_read()
+
+# ===================== BACKUPS =====================
+# Incremental backups in <name>.backups/ next to the data file. Every user record, every
+# student's results and every chunk of new login log lines is stored once, zlib-compressed,
+# under the SHA-256 of its JSON, so unchanged or repeated records are never stored twice.
+# The objects new in a backup go into one pack file, listed in objects.idx. Each backup
+# stores the list of records that changed since the previous backup, taken from the change
+# journal, so a backup costs what changed rather than the size of the school, and appends
+# one short line to backups.jsonl. A restore replays those change lists up to the chosen backup.
+BACKUP_INTERVAL_SECONDS = 900
+BACKUP_LOG_CHUNK = 1 << 20
+
+class BackupStore:
+    def __init__(self, data_path):
+        self.folder = os.path.splitext(data_path)[0] + ".backups"
+        self.packs_path = os.path.join(self.folder, "packs")
+        self.objects_index_path = os.path.join(self.folder, "objects.idx")
+        self.index_path = os.path.join(self.folder, "backups.jsonl")
+        self.lock = FileLock(os.path.join(self.folder, ".lock"))
+        self.objects = {}  # digest -> (pack name, offset, length)
+        self.objects_read = 0  # bytes of objects.idx already in self.objects
+        self.pack = None  # (name, file) of the pack being written
+
+    def _read_objects_index(self):
+        # Only the lines appended since the last call are read
+        if not os.path.exists(self.objects_index_path):
+            return
+        with open(self.objects_index_path, "r") as file:
+            file.seek(self.objects_read)
+            for line in file:
+                if line.endswith("\n"):
+                    digest, pack, offset, length = line.split()
+                    self.objects[digest] = (pack, int(offset), int(length))
+            self.objects_read = file.tell()
+
+    def _put(self, value, new_objects):
+        # Returns (digest, bytes added to the store); new objects are collected in new_objects
+        raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest in self.objects or digest in new_objects:
+            return digest, 0
+        name, file = self.pack
+        packed = zlib.compress(raw, 6)
+        new_objects[digest] = (name, file.tell(), len(packed))
+        file.write(packed)
+        return digest, len(packed)
+
+    def _get(self, digest, packs):
+        name, offset, length = self.objects[digest]
+        if name not in packs:
+            packs[name] = open(os.path.join(self.packs_path, name), "rb")
+        file = packs[name]
+        file.seek(offset)
+        return json.loads(zlib.decompress(file.read(length)))
+
+    def list(self):
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, "r") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def _replay(self, entries, packs):
+        state = {"users": {}, "results": {}, "logs": [], "next_student_id": 1000001}
+        for entry in entries:
+            changes = self._get(entry["changes"], packs)
+            for section in ("users", "results"):
+                for key, digest in changes[section].items():
+                    if digest is None:
+                        state[section].pop(key, None)
+                    else:
+                        state[section][key] = digest
+            if entry.get("logs_reset"):
+                state["logs"] = []
+            state["logs"].extend(changes["logs"])
+            state["next_student_id"] = entry["next_student_id"]
+        return state
+
+    def _changed_keys(self, data, last):
+        # Users and students saved since the last backup according to the journal, or None
+        # when the journal no longer reaches back that far (or there is no backup yet)
+        if last is None:
+            return None
+        entries = []
+        if os.path.exists(data.journal_path):
+            with open(data.journal_path, "r") as file:
+                entries = [json.loads(line) for line in file if line.strip()]
+        newer = [e for e in entries if last["version"] < e["version"] <= data.version]
+        if data.version < last["version"] or data.version > last["version"] and (not newer or newer[0]["version"] != last["version"] + 1):
+            return None
+        users = {uid for e in newer for uid, _ in e.get("users", [])}
+        students = {student_id for e in newer for student_id, _, _ in e.get("results", [])}
+        return users, students
+
+    def backup(self, data):
+        # data must be synced and held still by the caller
+        started = time.perf_counter()
+        os.makedirs(self.packs_path, exist_ok=True)
+        with self.lock:
+            self._read_objects_index()
+            backups = self.list()
+            last = backups[-1] if backups else None
+            entry = {"id": (last["id"] + 1) if last else 1, "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                     "version": data.version, "next_student_id": data["next_student_id"]}
+            changes = {"users": {}, "results": {}, "logs": []}
+            pack_name = f"{entry['id']}.pack"
+            with open(os.path.join(self.packs_path, pack_name), "wb") as pack:
+                self.pack = (pack_name, pack)
+                new_objects = {}
+                try:
+                    self._collect(data, entry, changes, last, backups, new_objects)
+                    entry["changes"] = self._put(changes, new_objects)[0]
+                finally:
+                    self.pack = None
+            entry.update({section: len(changes[section]) for section in ("users", "results", "logs")})
+            entry["stored_bytes"] = sum(length for _, _, length in new_objects.values())
+            entry["seconds"] = round(time.perf_counter() - started, 3)
+            skipped = last and not (changes["users"] or changes["results"] or changes["logs"] or entry.get("logs_reset")
+                                    or entry["next_student_id"] != last["next_student_id"])
+            if skipped or not new_objects:
+                os.remove(os.path.join(self.packs_path, pack_name))
+            if skipped:
+                return dict(entry, skipped=True)
+            # The pack is complete before the index names it, and the index before the backup line
+            with open(self.objects_index_path, "a") as file:
+                file.writelines(f"{digest} {name} {offset} {length}\n" for digest, (name, offset, length) in new_objects.items())
+            with open(self.index_path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+        return entry
+
+    def _collect(self, data, entry, changes, last, backups, new_objects):
+        changed = self._changed_keys(data, last)
+        entry["full"] = changed is None
+        previous = None
+        if changed is None:
+            packs = {}
+            try:
+                previous = self._replay(backups, packs)
+            finally:
+                for file in packs.values():
+                    file.close()
+        sections = (("users", data["users"]), ("results", data["results"]))
+        for i, (section, records) in enumerate(sections):
+            keys = set(records) | set(previous[section]) if changed is None else changed[i]
+            for key in keys:
+                value = records.get(key)
+                digest = None
+                if value is not None:
+                    digest, _ = self._put(value, new_objects)
+                if previous is None or previous[section].get(key) != digest:
+                    changes[section][key] = digest
+
+        # Login history only grows, so only the lines added since the last backup are stored
+        offset = last["logs_offset"] if last else 0
+        log_path = data.section_paths["login_logs"]
+        size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        if size < offset:
+            entry["logs_reset"], offset = True, 0
+        if size > offset:
+            with open(log_path, "rb") as file:
+                file.seek(offset)
+                while True:
+                    chunk = file.read(BACKUP_LOG_CHUNK)
+                    if b"\n" not in chunk:
+                        break
+                    chunk = chunk[:chunk.rfind(b"\n") + 1]
+                    offset += len(chunk)
+                    file.seek(offset)
+                    changes["logs"].append(self._put(chunk.decode("utf-8"), new_objects)[0])
+        entry["logs_offset"] = offset
+
+    def find(self, point):
+        # point is a backup id or a "YYYY-MM-DD HH:MM:SS" time (the last backup at or before it)
+        backups = self.list()
+        if str(point).isdigit():
+            chosen = [b for b in backups if b["id"] <= int(point)]
+        else:
+            chosen = [b for b in backups if b["time"] <= str(point)]
+        if not chosen:
+            raise ValueError(f"No backup at or before {point}")
+        return chosen
+
+    def restore(self, point, new_path):
+        # Rebuilds the data as it was at the chosen backup into a new data file
+        if os.path.exists(new_path):
+            raise ValueError(f"{new_path} already exists, restore into a new file")
+        self._read_objects_index()
+        packs = {}
+        try:
+            state = self._replay(self.find(point), packs)
+            logs = []
+            for digest in state["logs"]:
+                logs.extend(json.loads(line) for line in self._get(digest, packs).splitlines() if line.strip())
+            restored = {
+                "users": {uid: self._get(digest, packs) for uid, digest in state["users"].items()},
+                "results": {sid: self._get(digest, packs) for sid, digest in state["results"].items()},
+                "login_logs": logs,
+                "next_student_id": state["next_student_id"]
+            }
+        finally:
+            for file in packs.values():
+                file.close()
+        store = SchoolData.create(new_path)
+        store.update(restored)
+        store.save(rewrite_logs=True)
+        return {"users": len(state["users"]), "students_with_results": len(state["results"]), "login_logs": len(logs)}
+
+# ===================== COMPACT RESULTS FORMAT =====================
+# school_data.results.json is stored column-wise instead of one nested dict per student per term:
+#   "classes": subject names interned once per class
+#   "blocks":  one block per (class, term) with the student IDs, which subjects each row has
+#              (an index into that block's subject sets) and all marks as one packed array of
+#              little-endian int32 (total, obtained) pairs, base64 encoded
+# Overall totals and percentages are recomputed on load, remarks are kept only where not empty.
+# unpack_results() gives back exactly the dict shape the rest of the program (display_result) uses.
+RESULTS_FORMAT = "columnar-1"
+MAX_MARKS = 2**31 - 1  # marks must fit the int32 array; build_result refuses anything larger
+
+def _pack_ints(values, typecode):
+    packed = array.array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+def _unpack_ints(text, typecode):
+    packed = array.array(typecode)
+    packed.frombytes(base64.b64decode(text))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
+
+def pack_results(results):
+    classes = {}   # class -> [subject names]
+    subject_ids = {}  # class -> {subject: index}
+    blocks = {}    # (class, term) -> block being built
+    empty = []
+    for student_id, terms in results.items():
+        if not terms:
+            empty.append(student_id)
+        for term, result_data in terms.items():
+            cls = result_data["class"]
+            names = classes.setdefault(cls, [])
+            ids = subject_ids.setdefault(cls, {})
+            block = blocks.get((cls, term))
+            if block is None:
+                block = blocks[(cls, term)] = {"class": cls, "term": term, "students": [], "subject_sets": [],
+                                               "rows": [], "marks": [], "remarks": {}, "_sets": {}}
+            subject_set = []
+            for subject, marks in result_data["subjects"].items():
+                if subject not in ids:
+                    ids[subject] = len(names)
+                    names.append(subject)
+                subject_set.append(ids[subject])
+                block["marks"].extend((marks["total"], marks["obtained"]))
+            key = tuple(subject_set)
+            if key not in block["_sets"]:
+                block["_sets"][key] = len(block["subject_sets"])
+                block["subject_sets"].append(subject_set)
+            remarks = result_data["overall"].get("remarks", "")
+            if remarks:
+                block["remarks"][str(len(block["students"]))] = remarks
+            block["rows"].append(block["_sets"][key])
+            block["students"].append(student_id)
+
+    packed_blocks = []
+    for block in blocks.values():
+        del block["_sets"]
+        block["rows"] = _pack_ints(block["rows"], "H")
+        block["marks"] = _pack_ints(block["marks"], "i")
+        packed_blocks.append(block)
+    return {"format": RESULTS_FORMAT, "classes": classes, "blocks": packed_blocks, "empty": empty}
+
+def unpack_results(packed):
+    if packed.get("format") != RESULTS_FORMAT:
+        return packed  # plain dict-per-student file from an older version
+    results = {student_id: {} for student_id in packed.get("empty", [])}
+    for block in packed["blocks"]:
+        cls, term = block["class"], block["term"]
+        names = packed["classes"][cls]
+        subject_sets = [[names[i] for i in subject_set] for subject_set in block["subject_sets"]]
+        rows = _unpack_ints(block["rows"], "H").tolist()
+        marks = _unpack_ints(block["marks"], "i").tolist()
+        remarks = block.get("remarks", {})
+        position = 0
+        for row, student_id in enumerate(block["students"]):
+            subjects = {}
+            total_max = total_obtained = 0
+            for subject in subject_sets[rows[row]]:
+                total, obtained = marks[position], marks[position + 1]
+                position += 2
+                subjects[subject] = {"total": total, "obtained": obtained}
+                total_max += total
+                total_obtained += obtained
+            results.setdefault(student_id, {})[term] = {
+                "class": cls,
+                "subjects": subjects,
+                "overall": {
+                    "total": total_max,
+                    "obtained": total_obtained,
+                    "percentage": round((total_obtained / total_max) * 100, 2) if total_max > 0 else 0,
+                    "remarks": remarks.get(str(row), "")
+                }
+            }
+    return results
+
+def compare_results_formats(results, repeat=3):
+    # Size and load time of the old pretty-printed dict file against the columnar file
+    import tempfile
+    report = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name, payload, indent in (("dict_indent4", results, 4), ("columnar", pack_results(results), None)):
+            path = os.path.join(folder, name + ".json")
+            write_json_atomic(path, payload, indent=indent)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                with open(path, "r") as file:
+                    loaded = unpack_results(json.load(file))
+                timings.append(time.perf_counter() - started)
+            assert loaded == results
+            report[name] = {"bytes": os.path.getsize(path), "load_ms": round(min(timings) * 1000, 1)}
+    report["size_reduction"] = round(1 - report["columnar"]["bytes"] / report["dict_indent4"]["bytes"], 3)
+    report["load_speedup"] = round(report["dict_indent4"]["load_ms"] / report["columnar"]["load_ms"], 2)
+    return report
+
+# ===================== PASSWORDS =====================
+# Passwords are stored as salted, deliberately slow hashes:
+#   pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>   or   scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>
+# Records still holding the old unsalted SHA-256 hex digest are upgraded the next time that user logs in.
+# Use `python school_system.py --calibrate-password 250` to size the cost for a target login time.
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = 600000       # pbkdf2_sha256 cost
+PASSWORD_SCRYPT_COST = (2**14, 8, 1)  # scrypt n, r, p
+SESSION_TTL_SECONDS = 30 * 60
+SESSION_CACHE_SIZE = 10000         # most remembered logins / open sessions kept at once
+
+class PasswordHasher:
+    def __init__(self, scheme=PASSWORD_SCHEME, iterations=PASSWORD_ITERATIONS, scrypt_cost=PASSWORD_SCRYPT_COST):
+        if scheme not in ("pbkdf2_sha256", "scrypt"):
+            raise ValueError(f"Unknown password scheme: {scheme}")
+        self.scheme = scheme
+        self.iterations = iterations
+        self.scrypt_cost = tuple(scrypt_cost)
+
+    def _derive(self, scheme, params, salt, password):
+        if scheme == "scrypt":
+            n, r, p = params
+            return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * 1024 * 1024, dklen=32)
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        params = self.scrypt_cost if self.scheme == "scrypt" else (self.iterations,)
+        digest = self._derive(self.scheme, params, salt, password)
+        return "$".join([self.scheme] + [str(v) for v in params] + [salt.hex(), digest.hex()])
+
+    def _parse(self, stored):
+        parts = stored.split("$")
+        if parts[0] == "scrypt" and len(parts) == 6:
+            return "scrypt", tuple(int(v) for v in parts[1:4]), bytes.fromhex(parts[4]), bytes.fromhex(parts[5])
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            return "pbkdf2_sha256", (int(parts[1]),), bytes.fromhex(parts[2]), bytes.fromhex(parts[3])
+        return None
+
+    def verify(self, stored, password):
+        parsed = self._parse(stored)
+        if parsed is None:
+            # Legacy record: unsalted single round SHA-256
+            return hmac.compare_digest(stored, hashlib.sha256(password.encode()).hexdigest())
+        scheme, params, salt, digest = parsed
+        return hmac.compare_digest(self._derive(scheme, params, salt, password), digest)
+
+    def needs_rehash(self, stored):
+        parsed = self._parse(stored)
+        if parsed is None or parsed[0] != self.scheme:
+            return True
+        return parsed[1] != (self.scrypt_cost if self.scheme == "scrypt" else (self.iterations,))
+
+PASSWORD_HASHER = PasswordHasher()
+
+def hash_password(password):
+    return PASSWORD_HASHER.hash(password)
+
+def verify_password(stored, password):
+    return PASSWORD_HASHER.verify(stored, password)
+
+class SessionCache:
+    # Remembers credentials and sessions that already passed the slow hash, so a session that is
+    # authenticated does not pay the hashing cost again. Only keyed HMACs of passwords are kept,
+    # and an entry stops matching as soon as the stored hash changes.
+    # Both maps are kept in expiry order (every entry lives ttl from its last write), so expired
+    # entries are dropped from the front on each insert and the oldest go first past max_entries.
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_entries=SESSION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.secret = os.urandom(32)
+        self.lock = threading.Lock()
+        self.verified = collections.OrderedDict()  # HMAC(uid, password) -> (stored hash, expires)
+        self.sessions = collections.OrderedDict()  # token -> (uid, expires)
+
+    def _insert(self, entries, key, value):
+        # Called with the lock held; value[1] is the expiry
+        entries[key] = value
+        entries.move_to_end(key)
+        now = time.monotonic()
+        while entries and (len(entries) > self.max_entries or next(iter(entries.values()))[1] <= now):
+            entries.popitem(last=False)
+
+    def _key(self, uid, password):
+        return hmac.new(self.secret, f"{uid}\0{password}".encode(), hashlib.sha256).digest()
+
+    def check(self, uid, password, stored):
+        with self.lock:
+            entry = self.verified.get(self._key(uid, password))
+        return bool(entry) and entry[0] == stored and entry[1] > time.monotonic()
+
+    def remember(self, uid, password, stored):
+        with self.lock:
+            self._insert(self.verified, self._key(uid, password), (stored, time.monotonic() + self.ttl))
+
+    def open(self, uid):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self._insert(self.sessions, token, (uid, time.monotonic() + self.ttl))
+        return token
+
+    def user(self, token):
+        # Sliding expiry: every use of a live session extends it
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sessions.get(token)
+            if not entry or entry[1] <= now:
+                self.sessions.pop(token, None)
+                return None
+            self._insert(self.sessions, token, (entry[0], now + self.ttl))
+            return entry[0]
+
+    def close(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def forget_user(self, uid):
+        with self.lock:
+            for token in [t for t, (u, _) in self.sessions.items() if u == uid]:
+                del self.sessions[token]
+
+def calibrate_password_cost(target_ms=250, scheme="pbkdf2_sha256"):
+    # Times a probe hash and scales the cost so one login takes about target_ms on this machine
+    probe = PasswordHasher(scheme, iterations=50000, scrypt_cost=(2**12, 8, 1))
+    started = time.perf_counter()
+    probe.hash("calibration-password")
+    probe_ms = (time.perf_counter() - started) * 1000
+    if scheme == "scrypt":
+        # scrypt cost grows linearly with n, which must stay a power of two
+        n = 2 ** max(10, round(math.log2(2**12 * target_ms / probe_ms)))
+        hasher = PasswordHasher(scheme, scrypt_cost=(n, 8, 1))
+        cost = {"n": n, "r": 8, "p": 1}
+    else:
+        iterations = max(10000, int(50000 * target_ms / probe_ms) // 1000 * 1000)
+        hasher = PasswordHasher(scheme, iterations=iterations)
+        cost = {"iterations": iterations}
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        hasher.verify(hasher.hash("calibration-password"), "calibration-password")
+        timings.append((time.perf_counter() - started) * 1000 / 2)
+    return {"scheme": scheme, "target_ms": target_ms, "cost": cost, "measured_ms": round(min(timings), 1)}
+
+# ===================== RECORD RULES =====================
+# Shared by the dialogs and the bulk import so that both accept exactly the same data
+def terms_for_class(cls):
+    return ["1st term", "2nd term", "finalterm"] if int(cls) <= 8 else ["1st term", "Sendups", "Preboard", "finalterm"]
+
+def teacher_id_for(name):
+    return f"{name.replace(' ', '').lower()}-2026-01-Teacher"
+
+def student_id_for(name, number):
+    return f"{name.replace(' ', '').lower()}-{number}"
+
+# password_hash lets bulk callers hash many passwords in parallel after validation
+def new_teacher_record(name, doj, password, hint, password_hash=None):
+    if not name:
+        raise ValueError("Name is required")
+    if len(password) < 6:
+        raise ValueError("Password must be 6+ characters")
+    return {
+        "role": "teacher",
+        "name": name,
+        "doj": doj,
+        "password": hash_password(password) if password_hash is None else password_hash,
+        "hint": hint or "No hint",
+        "classes": {}
+    }
+
+def new_student_record(name, cls, doj, password, hint, password_hash=None):
+    if not name or not cls or not cls.isdigit() or int(cls) not in range(1,13):
+        raise ValueError("Valid name and class (1-12) required")
+    if len(password) < 6:
+        raise ValueError("Password too short")
+    return {
+        "role": "student",
+        "name": name,
+        "class": cls,
+        "doj": doj,
+        "password": hash_password(password) if password_hash is None else password_hash,
+        "hint": hint or "No hint"
+    }
+
+# marks maps subject -> (total, obtained) as typed by the user
+def build_result(cls, marks, remarks=""):
+    result_data = {"class": cls, "subjects": {}, "overall": {}}
+    total_max = total_obtained = 0
+
+    for subject, (total, obtained) in marks.items():
+        try:
+            total = int(total)
+            obtained = int(obtained)
+        except (TypeError, ValueError):
+            raise ValueError("Please enter valid numbers for marks")
+        if obtained < 0:
+            raise ValueError(f"Obtained marks cannot be negative in {subject}")
+        if obtained > total:
+            raise ValueError(f"Obtained marks cannot exceed total in {subject}")
+        if total > MAX_MARKS:
+            raise ValueError(f"Total marks in {subject} cannot be more than {MAX_MARKS}")
+        result_data["subjects"][subject] = {"total": total, "obtained": obtained}
+        total_max += total
+        total_obtained += obtained
+
+    percentage = round((total_obtained / total_max) * 100, 2) if total_max > 0 else 0
+    result_data["overall"] = {
+        "total": total_max,
+        "obtained": total_obtained,
+        "percentage": percentage,
+        "remarks": remarks
+    }
+    return result_data
+
+# ===================== RESULT ANALYTICS =====================
+# Per (class, term, subject) aggregates kept up to date as results are saved, so class
+# statistics, toppers and positions never need a scan of all results.
+OVERALL = "__overall__"  # pseudo subject holding the overall percentage
+HISTOGRAM_BUCKETS = 10  # 0-9%, 10-19%, ..., 90-100%
+_HIGHEST_ID = "\U0010ffff"
+
+def subject_percentage(marks):
+    return round(marks["obtained"] / marks["total"] * 100, 2) if marks["total"] > 0 else 0
+
+class ScoreAggregate:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.ranked = []  # sorted (score, student_id) pairs
+
+    def _bucket(self, score):
+        return min(HISTOGRAM_BUCKETS - 1, max(0, int(score // (100 / HISTOGRAM_BUCKETS))))
+
+    def add(self, student_id, score):
+        bisect.insort(self.ranked, (score, student_id))
+        self.count += 1
+        self.sum += score
+        self.histogram[self._bucket(score)] += 1
+
+    def remove(self, student_id, score):
+        idx = bisect.bisect_left(self.ranked, (score, student_id))
+        if idx < len(self.ranked) and self.ranked[idx] == (score, student_id):
+            del self.ranked[idx]
+            self.count -= 1
+            self.sum -= score
+            self.histogram[self._bucket(score)] -= 1
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 2),
+            "min": self.ranked[0][0] if self.ranked else None,
+            "max": self.ranked[-1][0] if self.ranked else None,
+            "mean": round(self.sum / self.count, 2) if self.count else None,
+            "histogram": list(self.histogram)
+        }
+
+    def toppers(self, k):
+        return [(student_id, score) for score, student_id in reversed(self.ranked[-k:])] if k > 0 else []
+
+    def position(self, score):
+        # Rank 1 is the best score; equal scores share a rank
+        below = bisect.bisect_left(self.ranked, (score, ""))
+        at_or_below = bisect.bisect_right(self.ranked, (score, _HIGHEST_ID))
+        rank = self.count - at_or_below + 1
+        percentile = round((below + 0.5 * (at_or_below - below)) / self.count * 100, 1)
+        return rank, percentile
+
+class ResultAnalytics:
+    # results may be a callable so the aggregates are only built the first time they are queried
+    def __init__(self, results=None):
+        self.groups = {}   # (class, term, subject) -> ScoreAggregate
+        self.entries = {}  # (student_id, term) -> (class, {subject: score})
+        self.student_terms = {}  # student_id -> set of terms with a result
+        self.loader = results if callable(results) else None
+        if results and not self.loader:
+            self.rebuild(results)
+
+    def _ensure_built(self):
+        if self.loader:
+            loader, self.loader = self.loader, None
+            self.rebuild(loader())
+
+    def rebuild(self, results):
+        self.groups.clear()
+        self.entries.clear()
+        self.student_terms.clear()
+        for student_id, terms in results.items():
+            for term, result_data in terms.items():
+                self.record(student_id, term, result_data)
+
+    def record(self, student_id, term, result_data):
+        # Before the first query there is nothing to update, the rebuild will pick the change up
+        if self.loader:
+            return
+        self.forget(student_id, term)
+        cls = result_data["class"]
+        scores = {subject: subject_percentage(marks) for subject, marks in result_data["subjects"].items()}
+        scores[OVERALL] = result_data["overall"]["percentage"]
+        for subject, score in scores.items():
+            self.groups.setdefault((cls, term, subject), ScoreAggregate()).add(student_id, score)
+        self.entries[(student_id, term)] = (cls, scores)
+        self.student_terms.setdefault(student_id, set()).add(term)
+
+    def forget(self, student_id, term=None):
+        if self.loader:
+            return
+        terms = self.student_terms.get(student_id, set())
+        for t in ([term] if term is not None else list(terms)):
+            terms.discard(t)
+            entry = self.entries.pop((student_id, t), None)
+            if entry:
+                cls, scores = entry
+                for subject, score in scores.items():
+                    self.groups[(cls, t, subject)].remove(student_id, score)
+        if not terms:
+            self.student_terms.pop(student_id, None)
+
+    def subjects(self, cls, term):
+        self._ensure_built()
+        return sorted({s for (c, t, s) in self.groups if c == cls and t == term and s != OVERALL})
+
+    def stats(self, cls, term, subject=OVERALL):
+        self._ensure_built()
+        group = self.groups.get((cls, term, subject))
+        return group.summary() if group else ScoreAggregate().summary()
+
+    def toppers(self, cls, term, k=3, subject=OVERALL):
+        self._ensure_built()
+        group = self.groups.get((cls, term, subject))
+        return group.toppers(k) if group else []
+
+    def position(self, student_id, term, subject=OVERALL):
+        # Returns (rank, class size, percentile) or None when the student has no result
+        self._ensure_built()
+        entry = self.entries.get((student_id, term))
+        if not entry or subject not in entry[1]:
+            return None
+        cls, scores = entry
+        group = self.groups[(cls, term, subject)]
+        rank, percentile = group.position(scores[subject])
+        return rank, group.count, percentile
+
+# ===================== USER SEARCH =====================
+# Type-ahead over names and IDs. Prefix lookups bisect a sorted list of distinct terms
+# (names, surnames, IDs, ID numbers, classes), each with the list of users it belongs to.
+# When a query has no prefix match, names sharing enough trigrams with it are tried so
+# that small typos still find the person.
+FUZZY_MIN_SCORE = 0.4
+
+def search_terms(uid, name, cls=None):
+    # name is already lower-cased with single spaces
+    uid = uid.lower()
+    terms = {name, uid, *name.split()[1:], *uid.split("-")[1:]}  # + surname, ID number / teacher date
+    if cls:
+        terms.add(str(cls))
+    terms.discard("")
+    return terms
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class UserSearchIndex:
+    # users may be a callable so the index is only built the first time it is searched
+    def __init__(self, users=None):
+        self.terms = []     # sorted distinct terms
+        self.postings = {}  # term -> [uid]
+        self.entries = {}   # uid -> (role, class, terms, name)
+        self.name_counts = collections.Counter()
+        self.grams = None   # trigram -> set of names, built on the first fuzzy lookup
+        self.loader = users if callable(users) else None
+        if users and not self.loader:
+            self.rebuild(users)
+
+    def _ensure_built(self):
+        if self.loader:
+            loader, self.loader = self.loader, None
+            self.rebuild(loader())
+
+    def rebuild(self, users):
+        self.entries.clear()
+        self.postings.clear()
+        self.name_counts.clear()
+        self.grams = None
+        for uid, info in users.items():
+            entry = self._entry(uid, info)
+            for term in entry[2]:
+                self.postings.setdefault(term, []).append(uid)
+        self.terms = sorted(self.postings)
+
+    def _entry(self, uid, info):
+        name = " ".join(info.get("name", "").lower().split())
+        cls = info.get("class")
+        entry = self.entries[uid] = (info.get("role"), cls, search_terms(uid, name, cls), name)
+        self.name_counts[name] += 1
+        return entry
+
+    def _build_grams(self):
+        self.grams = {}
+        for name in self.name_counts:
+            for gram in trigrams(name):
+                self.grams.setdefault(gram, set()).add(name)
+
+    def add(self, uid, info):
+        if self.loader:
+            return
+        self.remove(uid)
+        role, cls, terms, name = self._entry(uid, info)
+        for term in terms:
+            if term not in self.postings:
+                bisect.insort(self.terms, term)
+                self.postings[term] = []
+            self.postings[term].append(uid)
+        if self.grams is not None and self.name_counts[name] == 1:
+            for gram in trigrams(name):
+                self.grams.setdefault(gram, set()).add(name)
+
+    def remove(self, uid):
+        if self.loader:
+            return
+        entry = self.entries.pop(uid, None)
+        if not entry:
+            return
+        role, cls, terms, name = entry
+        for term in terms:
+            users = self.postings[term]
+            users.remove(uid)
+            if not users:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+        self.name_counts[name] -= 1
+        if not self.name_counts[name]:
+            del self.name_counts[name]
+            if self.grams is not None:
+                for gram in trigrams(name):
+                    self.grams[gram].discard(name)
+
+    def update(self, uids, users):
+        # Re-index the given user IDs from the current users dict (added, changed or deleted)
+        for uid in uids:
+            info = users.get(uid)
+            if info:
+                self.add(uid, info)
+            else:
+                self.remove(uid)
+
+    def search(self, query, role=None, cls=None, limit=None):
+        # Exact term matches come first (they sort before longer terms), then prefix matches;
+        # fuzzy matches are ranked by the share of the query's trigrams found in the name
+        self._ensure_built()
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        found, seen = [], set()
+
+        def collect(terms):
+            for term in terms:
+                for uid in self.postings[term]:
+                    entry_role, entry_cls = self.entries[uid][:2]
+                    if uid in seen or role is not None and entry_role != role or cls is not None and entry_cls != cls:
+                        continue
+                    seen.add(uid)
+                    found.append(uid)
+                    if limit and len(found) >= limit:
+                        return
+
+        i = bisect.bisect_left(self.terms, query)
+        j = bisect.bisect_left(self.terms, query + "\uffff", i)
+        collect(self.terms[i:j])
+
+        if not found and len(query) >= 3:
+            if self.grams is None:
+                self._build_grams()
+            grams = trigrams(query)
+            shared = collections.Counter()
+            for gram in grams:
+                shared.update(self.grams.get(gram, ()))
+            scored = sorted((-count / len(grams), -count / len(trigrams(name)), name)
+                            for name, count in shared.items() if count / len(grams) >= FUZZY_MIN_SCORE)
+            collect(name for _, _, name in scored)
+        return found
+
+# ===================== REPORT CARDS =====================
+# Printable HTML report cards with every term of a student. Rendering runs in worker processes,
+# so these are plain functions of plain data; print to PDF from any browser.
+REPORT_CARD_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Report Cards</title><style>
+body { font-family: Arial, sans-serif; color: #2c3e50; }
+.card { page-break-after: always; max-width: 800px; margin: 30px auto; }
+h1 { text-align: center; margin-bottom: 0; } h2 { text-align: center; font-weight: normal; margin-top: 4px; }
+table { width: 100%; border-collapse: collapse; margin: 10px 0 4px; }
+th, td { border: 1px solid #bdc3c7; padding: 6px 10px; text-align: center; } th { background: #ecf0f1; }
+td.subject { text-align: left; } tr.total td { font-weight: bold; }
+.meta, .remarks { margin: 4px 0 18px; } .remarks { font-style: italic; }
+</style></head><body>
+"""
+REPORT_CARD_TAIL = "</body></html>\n"
+
+def report_card_filename(student_id):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in student_id) + ".html"
+
+def render_report_card(student_id, name, cls, terms, positions=None):
+    positions = positions or {}
+    order = terms_for_class(cls) if str(cls).isdigit() else []
+    parts = ['<div class="card">', "<h1>SCHOOL MANAGEMENT SYSTEM</h1>", "<h2>Student Report Card</h2>",
+             f'<p class="meta"><b>Name:</b> {html.escape(name)} &nbsp; <b>Student ID:</b> {html.escape(student_id)} &nbsp; <b>Class:</b> {html.escape(str(cls))}</p>']
+    summary = []
+    for term in sorted(terms, key=lambda t: order.index(t) if t in order else len(order)):
+        result_data = terms[term]
+        overall = result_data["overall"]
+        parts.append(f"<h3>{html.escape(term)}</h3><table><tr><th>Subject</th><th>Total Marks</th><th>Obtained</th><th>Percentage</th></tr>")
+        for subject, marks in result_data["subjects"].items():
+            parts.append(f'<tr><td class="subject">{html.escape(subject)}</td><td>{marks["total"]}</td><td>{marks["obtained"]}</td>'
+                         f"<td>{subject_percentage(marks)}%</td></tr>")
+        parts.append(f'<tr class="total"><td class="subject">TOTAL</td><td>{overall["total"]}</td><td>{overall["obtained"]}</td>'
+                     f'<td>{overall["percentage"]}%</td></tr></table>')
+        position = positions.get(term)
+        if position:
+            parts.append(f'<p class="meta">Class Position: {position[0]} of {position[1]} &nbsp;|&nbsp; Percentile: {position[2]}</p>')
+        if overall.get("remarks"):
+            parts.append(f'<p class="remarks">Remarks: {html.escape(overall["remarks"])}</p>')
+        summary.append(f'<td>{html.escape(term)}</td><td>{overall["percentage"]}%</td>')
+    if len(summary) > 1:
+        parts.append("<h3>All Terms</h3><table>" + "".join(f"<tr>{row}</tr>" for row in summary) + "</table>")
+    parts.append("</div>\n")
+    return "".join(parts)
+
+def render_report_cards(batch):
+    # Worker process entry point: [(student_id, name, class, terms, positions)] -> [(student_id, html)]
+    return [(student_id, render_report_card(student_id, name, cls, terms, positions))
+            for student_id, name, cls, terms, positions in batch]
+
+# ===================== BULK CSV IMPORT / EXPORT =====================
+# Import files:  students -> name,class,doj,password,hint   (blank password = generated)
+#                teachers -> name,doj,password,hint         (blank password = generated)
+#                results  -> student_id,term,subject,total,obtained,remarks (one row per subject)
+# Every row is validated like the dialogs; the valid rows of a file are committed with a single save
+# (strict=True commits nothing when any row fails).
+STUDENT_CSV_FIELDS = ["name", "class", "doj", "password", "hint"]
+TEACHER_CSV_FIELDS = ["name", "doj", "password", "hint"]
+RESULT_CSV_FIELDS = ["student_id", "term", "subject", "total", "obtained", "remarks"]
+
+class BulkTransfer:
+    # lock and sync are the service's, so an import is applied, saved and rolled back in step with
+    # the backup thread and the change journal. analytics is a getter: a full reload replaces it.
+    def __init__(self, data, save, analytics=None, lock=None, sync=None):
+        self.data = data
+        self.save = save
+        self._analytics = analytics or (lambda: None)
+        self.lock = lock or threading.RLock()
+        self.sync = sync or (lambda: None)
+
+    @property
+    def analytics(self):
+        return self._analytics()
+
+    def _report(self, started, rows, imported, errors, created=()):
+        seconds = time.perf_counter() - started
+        return {
+            "rows": rows,
+            "imported": imported,
+            "errors": errors,
+            "created": list(created),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds, 1) if seconds > 0 else float(rows)
+        }
+
+    def _read_rows(self, path, fields):
+        # Streams (line number, row dict) pairs, the header line is line 1
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file)
+            missing = [f for f in fields if f not in (reader.fieldnames or [])]
+            if missing and fields[-1] in missing:
+                missing.remove(fields[-1])  # the last column (hint / remarks) is optional
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, {k: (v or "").strip() for k, v in row.items() if k}
+
+    def _hash_passwords(self, staged):
+        # Password hashing is slow by design; hashlib releases the GIL, so hash the whole file on a thread pool
+        staged = list(staged)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+            hashes = pool.map(hash_password, [password for _, password in staged])
+            for (record, _), hashed in zip(staged, hashes):
+                record["password"] = hashed
+
+    def _commit(self, apply, undo):
+        # One save per file; the in-memory data is rolled back if the save fails.
+        # apply runs under the lock right after a sync, so it checks and changes the data as other
+        # copies left it, and returns False when nothing is left to import. The save takes the lock
+        # itself and may wait for another thread's write, so it is not called while we hold it.
+        with self.lock:
+            self.sync()
+            if apply() is False:
+                return False
+        try:
+            self.save()
+        except Exception:
+            with self.lock:
+                undo()
+            raise
+        return True
+
+    def import_students(self, path, strict=False):
+        started = time.perf_counter()
+        staged, errors, rows = [], [], 0
+        today = str(datetime.date.today())
+        for line, row in self._read_rows(path, STUDENT_CSV_FIELDS):
+            rows += 1
+            password = row.get("password") or generate_password()
+            try:
+                record = new_student_record(row.get("name", ""), row.get("class", ""), row.get("doj") or today, password, row.get("hint", ""), password_hash="")
+            except ValueError as e:
+                errors.append((line, str(e)))
+                continue
+            staged.append((record, password))
+
+        if strict and errors or not staged:
+            return self._report(started, rows, 0, errors)
+
+        self._hash_passwords(staged)
+        created = []
+
+        def apply():
+            # Reserve one block of student numbers for the whole file
+            first_id = self.data.reserve_student_ids(len(staged))
+            for offset, (record, password) in enumerate(staged):
+                created.append((student_id_for(record["name"], first_id + offset), record, password))
+            for student_id, record, _ in created:
+                self.data["users"][student_id] = record
+                self.data["results"][student_id] = {}
+                self.data.touch_user(student_id)
+                self.data.touch_result(student_id)
+
+        def undo():
+            for student_id, _, _ in created:
+                self.data["users"].pop(student_id, None)
+                self.data["results"].pop(student_id, None)
+                self.data.dirty_users.discard(student_id)
+                self.data.dirty_results.discard((student_id, None))
+
+        self._commit(apply, undo)
+        return self._report(started, rows, len(created), errors, [(sid, rec["name"], pw) for sid, rec, pw in created])
+
+    def import_teachers(self, path, strict=False):
+        started = time.perf_counter()
+        staged, lines, errors, rows = {}, {}, [], 0
+        today = str(datetime.date.today())
+        for line, row in self._read_rows(path, TEACHER_CSV_FIELDS):
+            rows += 1
+            name = row.get("name", "")
+            teacher_id = teacher_id_for(name)
+            if name and (teacher_id in self.data["users"] or teacher_id in staged):
+                errors.append((line, "Teacher already exists"))
+                continue
+            password = row.get("password") or generate_password()
+            try:
+                record = new_teacher_record(name, row.get("doj") or today, password, row.get("hint", ""), password_hash="")
+            except ValueError as e:
+                errors.append((line, str(e)))
+                continue
+            staged[teacher_id] = (record, password)
+            lines[teacher_id] = line
+
+        if strict and errors or not staged:
+            return self._report(started, rows, 0, errors)
+        self._hash_passwords(staged.values())
+
+        def apply():
+            # Someone may have added one of these teachers while the passwords were being hashed
+            for teacher_id in [t for t in staged if t in self.data["users"]]:
+                del staged[teacher_id]
+                errors.append((lines[teacher_id], "Teacher already exists"))
+            errors.sort()
+            if strict and errors or not staged:
+                return False
+            for teacher_id, (record, _) in staged.items():
+                self.data["users"][teacher_id] = record
+                self.data.touch_user(teacher_id)
+
+        def undo():
+            for teacher_id in staged:
+                self.data["users"].pop(teacher_id, None)
+                self.data.dirty_users.discard(teacher_id)
+
+        if not self._commit(apply, undo):
+            return self._report(started, rows, 0, errors)
+        return self._report(started, rows, len(staged), errors, [(tid, rec["name"], pw) for tid, (rec, pw) in staged.items()])
+
+    def import_results(self, path, strict=False):
+        started = time.perf_counter()
+        staged, previous, errors, rows = {}, {}, [], 0
+
+        def check():
+            # Runs under the lock: every row is checked against the students as they are now
+            nonlocal rows
+            groups = {}
+            users = self.data["users"]
+            for line, row in self._read_rows(path, RESULT_CSV_FIELDS):
+                rows += 1
+                student_id, term, subject = row.get("student_id", ""), row.get("term", ""), row.get("subject", "")
+                info = users.get(student_id)
+                if not info or info["role"] != "student":
+                    errors.append((line, "Student ID not found"))
+                    continue
+                if term not in terms_for_class(info["class"]):
+                    errors.append((line, f"Invalid term for class {info['class']}"))
+                    continue
+                if not subject:
+                    errors.append((line, "Subject is required"))
+                    continue
+                group = groups.setdefault((student_id, term), {"marks": {}, "remarks": "", "lines": []})
+                if subject in group["marks"]:
+                    errors.append((line, f"Duplicate subject {subject}"))
+                    continue
+                try:
+                    build_result(info["class"], {subject: (row.get("total", ""), row.get("obtained", ""))})
+                except ValueError as e:
+                    errors.append((line, str(e)))
+                    continue
+                group["marks"][subject] = (row.get("total"), row.get("obtained"))
+                group["remarks"] = group["remarks"] or row.get("remarks", "")
+
+            for (student_id, term), group in groups.items():
+                if group["marks"]:
+                    staged[(student_id, term)] = build_result(users[student_id]["class"], group["marks"], group["remarks"])
+            results = self.data["results"]
+            previous.update((key, results.get(key[0], {}).get(key[1])) for key in staged)
+
+        def apply():
+            check()
+            if strict and errors or not staged:
+                return False
+            results = self.data["results"]
+            for (student_id, term), result_data in staged.items():
+                results.setdefault(student_id, {})[term] = result_data
+                self.data.touch_result(student_id, term)
+                if self.analytics:
+                    self.analytics.record(student_id, term, result_data)
+
+        def undo():
+            results = self.data["results"]
+            for (student_id, term), old in previous.items():
+                self.data.dirty_results.discard((student_id, term))
+                if old is None:
+                    results.get(student_id, {}).pop(term, None)
+                    if self.analytics:
+                        self.analytics.forget(student_id, term)
+                else:
+                    results[student_id][term] = old
+                    if self.analytics:
+                        self.analytics.record(student_id, term, old)
+
+        if not self._commit(apply, undo):
+            return self._report(started, rows, 0, errors)
+        return self._report(started, rows, len(staged), errors)
+
+    def export_students(self, path):
+        started = time.perf_counter()
+        rows = 0
+        with self.lock, open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["student_id", "name", "class", "doj", "hint"])
+            for uid, info in self.data["users"].items():
+                if info["role"] == "student":
+                    writer.writerow([uid, info["name"], info["class"], info["doj"], info.get("hint", "")])
+                    rows += 1
+        return self._report(started, rows, rows, [])
+
+    def export_teachers(self, path):
+        started = time.perf_counter()
+        rows = 0
+        with self.lock, open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["teacher_id", "name", "doj", "hint"])
+            for uid, info in self.data["users"].items():
+                if info["role"] == "teacher":
+                    writer.writerow([uid, info["name"], info["doj"], info.get("hint", "")])
+                    rows += 1
+        return self._report(started, rows, rows, [])
+
+    def export_results(self, path):
+        # Same columns as the results import, so an export can be edited and imported again
+        started = time.perf_counter()
+        rows = 0
+        with self.lock, open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(RESULT_CSV_FIELDS)
+            for student_id, terms in self.data["results"].items():
+                for term, result_data in terms.items():
+                    remarks = result_data["overall"].get("remarks", "")
+                    for subject, marks in result_data["subjects"].items():
+                        writer.writerow([student_id, term, subject, marks["total"], marks["obtained"], remarks])
+                        rows += 1
+        return self._report(started, rows, rows, [])
+
+    def export_report_cards(self, folder, workers=None, batch_size=100):
+        # One HTML file per student plus all_report_cards.html for printing the whole school.
+        # Students are handed to the process pool in batches as the results are walked, and at most
+        # a few batches are in flight, so memory stays flat however big the school is.
+        started = time.perf_counter()
+        os.makedirs(folder, exist_ok=True)
+        workers = workers or os.cpu_count() or 2
+        with self.lock:
+            student_ids = list(self.data["results"])  # only the keys; records are read batch by batch
+
+        def batches():
+            # Each batch is copied under the lock just before it is submitted, so saves running
+            # meanwhile never change a student half way through being rendered
+            for start in range(0, len(student_ids), batch_size):
+                batch = []
+                with self.lock:
+                    users, results, analytics = self.data["users"], self.data["results"], self.analytics
+                    for student_id in student_ids[start:start + batch_size]:
+                        info, terms = users.get(student_id), results.get(student_id)
+                        if not info or not terms:
+                            continue
+                        positions = {term: analytics.position(student_id, term) for term in terms} if analytics else {}
+                        batch.append((student_id, info["name"], info.get("class", ""), dict(terms), positions))
+                if batch:
+                    yield batch
+
+        written = 0
+        pending = collections.deque()
+        with open(os.path.join(folder, "all_report_cards.html"), "w", encoding="utf-8") as combined, \
+                concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            combined.write(REPORT_CARD_HEAD)
+
+            def write_done(keep):
+                # Oldest batch first, so the combined file keeps the results order
+                nonlocal written
+                while len(pending) > keep:
+                    for student_id, page in pending.popleft().result():
+                        with open(os.path.join(folder, report_card_filename(student_id)), "w", encoding="utf-8") as file:
+                            file.write(REPORT_CARD_HEAD + page + REPORT_CARD_TAIL)
+                        combined.write(page)
+                        written += 1
+
+            for batch in batches():
+                pending.append(pool.submit(render_report_cards, batch))
+                write_done(workers * 2)
+            write_done(0)
+            combined.write(REPORT_CARD_TAIL)
+        return self._report(started, written, written, [])
+
+    def write_credentials(self, path, created):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["user_id", "name", "password"])
+            writer.writerows(created)
+
+# ===================== INSTRUMENTATION =====================
+# Latency histograms, payload size and records touched per operation. Operations slower than
+# their threshold are appended to a slow log (one JSON object per line) and kept in memory
+# for the Diagnostics window.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SLOW_OPERATION_MS = 250
+SLOW_OPERATION_OVERRIDES_MS = {"login": 1500, "register": 1500}  # the password hash is slow on purpose
+STATS_DUMP_SECONDS = 300
+
+class OperationStats:
+    def __init__(self, slow_log_path=None):
+        self.slow_log_path = slow_log_path
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.slow = collections.deque(maxlen=200)
+        self.started = time.time()
+        self.timer = None
+
+    def measure(self, name):
+        return Measurement(self, name)
+
+    def record(self, name, seconds, payload_bytes=0, records=0):
+        ms = seconds * 1000
+        with self.lock:
+            op = self.operations.get(name)
+            if op is None:
+                op = self.operations[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "payload_bytes": 0, "records": 0,
+                                              "slow": 0, "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            op["count"] += 1
+            op["total_ms"] += ms
+            op["max_ms"] = max(op["max_ms"], ms)
+            op["payload_bytes"] += payload_bytes
+            op["records"] += records
+            op["histogram"][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            if ms < SLOW_OPERATION_OVERRIDES_MS.get(name.split(" ")[0], SLOW_OPERATION_MS):
+                return
+            op["slow"] += 1
+            entry = {"time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "operation": name, "ms": round(ms, 1),
+                     "payload_bytes": payload_bytes, "records": records}
+            self.slow.append(entry)
+        if self.slow_log_path:
+            try:
+                with open(self.slow_log_path, "a") as file:
+                    file.write(json.dumps(entry) + "\n")
+            except OSError:
+                pass
+
+    def _percentile(self, histogram, count, fraction, max_ms):
+        # Upper edge of the bucket holding the percentile (the maximum for the overflow bucket)
+        seen = 0
+        for i, bucket in enumerate(histogram):
+            seen += bucket
+            if seen >= count * fraction:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else round(max_ms, 1)
+        return round(max_ms, 1)
+
+    def snapshot(self):
+        with self.lock:
+            operations = {}
+            for name, op in sorted(self.operations.items()):
+                count = op["count"]
+                operations[name] = {
+                    "count": count,
+                    "mean_ms": round(op["total_ms"] / count, 3),
+                    "p50_ms": self._percentile(op["histogram"], count, 0.5, op["max_ms"]),
+                    "p95_ms": self._percentile(op["histogram"], count, 0.95, op["max_ms"]),
+                    "max_ms": round(op["max_ms"], 3),
+                    "mean_payload_bytes": round(op["payload_bytes"] / count),
+                    "mean_records": round(op["records"] / count, 2),
+                    "slow": op["slow"],
+                    "histogram": dict(zip([f"<={b}ms" for b in LATENCY_BUCKETS_MS] + ["more"], op["histogram"]))
+                }
+            return {"since": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                    "pid": os.getpid(), "operations": operations, "recent_slow": list(self.slow)}
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
+            self.slow.clear()
+            self.started = time.time()
+
+    def dump(self, path):
+        write_json_atomic(path, self.snapshot())
+
+    def start_dumps(self, path, interval=STATS_DUMP_SECONDS):
+        # Writes the snapshot to path every interval seconds from a daemon timer thread
+        def tick():
+            try:
+                self.dump(path)
+            except OSError:
+                pass
+            self.start_dumps(path, interval)
+        self.timer = threading.Timer(interval, tick)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop_dumps(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+class Measurement:
+    # with stats.measure("save_data") as op: ...; op.records = 3
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.payload_bytes = 0
+        self.records = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.record(self.name, time.perf_counter() - self.started, self.payload_bytes, self.records)
+        return False
+
+# ===================== SERVICE LAYER =====================
+# All school operations without any Tk code, so they can be scripted, load tested and shared by
+# several front-ends (the Tk app and the HTTP API). Every operation runs under one re-entrant lock.
+ADMIN_ID = "Aniq Abbasi"
+
+class ServiceError(Exception):
+    pass
+
+class StoreWriter:
+    # Group commit: saves requested by many threads while a write is running are folded into
+    # the next single write, so concurrent clients share the storage instead of queueing full rewrites.
+    def __init__(self, save, lock):
+        self.save = save
+        self.lock = lock
+        self.cond = threading.Condition()
+        self.requested = 0
+        self.completed = 0
+        self.writing = False
+        self.writes = 0
+        self.failures = collections.deque(maxlen=64)  # (first ticket, last ticket, error)
+
+    def commit(self):
+        with self.cond:
+            self.requested += 1
+            ticket = self.requested
+            while self.completed < ticket:
+                if self.writing:
+                    self.cond.wait()
+                    continue
+                # This thread becomes the writer for every save requested so far
+                self.writing = True
+                first, target = self.completed + 1, self.requested
+                self.cond.release()
+                error = None
+                try:
+                    with self.lock:
+                        self.save()
+                except Exception as e:
+                    error = e
+                finally:
+                    self.cond.acquire()
+                    self.writing = False
+                    self.completed = target
+                    self.writes += 1
+                    if error:
+                        self.failures.append((first, target, error))
+                    self.cond.notify_all()
+            for first, last, error in self.failures:
+                if first <= ticket <= last:
+                    raise ServiceError(f"Could not save data: {error}")
+
+class SchoolService:
+    def __init__(self, data_file="school_data.json"):
+        self.lock = threading.RLock()
+        self.data_file = data_file
+        if os.path.exists(data_file):
+            self.data = SchoolData.open(data_file)
+        else:
+            self.data = SchoolData.create(data_file)
+        self.analytics = ResultAnalytics(lambda: self.data["results"])
+        self.search_index = UserSearchIndex(lambda: self.data["users"])
+        self.writer = StoreWriter(self._save, self.lock)
+        self.auth_cache = SessionCache()
+        self.stats = OperationStats(os.path.splitext(data_file)[0] + ".slow.log")
+        self.backups = BackupStore(data_file)
+        self.backup_timer = None
+        self.backup_failures = collections.deque(maxlen=16)  # (time, error)
+        self.stats_path = os.path.splitext(data_file)[0] + ".stats.json"
+
+    def commit(self):
+        self.writer.commit()
+
+    def _save(self):
+        with self.stats.measure("save_data") as op:
+            saved_users = set(self.data.dirty_users)
+            changed = self.data.save()
+            op.payload_bytes, op.records = self.data.last_save["payload_bytes"], self.data.last_save["records"]
+        self.search_index.update(saved_users, self.data["users"])
+        self._apply_changes(changed)
+
+    def backup(self):
+        with self.stats.measure("backup") as op, self.lock:
+            self.sync()
+            report = self.backups.backup(self.data)
+            op.payload_bytes, op.records = report["stored_bytes"], report["users"] + report["results"]
+            return report
+
+    def start_backups(self, interval=BACKUP_INTERVAL_SECONDS):
+        # Backs up every interval seconds from a daemon timer thread
+        def tick():
+            try:
+                self.backup()
+            except Exception as e:
+                self.backup_failures.append((time.time(), e))
+            finally:
+                self.start_backups(interval)
+        self.backup_timer = threading.Timer(interval, tick)
+        self.backup_timer.daemon = True
+        self.backup_timer.start()
+
+    def sync(self):
+        # Picks up what other copies of the program saved to the same files
+        with self.lock, self.stats.measure("sync") as op:
+            changed = self.data.sync()
+            op.records = len(changed["users"]) + len(changed["results"]) if changed else len(self.data["users"])
+            self._apply_changes(changed)
+
+    def _apply_changes(self, changed):
+        if changed is None:
+            self.analytics = ResultAnalytics(lambda: self.data["results"])
+            self.search_index = UserSearchIndex(lambda: self.data["users"])
+            return
+        self.search_index.update(changed["users"], self.data["users"])
+        for student_id, term in changed["results"]:
+            terms = self.data["results"].get(student_id) or {}
+            if term is None:
+                self.analytics.forget(student_id)
+                for t, result_data in terms.items():
+                    self.analytics.record(student_id, t, result_data)
+            elif term in terms:
+                self.analytics.record(student_id, term, terms[term])
+            else:
+                self.analytics.forget(student_id, term)
+
+    def _user(self, uid, role=None):
+        info = self.data["users"].get(uid)
+        if not info or (role and info["role"] != role):
+            raise ServiceError(f"{(role or 'user').title()} ID not found")
+        return info
+
+    # ---------- accounts ----------
+    def has_admin(self):
+        return ADMIN_ID in self.data["users"]
+
+    def create_admin(self):
+        with self.lock:
+            self.data["users"][ADMIN_ID] = {
+                "role": "admin",
+                "name": ADMIN_ID,
+                "password": hash_password("Abbasi984"),
+                "hint": "My name + 984"
+            }
+            self.data.touch_user(ADMIN_ID)
+        self.commit()
+
+    def authenticate(self, uid, password):
+        # The slow hash runs outside the lock so one login never blocks the other users
+        with self.lock:
+            self.sync()
+            info = self.data["users"].get(uid)
+            stored = info["password"] if info else None
+        if stored is None:
+            raise ServiceError("Invalid User ID or Password")
+        if self.auth_cache.check(uid, password, stored):
+            return info["role"]
+        if not verify_password(stored, password):
+            raise ServiceError("Invalid User ID or Password")
+
+        if PASSWORD_HASHER.needs_rehash(stored):
+            upgraded = hash_password(password)
+            with self.lock:
+                if self.data["users"].get(uid) is info and info["password"] == stored:
+                    info["password"] = upgraded
+                    stored = upgraded
+                    self.data.touch_user(uid)
+            self.commit()
+        self.auth_cache.remember(uid, password, stored)
+        return info["role"]
+
+    def login(self, uid, password):
+        with self.stats.measure("login") as op:
+            op.records = 1
+            role = self.authenticate(uid, password)
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with self.lock:
+                self.data.append_log({"time": timestamp, "id": uid, "role": role})
+            return role
+
+    def open_session(self, uid, password):
+        role = self.login(uid, password)
+        return self.auth_cache.open(uid), role
+
+    def session_user(self, token):
+        uid = self.auth_cache.user(token)
+        if uid is None or uid not in self.data["users"]:
+            raise ServiceError("Not logged in")
+        return uid
+
+    def close_session(self, token):
+        self.auth_cache.close(token)
+
+    def password_hint(self, uid):
+        return self._user(uid).get("hint", "No hint set")
+
+    def change_password(self, uid, new_password):
+        if len(new_password) < 6:
+            raise ServiceError("Password must be at least 6 characters")
+        hashed = hash_password(new_password)
+        with self.lock:
+            self.sync()
+            self._user(uid)["password"] = hashed
+            self.data.touch_user(uid)
+        self.auth_cache.forget_user(uid)
+        self.commit()
+
+    def register_teacher(self, name, doj, password, hint=""):
+        with self.stats.measure("register teacher") as op:
+            op.records = 1
+            teacher_id = teacher_id_for(name)
+            if name and teacher_id in self.data["users"]:
+                raise ServiceError("Teacher already exists")
+            try:
+                record = new_teacher_record(name, doj, password, hint, password_hash="")
+            except ValueError as e:
+                raise ServiceError(str(e))
+            record["password"] = hash_password(password)  # slow on purpose, so done outside the lock
+            with self.lock:
+                self.sync()
+                if teacher_id in self.data["users"]:
+                    raise ServiceError("Teacher already exists")
+                self.data["users"][teacher_id] = record
+                self.data.touch_user(teacher_id)
+            self.commit()
+            return teacher_id
+
+    def register_student(self, name, cls, doj, password, hint=""):
+        with self.stats.measure("register student") as op:
+            op.records = 1
+            try:
+                record = new_student_record(name, cls, doj, password, hint, password_hash="")
+            except ValueError as e:
+                raise ServiceError(str(e))
+            record["password"] = hash_password(password)
+            with self.lock:
+                student_id = student_id_for(record["name"], self.data.reserve_student_ids(1))
+                self.data["users"][student_id] = record
+                self.data["results"][student_id] = {}
+                self.data.touch_user(student_id)
+                self.data.touch_result(student_id)
+            self.commit()
+            return student_id
+
+    def delete_user(self, uid):
+        with self.stats.measure("delete_user") as op:
+            op.records = 1
+            with self.lock:
+                self.sync()
+                info = self._user(uid)
+                del self.data["users"][uid]
+                self.data.touch_user(uid)
+                self.auth_cache.forget_user(uid)
+                if info["role"] == "student":
+                    self.data["results"].pop(uid, None)
+                    self.data.touch_result(uid)
+                    self.analytics.forget(uid)
+            self.commit()
+
+    def search_users(self, query, role=None, cls=None, limit=None):
+        with self.lock:
+            return self.search_index.search(query, role, cls, limit)
+
+    def list_users(self, role, offset=0, limit=None):
+        with self.lock:
+            ids = [uid for uid, info in self.data["users"].items() if info["role"] == role]
+            end = None if limit is None else offset + limit
+            return len(ids), [(uid, copy.deepcopy(dict(self.data["users"][uid], password=None))) for uid in ids[offset:end]]
+
+    # ---------- classes & subjects ----------
+    def teacher_classes(self, teacher_id):
+        return self._user(teacher_id, "teacher").setdefault("classes", {})
+
+    def add_class(self, teacher_id, cls):
+        with self.lock:
+            self.sync()
+            classes = self.teacher_classes(teacher_id)
+            if not (cls and cls.isdigit() and 1 <= int(cls) <= 12):
+                raise ServiceError("Class must be a number from 1 to 12")
+            if cls in classes:
+                raise ServiceError("This class is already added")
+            classes[cls] = []
+            self.data.touch_user(teacher_id)
+        self.commit()
+
+    def remove_class(self, teacher_id, cls):
+        with self.lock:
+            self.sync()
+            self.teacher_classes(teacher_id).pop(cls, None)
+            self.data.touch_user(teacher_id)
+        self.commit()
+
+    def add_subject(self, teacher_id, cls, subject):
+        subject = subject.strip()
+        with self.lock:
+            self.sync()
+            subjects = self.teacher_classes(teacher_id).get(cls)
+            if subjects is None:
+                raise ServiceError(f"Class {cls} is not added")
+            if not subject or subject in subjects:
+                return
+            subjects.append(subject)
+            self.data.touch_user(teacher_id)
+        self.commit()
+
+    def remove_subject(self, teacher_id, cls, subject):
+        with self.lock:
+            self.sync()
+            subjects = self.teacher_classes(teacher_id).get(cls, [])
+            if subject in subjects:
+                subjects.remove(subject)
+                self.data.touch_user(teacher_id)
+        self.commit()
+
+    # ---------- results ----------
+    def _class_subjects(self, teacher_id, cls, term):
+        subjects = self.teacher_classes(teacher_id).get(cls)
+        if subjects is None:
+            raise ServiceError(f"Class {cls} is not added")
+        if term not in terms_for_class(cls):
+            raise ServiceError(f"Invalid term for class {cls}")
+        return subjects
+
+    def _check_result(self, subjects, student_id, cls, marks, remarks):
+        self._user(student_id, "student")
+        unknown = [s for s in marks if s not in subjects]
+        if unknown:
+            raise ServiceError(f"Unknown subject: {unknown[0]}")
+        try:
+            return build_result(cls, marks, remarks)
+        except ValueError as e:
+            raise ServiceError(str(e))
+
+    def save_result(self, teacher_id, student_id, cls, term, marks, remarks=""):
+        with self.stats.measure("save_result") as op:
+            op.records = 1
+            with self.lock:
+                self.sync()
+                if not all([cls, term, student_id]):
+                    raise ServiceError("All fields are required")
+                subjects = self._class_subjects(teacher_id, cls, term)
+                result_data = self._check_result(subjects, student_id, cls, marks, remarks)
+                self.data["results"].setdefault(student_id, {})[term] = result_data
+                self.data.touch_result(student_id, term)
+                self.analytics.record(student_id, term, result_data)
+                saved = copy.deepcopy(result_data)
+            self.commit()
+            return saved
+
+    def save_results_batch(self, teacher_id, cls, term, rows):
+        # rows maps student_id -> (marks, remarks). Every row is validated like save_result first;
+        # if any row fails nothing is saved and {student_id: error} is returned, otherwise one write.
+        with self.stats.measure("save_results_batch") as op:
+            op.records = len(rows)
+            with self.lock:
+                self.sync()
+                subjects = self._class_subjects(teacher_id, cls, term)
+                staged, errors = {}, {}
+                for student_id, (marks, remarks) in rows.items():
+                    try:
+                        staged[student_id] = self._check_result(subjects, student_id, cls, marks, remarks)
+                    except ServiceError as e:
+                        errors[student_id] = str(e)
+                if errors:
+                    return errors
+                for student_id, result_data in staged.items():
+                    self.data["results"].setdefault(student_id, {})[term] = result_data
+                    self.data.touch_result(student_id, term)
+                    self.analytics.record(student_id, term, result_data)
+            self.commit()
+            return {}
+
+    def class_students(self, cls):
+        with self.lock:
+            return [(uid, info["name"]) for uid, info in self.data["users"].items()
+                    if info["role"] == "student" and info.get("class") == cls]
+
+    def student_results(self, student_id):
+        # A copy: the caller reads it (e.g. json.dumps) after the lock is released
+        with self.lock:
+            self.sync()
+            return copy.deepcopy(self.data["results"].get(student_id, {}))
+
+    def class_stats(self, cls, term):
+        with self.lock:
+            stats = {"OVERALL" if s == OVERALL else s: self.analytics.stats(cls, term, s)
+                     for s in [OVERALL] + self.analytics.subjects(cls, term)}
+            return {"subjects": stats, "toppers": self.analytics.toppers(cls, term, 3)}
+
+    def bulk_transfer(self):
+        return BulkTransfer(self.data, self.commit, lambda: self.analytics, self.lock, self.sync)
+
+# ===================== HTTP API =====================
+# A small JSON API over SchoolService. Clients log in once and send the token as
+# "Authorization: Bearer <token>". Requests are served by a fixed pool of worker threads
+# and connections are kept alive between requests.
+#   POST   /login               {"user_id", "password"}            -> {"token", "role"}
+#   POST   /logout
+#   GET    /users?role=student&offset=0&limit=100                  (admin)
+#   POST   /students            {"name", "class", "doj", "password", "hint"}   (admin)
+#   POST   /teachers            {"name", "doj", "password", "hint"}            (admin)
+#   DELETE /users/<id>                                              (admin)
+#   POST   /results             {"student_id", "class", "term", "marks": {subject: [total, obtained]}, "remarks"}  (teacher)
+#   GET    /results/<student_id>                                    (the student, teachers, admin)
+#   GET    /stats?class=5&term=1st%20term                           (teachers, admin)
+class PooledHTTPServer(http.server.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, workers=16):
+        super().__init__(address, handler)
+        self.workers = workers
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.connections = 0  # accepted and not yet closed, including those waiting for a worker
+        self.connections_lock = threading.Lock()
+
+    def saturated(self):
+        # True when a connection is queued behind the busy workers
+        return self.connections > self.workers
+
+    def process_request(self, request, client_address):
+        with self.connections_lock:
+            self.connections += 1
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self.connections_lock:
+                self.connections -= 1
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+class SchoolAPIHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 5  # idle keep-alive connections give their worker back after this many seconds
+    service = None  # set by make_api_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.saturated():
+            # Hand this worker to a waiting connection instead of keeping the idle one alive
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _caller(self, *roles):
+        auth = self.headers.get("Authorization", "")
+        uid = self.service.session_user(auth[7:] if auth.startswith("Bearer ") else "")
+        role = self.service.data["users"][uid]["role"]
+        if roles and role not in roles:
+            raise PermissionError("Not allowed for this user")
+        return uid, role
+
+    def _dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            status, payload = self._route(method, parts, query)
+        except ServiceError as e:
+            status, payload = (401 if str(e) in ("Not logged in", "Invalid User ID or Password") else 400), {"error": str(e)}
+        except PermissionError as e:
+            status, payload = 403, {"error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {"error": f"Bad request: {e}"}
+        except Exception as e:
+            status, payload = 500, {"error": f"Internal error: {type(e).__name__}"}
+        self._send(status, payload)
+
+    def _route(self, method, parts, query):
+        service = self.service
+        route = (method, parts[0] if parts else "")
+        if route == ("POST", "login"):
+            body = self._body()
+            token, role = service.open_session(body["user_id"], body["password"])
+            return 200, {"token": token, "role": role}
+        if route == ("POST", "logout"):
+            auth = self.headers.get("Authorization", "")
+            service.close_session(auth[7:])
+            return 200, {}
+        if route == ("GET", "users"):
+            self._caller("admin")
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+            total, users = service.list_users(query.get("role", "student"), offset, limit)
+            return 200, {"total": total, "users": [dict(info, id=uid) for uid, info in users]}
+        if route == ("POST", "students"):
+            self._caller("admin")
+            body = self._body()
+            student_id = service.register_student(body.get("name", "").strip(), str(body.get("class", "")).strip(),
+                                                  body.get("doj") or str(datetime.date.today()), body.get("password", ""), body.get("hint", ""))
+            return 201, {"id": student_id}
+        if route == ("POST", "teachers"):
+            self._caller("admin")
+            body = self._body()
+            teacher_id = service.register_teacher(body.get("name", "").strip(), body.get("doj") or str(datetime.date.today()),
+                                                  body.get("password", ""), body.get("hint", ""))
+            return 201, {"id": teacher_id}
+        if route == ("DELETE", "users") and len(parts) == 2:
+            self._caller("admin")
+            service.delete_user(parts[1])
+            return 200, {}
+        if route == ("POST", "results"):
+            uid, _ = self._caller("teacher")
+            body = self._body()
+            marks = {subject: tuple(pair) for subject, pair in body.get("marks", {}).items()}
+            result_data = service.save_result(uid, body.get("student_id", ""), str(body.get("class", "")), body.get("term", ""),
+                                              marks, body.get("remarks", ""))
+            return 201, result_data
+        if route == ("GET", "results") and len(parts) == 2:
+            uid, role = self._caller()
+            if role == "student" and uid != parts[1]:
+                raise PermissionError("Students can only view their own results")
+            return 200, service.student_results(parts[1])
+        if route == ("GET", "stats"):
+            self._caller("teacher", "admin")
+            return 200, service.class_stats(query["class"], query["term"])
+        return 404, {"error": "Not found"}
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+def make_api_server(service, host="127.0.0.1", port=8765, workers=16):
+    handler = type("BoundSchoolAPIHandler", (SchoolAPIHandler,), {"service": service})
+    return PooledHTTPServer((host, port), handler, workers)
+
+# Sort key that orders numeric columns (class, IDs) by value instead of text
+def sort_value(value):
+    text = str(value)
+    return (0, int(text), "") if text.isdigit() else (1, 0, text.lower())
+
+# Paged Row Source - keeps only the matching record keys, row tuples are built one page at a time
+class PagedRowSource:
+    # search, if given, maps a query to ranked keys (e.g. from a UserSearchIndex) and replaces
+    # the substring scan over search_columns
+    # stats (an OperationStats) times reloads and searches as "refresh <name>" / "search <name>"
+    # build_row returns None for a key whose record is gone (e.g. deleted by another copy and
+    # picked up by a sync); such keys are dropped from the list the first time they are met
+    def __init__(self, columns, fetch_keys, build_row, search_columns=(), search=None, stats=None, name="list"):
+        self.columns = list(columns)
+        self.stats = stats
+        self.name = name
+        self.fetch_keys = fetch_keys
+        self.build_row = build_row
+        self.search_indexes = [self.columns.index(col) for col in search_columns]
+        self.search = search
+        self.key_set = set()
+        self.sort_column = None
+        self.sort_reverse = False
+        self.query = ""
+        self.all_keys = []
+        self.keys = []
+        self.reload()
+
+    def reload(self):
+        if self.stats:
+            with self.stats.measure(f"refresh {self.name}") as op:
+                self._reload()
+                op.records = len(self.all_keys)
+        else:
+            self._reload()
+
+    def _reload(self):
+        self.all_keys = list(self.fetch_keys())
+        if self.search:
+            self.key_set = set(self.all_keys)
+        self.keys = self._filter(self.all_keys, self.query)
+        self._sort()
+
+    def _filter(self, candidates, query):
+        if not query:
+            return list(candidates)
+        if self.search:
+            return [key for key in self.search(query) if key in self.key_set]
+        matches = []
+        for key in candidates:
+            row = self.build_row(key)
+            if row is not None and any(query in str(row[i]).lower() for i in self.search_indexes):
+                matches.append(key)
+        return matches
+
+    def _drop(self, gone):
+        gone = set(gone)
+        self.all_keys = [key for key in self.all_keys if key not in gone]
+        self.keys = [key for key in self.keys if key not in gone]
+        self.key_set -= gone
+
+    def _sort(self):
+        if self.sort_column is None:
+            return
+        idx = self.columns.index(self.sort_column)
+        values = {}
+        for key in self.keys:
+            row = self.build_row(key)
+            if row is not None:
+                values[key] = sort_value(row[idx])
+        if len(values) < len(self.keys):
+            self._drop([key for key in self.keys if key not in values])
+        self.keys.sort(key=values.__getitem__, reverse=self.sort_reverse)
+
+    def set_query(self, query):
+        query = query.strip().lower()
+        if query == self.query:
+            return
+        if self.stats:
+            with self.stats.measure(f"search {self.name}") as op:
+                self._set_query(query)
+                op.records = len(self.keys)
+        else:
+            self._set_query(query)
+
+    def _set_query(self, query):
+        # While the user keeps typing, only the previous matches need checking (already sorted)
+        if self.query and query.startswith(self.query) and not self.search:
+            self.keys = self._filter(self.keys, query)
+            self.query = query
+            return
+        self.query = query
+        self.keys = self._filter(self.all_keys, query)
+        self._sort()
+
+    def set_sort(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        self._sort()
+
+    def count(self):
+        return len(self.keys)
+
+    def page(self, offset, limit):
+        while True:
+            rows, gone = [], []
+            for key in self.keys[offset:offset + limit]:
+                row = self.build_row(key)
+                if row is None:
+                    gone.append(key)
+                else:
+                    rows.append((key, row))
+            if not gone:
+                return rows
+            self._drop(gone)  # and refill the page from the keys after it
+
+# Virtual Treeview - only the visible rows exist as Tk items, the rest are paged in while scrolling
+class VirtualTreeview(tk.Frame):
+    def __init__(self, master, source, headings, widths, buffer_rows=100, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = source
+        self.buffer_rows = buffer_rows
+        self.offset = 0
+        self.visible_rows = 20
+        self.row_keys = []
+        self.selected = None
+        self.cache_start = 0
+        self.cache = []
+
+        self.tree = ttk.Treeview(self, columns=source.columns, show="headings", height=self.visible_rows, selectmode="browse")
+        for col, text, width in zip(source.columns, headings, widths):
+            self.tree.heading(col, text=text, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=width)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(int(-1*(e.delta/120)) * 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows))
+        self.render()
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - 28) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            index = self.tree.index(selection[0])
+            if index < len(self.row_keys):
+                self.selected = self.row_keys[index]
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * self.source.count())
+            self.render()
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible_rows)
+        else:
+            self.scroll(int(amount))
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def sort_by(self, column):
+        self.source.set_sort(column)
+        self.reset()
+
+    def search(self, query):
+        self.source.set_query(query)
+        self.reset()
+
+    def refresh(self):
+        self.source.reload()
+        self.cache = []
+        self.render()
+
+    def reset(self):
+        self.offset = 0
+        self.cache = []
+        self.render()
+
+    def selected_key(self):
+        return self.selected if self.tree.selection() else None
+
+    def _rows(self, offset, limit):
+        # Serve from the buffered page when possible, otherwise fetch a new page around the offset
+        end = offset + limit
+        if not (self.cache_start <= offset and end <= self.cache_start + len(self.cache)) or not self.cache:
+            self.cache_start = max(0, offset - self.buffer_rows)
+            self.cache = self.source.page(self.cache_start, limit + 2 * self.buffer_rows)
+        return self.cache[offset - self.cache_start:end - self.cache_start]
+
+    def render(self):
+        total = self.source.count()
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        rows = self._rows(self.offset, self.visible_rows)
+
+        # Reuse the existing Tk items, only adding or dropping the difference
+        items = self.tree.get_children()
+        for i, (key, values) in enumerate(rows):
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", "end", values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        self.row_keys = [key for key, _ in rows]
+
+        items = self.tree.get_children()
+        if self.selected in self.row_keys:
+            item = items[self.row_keys.index(self.selected)]
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+# Result Grid - spreadsheet-like marks entry for a whole class. Only the visible rows have Entry
+# widgets; they are reused while scrolling and the typed values live in a plain dict.
+class ResultGrid(tk.Frame):
+    REMARKS = "__remarks__"
+
+    def __init__(self, master, students, subjects, values=None, totals=None, visible_rows=15):
+        super().__init__(master)
+        self.students = students
+        self.subjects = list(subjects)
+        self.columns = self.subjects + [self.REMARKS]
+        self.values = dict(values or {})  # (student_id, subject or REMARKS) -> text
+        self.visible_rows = min(visible_rows, len(students))
+        self.offset = 0
+
+        table = tk.Frame(self)
+        table.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        tk.Label(table, text="Student", font=("Arial", 12, "bold"), width=30, anchor="w").grid(row=0, column=0, sticky="w")
+        tk.Label(table, text="Total Marks →", font=("Arial", 11), fg="gray", anchor="e").grid(row=1, column=0, sticky="e")
+        self.totals = {}
+        for col, subject in enumerate(self.subjects, start=1):
+            tk.Label(table, text=subject, font=("Arial", 12, "bold")).grid(row=0, column=col, padx=4)
+            total = tk.Entry(table, width=8, font=("Arial", 12), justify="center", bg="#ecf0f1")
+            total.insert(0, (totals or {}).get(subject, "100"))
+            total.grid(row=1, column=col, padx=4, pady=(0, 8))
+            self.totals[subject] = total
+        tk.Label(table, text="Remarks", font=("Arial", 12, "bold")).grid(row=0, column=len(self.columns), padx=4)
+
+        self.name_labels, self.cells = [], []
+        for r in range(self.visible_rows):
+            label = tk.Label(table, text="", font=("Arial", 12), anchor="w", width=30)
+            label.grid(row=r + 2, column=0, sticky="w")
+            row_cells = []
+            for col, column in enumerate(self.columns, start=1):
+                entry = tk.Entry(table, width=30 if column == self.REMARKS else 8, font=("Arial", 12),
+                                 justify="left" if column == self.REMARKS else "center")
+                entry.grid(row=r + 2, column=col, padx=4, pady=2)
+                entry.bind("<Down>", lambda e, r=r, c=col - 1: self.move(r, c, 1))
+                entry.bind("<Up>", lambda e, r=r, c=col - 1: self.move(r, c, -1))
+                entry.bind("<MouseWheel>", lambda e: self.scroll(int(-1*(e.delta/120)) * 3))
+                entry.bind("<Button-4>", lambda e: self.scroll(-3))
+                entry.bind("<Button-5>", lambda e: self.scroll(3))
+                row_cells.append(entry)
+            self.name_labels.append(label)
+            self.cells.append(row_cells)
+        self.render()
+
+    def flush(self):
+        # Copy what is typed in the visible Entry widgets back into the value dict
+        for r, row_cells in enumerate(self.cells):
+            student_id = self.students[self.offset + r][0]
+            for column, entry in zip(self.columns, row_cells):
+                text = entry.get().strip()
+                if text:
+                    self.values[(student_id, column)] = text
+                else:
+                    self.values.pop((student_id, column), None)
+
+    def render(self):
+        for r, row_cells in enumerate(self.cells):
+            student_id, name = self.students[self.offset + r]
+            self.name_labels[r].config(text=f"{name}  ({student_id})")
+            for column, entry in zip(self.columns, row_cells):
+                entry.delete(0, tk.END)
+                entry.insert(0, self.values.get((student_id, column), ""))
+        total = len(self.students)
+        self.scrollbar.set(self.offset / total, (self.offset + self.visible_rows) / total)
+
+    def scroll(self, rows):
+        offset = max(0, min(self.offset + rows, len(self.students) - self.visible_rows))
+        if offset != self.offset:
+            self.flush()
+            self.offset = offset
+            self.render()
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            return self.scroll(int(float(amount) * len(self.students)) - self.offset)
+        return self.scroll(int(amount) * (self.visible_rows if unit == "pages" else 1))
+
+    def move(self, row, col, step):
+        target = row + step
+        if target < 0 or target >= self.visible_rows:
+            self.scroll(step)
+            target = row
+        self.cells[target][col].focus_set()
+        return "break"
+
+    def scroll_to(self, student_id):
+        index = next((i for i, (sid, _) in enumerate(self.students) if sid == student_id), 0)
+        self.scroll(index - self.offset)
+
+    def filled_rows(self):
+        # student_id -> (marks, remarks) for every student with at least one mark typed in
+        self.flush()
+        totals = {subject: entry.get().strip() for subject, entry in self.totals.items()}
+        rows = {}
+        for student_id, _ in self.students:
+            if any((student_id, subject) in self.values for subject in self.subjects):
+                marks = {subject: (totals[subject], self.values.get((student_id, subject), "")) for subject in self.subjects}
+                rows[student_id] = (marks, self.values.get((student_id, self.REMARKS), ""))
+        return rows
+
+# Search box that filters a VirtualTreeview as the user types
+def attach_search_box(parent, view, label="Search:"):
+    bar = tk.Frame(parent)
+    bar.pack(fill="x", padx=30, pady=(20, 0))
+    tk.Label(bar, text=label, font=("Arial", 12)).pack(side="left")
+    query = tk.StringVar()
+    tk.Entry(bar, textvariable=query, font=("Arial", 12), width=40).pack(side="left", padx=10)
+    pending = []
+
+    def on_change(*args):
+        # Debounce so that fast typing only triggers one search
+        if pending:
+            bar.after_cancel(pending.pop())
+        pending.append(bar.after(150, lambda: (pending.clear(), view.search(query.get()))))
+
+    query.trace_add("write", on_change)
+    return query
+
+# Drop-down of matches under an Entry; picking one puts its key into the Entry.
+# lookup(query) returns [(key, text shown)].
+def attach_suggestions(entry, lookup, rows=6):
+    box = tk.Listbox(entry.master, height=rows, width=entry.cget("width"), font=("Arial", 12))
+    keys, pending = [], []
+
+    def hide():
+        box.pack_forget()
+
+    def pick(event=None):
+        selection = box.curselection()
+        if selection:
+            entry.delete(0, tk.END)
+            entry.insert(0, keys[selection[0]])
+            entry.icursor(tk.END)
+            entry.focus_set()
+        hide()
+        return "break"
+
+    def update():
+        pending.clear()
+        query = entry.get().strip()
+        matches = lookup(query) if query else []
+        keys[:] = [key for key, _ in matches]
+        box.delete(0, tk.END)
+        if not matches or keys == [query]:
+            hide()
+            return
+        for _, text in matches:
+            box.insert(tk.END, text)
+        box.pack(after=entry)
+
+    def on_key(event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        # Debounce so that fast typing only triggers one lookup
+        if pending:
+            entry.after_cancel(pending.pop())
+        pending.append(entry.after(150, update))
+
+    def to_list(event):
+        if keys:
+            box.focus_set()
+            box.selection_clear(0, tk.END)
+            box.selection_set(0)
+            box.activate(0)
+        return "break"
+
+    entry.bind("<KeyRelease>", on_key, add="+")
+    entry.bind("<Down>", to_list, add="+")
+    entry.bind("<Escape>", lambda e: hide(), add="+")
+    box.bind("<Return>", pick)
+    box.bind("<ButtonRelease-1>", pick)
+    box.bind("<Escape>", lambda e: (hide(), entry.focus_set()))
+    return box
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+# A screen that is built once and raised again on later visits. `parts` are the widgets whose
+# content depends on who is logged in; the screen's refresh function updates only those.
+class CachedView:
+    def __init__(self, frame, canvas=None, **parts):
+        self.frame = frame
+        self.canvas = canvas
+        self.__dict__.update(parts)
+
+# Navigation timings: wall time until idle tasks are done, Tcl commands evaluated
+# (`info cmdcount`) and widgets created/destroyed, split by whether the screen was built or reused
+class NavigationStats:
     def __init__(self):
+        self.samples = collections.defaultdict(list)
+
+    def record(self, view, built, seconds, tcl_commands, created, destroyed):
+        self.samples[(view, "built" if built else "cached")].append((seconds, tcl_commands, created, destroyed))
+
+    def summary(self):
+        report = {}
+        for (view, mode), samples in sorted(self.samples.items()):
+            count = len(samples)
+            report.setdefault(view, {})[mode] = {
+                "count": count,
+                "mean_ms": round(sum(s[0] for s in samples) / count * 1000, 3),
+                "max_ms": round(max(s[0] for s in samples) * 1000, 3),
+                "mean_tcl_commands": round(sum(s[1] for s in samples) / count),
+                "widgets_created": sum(s[2] for s in samples),
+                "widgets_destroyed": sum(s[3] for s in samples)
+            }
+        return report
+
+class SchoolSystem(tk.Tk):
+    def __init__(self, data_file="school_data.json"):
         super().__init__()
         self.title("School Management System - Designed by Aniq Abbasi")
         
@@ -26,53 +2650,123 @@ class SchoolSystem(tk.Tk):
         # Add escape key binding to exit fullscreen
         self.bind("<Escape>", lambda e: self.attributes('-fullscreen', False))
         self.bind("<F11>", lambda e: self.toggle_fullscreen())
+        self.bind("<Control-Shift-D>", lambda e: self.diagnostics_window())
         
         self.is_fullscreen = True
         
-        self.data_file = "school_data.json"
+        self.data_file = data_file
         
-        # Load or Create Data
-        if os.path.exists(self.data_file):
-            with open(self.data_file, "r") as file:
-                self.data = json.load(file)
-        else:
-            self.data = {
-                "users": {},
-                "next_student_id": 1000001,
-                "results": {},
-                "login_logs": []
-            }
-            self.save_data()
-
+        # Load or Create Data - only the user index is read here, results and logs load on first use
+        self.service = SchoolService(self.data_file)
+        self.data = self.service.data
+        self.after(2000, self.poll_changes)
         self.current_user = None
+
+        # Screens are built once and swapped with tkraise; only their data-bound widgets are refreshed
+        self.view_container = tk.Frame(self, bg="#f4f6f9")
+        self.view_container.pack(fill="both", expand=True)
+        self.view_container.grid_rowconfigure(0, weight=1)
+        self.view_container.grid_columnconfigure(0, weight=1)
+        self.views = {}
+        self.cache_views = True
+        self.active_canvas = None
+        self.nav_stats = NavigationStats()
+
+        # Operation timings are written next to the data file every few minutes, changed records backed up
+        self.service.stats.start_dumps(self.service.stats_path)
+        self.service.start_backups()
+
+        # Mouse wheel is bound once and scrolls whichever dashboard is showing
+        self.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.bind_all("<Button-4>", lambda e: self.on_mousewheel(e, -1))
+        self.bind_all("<Button-5>", lambda e: self.on_mousewheel(e, 1))
         
         # First Time Admin Creation
-        if "Aniq Abbasi" not in self.data["users"]:
+        if not self.service.has_admin():
             self.first_time_admin_setup()
         else:
             self.show_login_screen()
     
+    @property
+    def analytics(self):
+        return self.service.analytics
+
+    def poll_changes(self):
+        # Other desks may save to the same files; pick up just the records they changed
+        try:
+            self.service.sync()
+        except (OSError, ValueError):
+            pass
+        self.after(2000, self.poll_changes)
+
     def toggle_fullscreen(self):
         self.is_fullscreen = not self.is_fullscreen
         self.attributes('-fullscreen', self.is_fullscreen)
     
     def save_data(self):
-        with open(self.data_file, "w") as file:
-            json.dump(self.data, file, indent=4)
-    
-    def clear_screen(self):
-        for widget in self.winfo_children():
-            widget.destroy()
+        self.service.commit()
     
-    def log_login(self, user_id, role):
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.data["login_logs"].append({"time": timestamp, "id": user_id, "role": role})
-        self.save_data()
+    def on_mousewheel(self, event, step=None):
+        if self.active_canvas is None:
+            return
+        try:
+            if event.widget.winfo_toplevel() is not self:
+                return
+        except (AttributeError, KeyError, tk.TclError):
+            return
+        self.active_canvas.yview_scroll(step if step is not None else int(-1*(event.delta/120)), "units")
+
+    def show_view(self, name, build, refresh=None):
+        started = time.perf_counter()
+        commands = int(self.tk.call("info", "cmdcount"))
+        view = self.views.get(name)
+        built = view is None or not self.cache_views
+        created = destroyed = 0
+        if built:
+            if view is not None:
+                destroyed = count_widgets(view.frame)
+                view.frame.destroy()
+            view = build()
+            self.views[name] = view
+            created = count_widgets(view.frame)
+        if refresh:
+            refresh(view)
+        view.frame.tkraise()
+        self.active_canvas = view.canvas
+        self.update_idletasks()
+        self.nav_stats.record(name, built, time.perf_counter() - started,
+                              int(self.tk.call("info", "cmdcount")) - commands, created, destroyed)
+
+    def view_frame(self):
+        frame = tk.Frame(self.view_container, bg="#f4f6f9")
+        frame.grid(row=0, column=0, sticky="nsew")
+        return frame
+
+    def scrollable_view(self):
+        frame = self.view_frame()
+        canvas = tk.Canvas(frame, bg="#f4f6f9", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=canvas.yview)
+        scrollable_frame = tk.Frame(canvas, bg="#f4f6f9")
+
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+
+        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+
+        canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        return frame, canvas, scrollable_frame
 
     # ===================== FIRST TIME SETUP =====================
     def first_time_admin_setup(self):
-        self.clear_screen()
-        main_frame = tk.Frame(self, bg="#f4f6f9")
+        self.show_view("setup", self.build_admin_setup)
+
+    def build_admin_setup(self):
+        view = self.view_frame()
+        main_frame = tk.Frame(view, bg="#f4f6f9")
         main_frame.pack(expand=True)
 
         tk.Label(main_frame, text="SCHOOL MANAGEMENT SYSTEM", font=("Helvetica", 32, "bold"), bg="#f4f6f9", fg="#2c3e50").pack(pady=80)
@@ -83,25 +2777,38 @@ class SchoolSystem(tk.Tk):
         tk.Label(main_frame, text="Password: Abbasi984", font=("Arial", 20, "bold"), bg="#f4f6f9", fg="#27ae60").pack(pady=10)
 
         def create_admin_account():
-            self.data["users"]["Aniq Abbasi"] = {
-                "role": "admin",
-                "name": "Aniq Abbasi",
-                "password": hashlib.sha256("Abbasi984".encode()).hexdigest(),
-                "hint": "My name + 984"
-            }
-            self.save_data()
+            self.service.create_admin()
             messagebox.showinfo("Success", "Admin Account Created Successfully!\n\nYou can now login.")
             self.show_login_screen()
 
         tk.Button(main_frame, text="CREATE ADMIN & CONTINUE", font=("Arial", 18, "bold"), bg="#27ae60", fg="white", width=35, height=2,
                  command=create_admin_account).pack(pady=70)
         
-        self.credit_label()
+        self.credit_label(view)
+        return CachedView(view)
 
     # ===================== LOGIN SCREEN =====================
     def show_login_screen(self):
-        self.clear_screen()
-        frame = tk.Frame(self, bg="#f4f6f9")
+        self.current_user = None
+        self.close_user_windows()
+        self.show_view("login", self.build_login_screen, self.refresh_login_screen)
+
+    def close_user_windows(self):
+        # The service does no role checks of its own, so nothing opened by the last user may
+        # outlive the logout: their windows are destroyed and the cached dashboards forget them
+        for child in self.winfo_children():
+            if isinstance(child, tk.Toplevel):
+                child.destroy()
+        for view in self.views.values():
+            if hasattr(view, "name_label"):
+                view.name_label.config(text="")
+            if hasattr(view, "term_combo"):
+                view.term_var.set("")
+                view.term_combo.config(values=[])
+
+    def build_login_screen(self):
+        view = self.view_frame()
+        frame = tk.Frame(view, bg="#f4f6f9")
         frame.pack(expand=True)
 
         tk.Label(frame, text="SCHOOL MANAGEMENT SYSTEM", font=("Helvetica", 32, "bold"), bg="#f4f6f9", fg="#2c3e50").pack(pady=90)
@@ -109,12 +2816,10 @@ class SchoolSystem(tk.Tk):
         tk.Label(frame, text="User ID", font=("Arial", 18), bg="#f4f6f9").pack(pady=(40,10))
         self.entry_id = tk.Entry(frame, font=("Arial", 18), width=38, justify="center", relief="solid", bd=2)
         self.entry_id.pack()
-        self.entry_id.insert(0, "Aniq Abbasi")
 
         tk.Label(frame, text="Password", font=("Arial", 18), bg="#f4f6f9").pack(pady=(30,10))
         self.entry_pass = tk.Entry(frame, font=("Arial", 18), width=38, show="*", justify="center", relief="solid", bd=2)
         self.entry_pass.pack()
-        self.entry_pass.insert(0, "Abbasi984")
 
         btn_frame = tk.Frame(frame, bg="#f4f6f9")
         btn_frame.pack(pady=50)
@@ -124,65 +2829,50 @@ class SchoolSystem(tk.Tk):
         tk.Button(btn_frame, text="Forgot Password?", font=("Arial", 12), bg="#e74c3c", fg="white",
                  command=self.forgot_password).pack()
 
-        self.credit_label()
+        self.credit_label(view)
+        return CachedView(view)
+
+    def refresh_login_screen(self, view):
+        self.entry_id.delete(0, tk.END)
+        self.entry_id.insert(0, "Aniq Abbasi")
+        self.entry_pass.delete(0, tk.END)
+        self.entry_pass.insert(0, "Abbasi984")
 
     def login(self):
         uid = self.entry_id.get().strip()
-        pwd = hashlib.sha256(self.entry_pass.get().encode()).hexdigest()
-
-        if uid in self.data["users"] and self.data["users"][uid]["password"] == pwd:
-            self.current_user = uid
-            role = self.data["users"][uid]["role"]
-            self.log_login(uid, role)
-            if role == "admin":
-                self.admin_dashboard()
-            elif role == "teacher":
-                self.teacher_dashboard()
-            elif role == "student":
-                self.student_dashboard()
-        else:
-            messagebox.showerror("Login Failed", "Invalid User ID or Password")
+        try:
+            role = self.service.login(uid, self.entry_pass.get())
+        except ServiceError as e:
+            messagebox.showerror("Login Failed", str(e))
+            return
+
+        self.current_user = uid
+        if role == "admin":
+            self.admin_dashboard()
+        elif role == "teacher":
+            self.teacher_dashboard()
+        elif role == "student":
+            self.student_dashboard()
 
     def forgot_password(self):
         uid = simpledialog.askstring("Password Hint", "Enter your User ID:")
-        if uid and uid in self.data["users"]:
-            hint = self.data["users"][uid].get("hint", "No hint set")
-            messagebox.showinfo("Password Hint", f"Hint: {hint}")
-        else:
+        try:
+            hint = self.service.password_hint(uid)
+        except ServiceError:
             messagebox.showerror("Error", "User ID not found")
+            return
+        messagebox.showinfo("Password Hint", f"Hint: {hint}")
 
-    def credit_label(self):
-        tk.Label(self, text="This Program is designed by Aniq Abbasi | Press F11 to toggle fullscreen | ESC to exit fullscreen", 
+    def credit_label(self, parent):
+        tk.Label(parent, text="This Program is designed by Aniq Abbasi | Press F11 to toggle fullscreen | ESC to exit fullscreen", 
                  font=("Arial", 11), fg="gray", bg="#f4f6f9").pack(side="bottom", pady=20)
 
     # ===================== ADMIN DASHBOARD =====================
     def admin_dashboard(self):
-        self.clear_screen()
-        
-        # Create scrollable canvas
-        canvas = tk.Canvas(self, bg="#f4f6f9", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg="#f4f6f9")
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Enable mousewheel scrolling
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        
-        # Bind mouse wheel for Linux
-        canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
-        canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
+        self.show_view("admin", self.build_admin_dashboard, lambda view: view.canvas.yview_moveto(0))
 
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+    def build_admin_dashboard(self):
+        view, canvas, scrollable_frame = self.scrollable_view()
         
         tk.Label(scrollable_frame, text="ADMIN DASHBOARD", font=("Helvetica", 28, "bold"), bg="#f4f6f9", fg="#2c3e50").pack(pady=60)
         tk.Label(scrollable_frame, text="Welcome Aniq Abbasi", font=("Arial", 18), bg="#f4f6f9").pack(pady=10)
@@ -193,6 +2883,7 @@ class SchoolSystem(tk.Tk):
             ("Manage Teachers", self.manage_teachers),
             ("Manage Students", self.manage_students),
             ("View Login Activity", self.view_login_logs),
+            ("Bulk Import / Export (CSV)", self.bulk_transfer_window),
             ("Change Admin Password", self.change_admin_password),
             ("Logout", self.show_login_screen)
         ]
@@ -206,6 +2897,7 @@ class SchoolSystem(tk.Tk):
 
         tk.Label(scrollable_frame, text="This Program is designed by Aniq Abbasi | Press F11 to toggle fullscreen | ESC to exit fullscreen", 
                  font=("Arial", 11), fg="gray", bg="#f4f6f9").pack(side="bottom", pady=40)
+        return CachedView(view, canvas)
 
     def register_teacher(self):
         win = tk.Toplevel(self)
@@ -236,28 +2928,12 @@ class SchoolSystem(tk.Tk):
         hint_entry.pack()
 
         def save_teacher():
-            name = name_entry.get().strip()
-            if not name:
-                messagebox.showerror("Error", "Name is required")
-                return
-            teacher_id = f"{name.replace(' ', '').lower()}-2026-01-Teacher"
-            if teacher_id in self.data["users"]:
-                messagebox.showerror("Error", "Teacher already exists")
-                return
             password = pw_entry.get()
-            if len(password) < 6:
-                messagebox.showerror("Error", "Password must be 6+ characters")
+            try:
+                teacher_id = self.service.register_teacher(name_entry.get().strip(), doj_entry.get(), password, hint_entry.get().strip())
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
                 return
-
-            self.data["users"][teacher_id] = {
-                "role": "teacher",
-                "name": name,
-                "doj": doj_entry.get(),
-                "password": hashlib.sha256(password.encode()).hexdigest(),
-                "hint": hint_entry.get().strip() or "No hint",
-                "classes": {}
-            }
-            self.save_data()
             messagebox.showinfo("Success", f"Teacher Registered Successfully!\n\nID: {teacher_id}\nPassword: {password}")
             win.destroy()
 
@@ -297,28 +2973,13 @@ class SchoolSystem(tk.Tk):
         hint_entry.pack()
 
         def save_student():
-            name = name_entry.get().strip()
-            cls = class_entry.get().strip()
-            if not name or not cls or not cls.isdigit() or int(cls) not in range(1,13):
-                messagebox.showerror("Error", "Valid name and class (1-12) required")
-                return
-            student_id = f"{name.replace(' ', '').lower()}-{self.data['next_student_id']}"
-            self.data["next_student_id"] += 1
             password = pw_entry.get()
-            if len(password) < 6:
-                messagebox.showerror("Error", "Password too short")
+            try:
+                student_id = self.service.register_student(name_entry.get().strip(), class_entry.get().strip(), doj_entry.get(),
+                                                           password, hint_entry.get().strip())
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
                 return
-
-            self.data["users"][student_id] = {
-                "role": "student",
-                "name": name,
-                "class": cls,
-                "doj": doj_entry.get(),
-                "password": hashlib.sha256(password.encode()).hexdigest(),
-                "hint": hint_entry.get().strip() or "No hint"
-            }
-            self.data["results"][student_id] = {}
-            self.save_data()
             messagebox.showinfo("Success", f"Student Registered!\n\nID: {student_id}\nPassword: {password}")
             win.destroy()
 
@@ -330,29 +2991,28 @@ class SchoolSystem(tk.Tk):
         win.title("Manage Teachers")
         win.geometry("1000x650")
 
-        tree = ttk.Treeview(win, columns=("ID", "Name", "DOJ"), show="headings")
-        tree.heading("ID", text="Teacher ID")
-        tree.heading("Name", text="Name")
-        tree.heading("DOJ", text="Date of Joining")
-        tree.column("ID", width=350)
-        tree.column("Name", width=300)
-        tree.column("DOJ", width=200)
-        tree.pack(fill="both", expand=True, padx=30, pady=30)
-
-        def refresh():
-            tree.delete(*tree.get_children())
-            for uid, info in self.data["users"].items():
-                if info["role"] == "teacher":
-                    tree.insert("", "end", values=(uid, info["name"], info["doj"]))
+        def teacher_row(uid):
+            info = self.data["users"].get(uid)
+            return (uid, info["name"], info["doj"]) if info else None
 
-        refresh()
+        source = PagedRowSource(
+            ("ID", "Name", "DOJ"),
+            lambda: [uid for uid, info in self.data["users"].items() if info["role"] == "teacher"],
+            teacher_row,
+            search=lambda query: self.service.search_users(query, role="teacher"),
+            stats=self.service.stats, name="teachers")
+        view = VirtualTreeview(win, source, ("Teacher ID", "Name", "Date of Joining"), (350, 300, 200))
+        attach_search_box(win, view, "Search ID / Name:")
+        view.pack(fill="both", expand=True, padx=30, pady=30)
+        refresh = view.refresh
 
         def delete_teacher():
-            selected = tree.selection()
-            if selected and messagebox.askyesno("Confirm", "Delete this teacher permanently?"):
-                uid = tree.item(selected[0])["values"][0]
-                del self.data["users"][uid]
-                self.save_data()
+            uid = view.selected_key()
+            if uid and messagebox.askyesno("Confirm", "Delete this teacher permanently?"):
+                try:
+                    self.service.delete_user(uid)
+                except ServiceError as e:
+                    messagebox.showerror("Error", str(e), parent=win)
                 refresh()
 
         btn_frame = tk.Frame(win)
@@ -365,32 +3025,28 @@ class SchoolSystem(tk.Tk):
         win.title("Manage Students")
         win.geometry("1000x650")
 
-        tree = ttk.Treeview(win, columns=("ID", "Name", "Class", "DOJ"), show="headings")
-        tree.heading("ID", text="Student ID")
-        tree.heading("Name", text="Name")
-        tree.heading("Class", text="Class")
-        tree.heading("DOJ", text="Date of Joining")
-        tree.column("ID", width=350)
-        tree.column("Name", width=250)
-        tree.column("Class", width=100)
-        tree.column("DOJ", width=200)
-        tree.pack(fill="both", expand=True, padx=30, pady=30)
+        def student_row(uid):
+            info = self.data["users"].get(uid)
+            return (uid, info["name"], info["class"], info["doj"]) if info else None
 
-        def refresh():
-            tree.delete(*tree.get_children())
-            for uid, info in self.data["users"].items():
-                if info["role"] == "student":
-                    tree.insert("", "end", values=(uid, info["name"], info["class"], info["doj"]))
-
-        refresh()
+        source = PagedRowSource(
+            ("ID", "Name", "Class", "DOJ"),
+            lambda: [uid for uid, info in self.data["users"].items() if info["role"] == "student"],
+            student_row,
+            search=lambda query: self.service.search_users(query, role="student"),
+            stats=self.service.stats, name="students")
+        view = VirtualTreeview(win, source, ("Student ID", "Name", "Class", "Date of Joining"), (350, 250, 100, 200))
+        attach_search_box(win, view, "Search ID / Name / Class:")
+        view.pack(fill="both", expand=True, padx=30, pady=30)
+        refresh = view.refresh
 
         def delete_student():
-            selected = tree.selection()
-            if selected and messagebox.askyesno("Confirm", "Delete student and all results?"):
-                uid = tree.item(selected[0])["values"][0]
-                self.data["users"].pop(uid, None)
-                self.data["results"].pop(uid, None)
-                self.save_data()
+            uid = view.selected_key()
+            if uid and messagebox.askyesno("Confirm", "Delete student and all results?"):
+                try:
+                    self.service.delete_user(uid)
+                except ServiceError as e:
+                    messagebox.showerror("Error", str(e), parent=win)
                 refresh()
 
         btn_frame = tk.Frame(win)
@@ -403,59 +3059,176 @@ class SchoolSystem(tk.Tk):
         win.title("Login Activity Log")
         win.geometry("900x600")
 
-        tree = ttk.Treeview(win, columns=("Time", "User ID", "Role"), show="headings")
-        tree.heading("Time", text="Login Time")
-        tree.heading("User ID", text="User ID")
-        tree.heading("Role", text="Role")
-        tree.column("Time", width=250)
-        tree.column("User ID", width=400)
-        tree.column("Role", width=150)
-        tree.pack(fill="both", expand=True, padx=30, pady=30)
+        logs = self.data["login_logs"]
+
+        def log_row(index):
+            log = logs[index]
+            return (log["time"], log["id"], log["role"])
+
+        # Newest first, the full history is available by scrolling
+        source = PagedRowSource(
+            ("Time", "User ID", "Role"),
+            lambda: range(len(logs) - 1, -1, -1),
+            log_row,
+            search_columns=("Time", "User ID", "Role"),
+            stats=self.service.stats, name="login logs")
+        view = VirtualTreeview(win, source, ("Login Time", "User ID", "Role"), (250, 400, 150))
+        attach_search_box(win, view, "Search Time / User ID / Role:")
+        view.pack(fill="both", expand=True, padx=30, pady=30)
+
+    def bulk_transfer_window(self):
+        win = tk.Toplevel(self)
+        win.title("Bulk Import / Export")
+        win.geometry("700x760")
+        win.configure(bg="#f4f6f9")
+
+        tk.Label(win, text="BULK IMPORT / EXPORT", font=("Helvetica", 20, "bold"), bg="#f4f6f9").pack(pady=30)
+        tk.Label(win, text="Students: name,class,doj,password,hint\nTeachers: name,doj,password,hint\n"
+                           "Results: student_id,term,subject,total,obtained,remarks",
+                 font=("Arial", 11), fg="gray", bg="#f4f6f9", justify="left").pack(pady=(0, 20))
+
+        transfer = self.service.bulk_transfer()
+
+        def run_import(kind):
+            path = filedialog.askopenfilename(parent=win, title=f"Import {kind}", filetypes=[("CSV files", "*.csv")])
+            if not path:
+                return
+            try:
+                report = getattr(transfer, f"import_{kind}")(path)
+            except (OSError, ValueError, csv.Error, ServiceError) as e:
+                messagebox.showerror("Import Failed", str(e), parent=win)
+                return
+
+            summary = (f"Rows read: {report['rows']}\nImported: {report['imported']}\n"
+                       f"Errors: {len(report['errors'])}\n"
+                       f"Time: {report['seconds']}s ({report['rows_per_second']} rows/sec)")
+            if report["errors"]:
+                summary += "\n\n" + "\n".join(f"Line {line}: {msg}" for line, msg in report["errors"][:15])
+                if len(report["errors"]) > 15:
+                    summary += f"\n... and {len(report['errors']) - 15} more"
+            if report["created"]:
+                cred_path = os.path.splitext(path)[0] + "_credentials.csv"
+                transfer.write_credentials(cred_path, report["created"])
+                summary += f"\n\nNew IDs and passwords saved to:\n{cred_path}"
+            messagebox.showinfo("Import Complete", summary, parent=win)
+
+        def run_export(kind):
+            path = filedialog.asksaveasfilename(parent=win, title=f"Export {kind}", defaultextension=".csv",
+                                                initialfile=f"{kind}.csv", filetypes=[("CSV files", "*.csv")])
+            if not path:
+                return
+            try:
+                report = getattr(transfer, f"export_{kind}")(path)
+            except OSError as e:
+                messagebox.showerror("Export Failed", str(e), parent=win)
+                return
+            messagebox.showinfo("Export Complete", f"Rows written: {report['rows']}\n"
+                                f"Time: {report['seconds']}s ({report['rows_per_second']} rows/sec)", parent=win)
+
+        for kind in ("students", "teachers", "results"):
+            row = tk.Frame(win, bg="#f4f6f9")
+            row.pack(pady=12)
+            tk.Button(row, text=f"Import {kind.title()}", font=("Arial", 14), width=22, bg="#27ae60", fg="white",
+                     command=lambda k=kind: run_import(k)).pack(side="left", padx=10)
+            tk.Button(row, text=f"Export {kind.title()}", font=("Arial", 14), width=22, bg="#3498db", fg="white",
+                     command=lambda k=kind: run_export(k)).pack(side="left", padx=10)
+
+        def run_report_cards():
+            folder = filedialog.askdirectory(parent=win, title="Folder for Report Cards")
+            if not folder:
+                return
+            win.config(cursor="watch")
+            win.update_idletasks()
+            try:
+                report = transfer.export_report_cards(folder)
+            except (OSError, concurrent.futures.BrokenExecutor) as e:
+                messagebox.showerror("Export Failed", str(e), parent=win)
+                return
+            finally:
+                win.config(cursor="")
+            messagebox.showinfo("Export Complete", f"Report cards written: {report['rows']}\n"
+                                f"Time: {report['seconds']}s ({report['rows_per_second']} per sec)\n\n"
+                                f"Print all of them from:\n{os.path.join(folder, 'all_report_cards.html')}", parent=win)
+
+        tk.Button(win, text="Export Report Cards (HTML)", font=("Arial", 14), width=47, bg="#8e44ad", fg="white",
+                 command=run_report_cards).pack(pady=(20, 12))
+
+    # Hidden admin view (Ctrl+Shift+D): operation latencies, payload sizes and the slow log
+    def diagnostics_window(self):
+        if self.current_user != ADMIN_ID:
+            return
+        stats = self.service.stats
+        win = tk.Toplevel(self)
+        win.title("Diagnostics")
+        win.geometry("1150x700")
+
+        columns = ("Operation", "Count", "Mean ms", "p50 ms", "p95 ms", "Max ms", "Avg bytes", "Avg records", "Slow")
+        tree = ttk.Treeview(win, columns=columns, show="headings", height=12)
+        for col, width in zip(columns, (220, 80, 100, 90, 90, 100, 120, 110, 70)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor="w" if col == "Operation" else "e")
+        tree.pack(fill="x", padx=30, pady=(30, 10))
+
+        tk.Label(win, text="Slow operations (newest last)", font=("Arial", 12, "bold")).pack(anchor="w", padx=30)
+        slow_box = tk.Text(win, height=12, font=("Courier", 10))
+        slow_box.pack(fill="both", expand=True, padx=30, pady=10)
+
+        def refresh():
+            snapshot = stats.snapshot()
+            tree.delete(*tree.get_children())
+            for name, op in snapshot["operations"].items():
+                tree.insert("", "end", values=(name, op["count"], op["mean_ms"], op["p50_ms"], op["p95_ms"], op["max_ms"],
+                                               op["mean_payload_bytes"], op["mean_records"], op["slow"]))
+            slow_box.delete("1.0", tk.END)
+            slow_box.insert(tk.END, "\n".join(f"{e['time']}  {e['operation']:<22} {e['ms']:>9} ms  {e['payload_bytes']:>10} B  {e['records']} records"
+                                              for e in snapshot["recent_slow"]))
+
+        def dump():
+            try:
+                stats.dump(self.service.stats_path)
+            except OSError as e:
+                messagebox.showerror("Error", str(e), parent=win)
+                return
+            messagebox.showinfo("Saved", f"Statistics written to:\n{os.path.abspath(self.service.stats_path)}", parent=win)
+
+        def reset():
+            stats.reset()
+            refresh()
 
-        for log in reversed(self.data["login_logs"][-100:]):
-            tree.insert("", "end", values=(log["time"], log["id"], log["role"]))
+        btn_frame = tk.Frame(win)
+        btn_frame.pack(pady=15)
+        tk.Button(btn_frame, text="Refresh", bg="#3498db", fg="white", width=18, command=refresh).pack(side="left", padx=15)
+        tk.Button(btn_frame, text="Write JSON Now", bg="#27ae60", fg="white", width=18, command=dump).pack(side="left", padx=15)
+        tk.Button(btn_frame, text="Reset", bg="#e74c3c", fg="white", width=18, command=reset).pack(side="left", padx=15)
+        refresh()
 
     def change_admin_password(self):
         new_pw = simpledialog.askstring("Change Password", "Enter new admin password:", show="*")
-        if new_pw and len(new_pw) >= 6:
-            self.data["users"]["Aniq Abbasi"]["password"] = hashlib.sha256(new_pw.encode()).hexdigest()
-            self.save_data()
-            messagebox.showinfo("Success", "Admin password updated successfully")
-        elif new_pw:
-            messagebox.showerror("Error", "Password must be at least 6 characters")
+        if not new_pw:
+            return
+        try:
+            self.service.change_password(ADMIN_ID, new_pw)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Success", "Admin password updated successfully")
 
     # ===================== TEACHER DASHBOARD =====================
     def teacher_dashboard(self):
-        self.clear_screen()
-        
-        # Create scrollable canvas
-        canvas = tk.Canvas(self, bg="#f4f6f9", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg="#f4f6f9")
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        self.show_view("teacher", self.build_teacher_dashboard, self.refresh_teacher_dashboard)
 
-        # Enable mousewheel scrolling
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+    def build_teacher_dashboard(self):
+        view, canvas, scrollable_frame = self.scrollable_view()
         
-        name = self.data["users"][self.current_user]["name"]
-        tk.Label(scrollable_frame, text=f"WELCOME TEACHER\n{name.upper()}", font=("Helvetica", 26, "bold"), bg="#f4f6f9", fg="#2c3e50").pack(pady=80)
+        name_label = tk.Label(scrollable_frame, font=("Helvetica", 26, "bold"), bg="#f4f6f9", fg="#2c3e50")
+        name_label.pack(pady=80)
 
         tk.Button(scrollable_frame, text="Manage Classes & Subjects", font=("Arial", 16), width=50, height=3, bg="#3498db", fg="white",
                  command=self.manage_teacher_classes).pack(pady=20)
         tk.Button(scrollable_frame, text="Enter Student Results", font=("Arial", 16), width=50, height=3, bg="#27ae60", fg="white",
                  command=self.enter_student_results).pack(pady=20)
+        tk.Button(scrollable_frame, text="Class Statistics & Toppers", font=("Arial", 16), width=50, height=3, bg="#8e44ad", fg="white",
+                 command=self.class_statistics).pack(pady=20)
         tk.Button(scrollable_frame, text="Change My Password", font=("Arial", 16), width=50, height=3, bg="#f39c12", fg="white",
                  command=self.change_own_password).pack(pady=20)
         tk.Button(scrollable_frame, text="Delete My Account", font=("Arial", 16), width=50, height=3, bg="#e74c3c", fg="white",
@@ -465,6 +3238,12 @@ class SchoolSystem(tk.Tk):
 
         tk.Label(scrollable_frame, text="This Program is designed by Aniq Abbasi | Press F11 to toggle fullscreen | ESC to exit fullscreen", 
                  font=("Arial", 11), fg="gray", bg="#f4f6f9").pack(side="bottom", pady=40)
+        return CachedView(view, canvas, name_label=name_label)
+
+    def refresh_teacher_dashboard(self, view):
+        name = self.data["users"][self.current_user]["name"]
+        view.name_label.config(text=f"WELCOME TEACHER\n{name.upper()}")
+        view.canvas.yview_moveto(0)
 
     def manage_teacher_classes(self):
         win = tk.Toplevel(self)
@@ -472,7 +3251,7 @@ class SchoolSystem(tk.Tk):
         win.geometry("1100x800")
         win.configure(bg="#f4f6f9")
 
-        classes = self.data["users"][self.current_user].setdefault("classes", {})
+        classes = self.service.teacher_classes(self.current_user)
 
         # Scrollable Canvas
         canvas = tk.Canvas(win, bg="#f4f6f9", highlightthickness=0)
@@ -506,7 +3285,7 @@ class SchoolSystem(tk.Tk):
                 header.pack(fill="x", padx=20, pady=15)
                 tk.Label(header, text=f"CLASS {cls}", font=("Arial", 22, "bold"), bg="white", fg="#2c3e50").pack(side="left")
                 tk.Button(header, text="Delete Class", font=("Arial", 12), bg="#e74c3c", fg="white",
-                         command=lambda c=cls: (classes.pop(c, None), self.save_data(), refresh())).pack(side="right")
+                         command=lambda c=cls: (self.service.remove_class(self.current_user, c), refresh())).pack(side="right")
 
                 subjects_container = tk.Frame(class_box, bg="white")
                 subjects_container.pack(fill="x", padx=50, pady=20)
@@ -517,7 +3296,7 @@ class SchoolSystem(tk.Tk):
                         subj_row.pack(fill="x", pady=8, padx=20)
                         tk.Label(subj_row, text="• " + subject, font=("Arial", 16), bg="#ecf0f1").pack(side="left", padx=20)
                         tk.Button(subj_row, text="Remove Subject", bg="#c0392b", fg="white",
-                                 command=lambda c=cls, s=subject: (classes[c].remove(s), self.save_data(), refresh())).pack(side="right", padx=20)
+                                 command=lambda c=cls, s=subject: (self.service.remove_subject(self.current_user, c, s), refresh())).pack(side="right", padx=20)
                 else:
                     tk.Label(subjects_container, text="No subjects added to this class", font=("Arial", 14), fg="gray").pack(pady=30)
 
@@ -532,15 +3311,13 @@ class SchoolSystem(tk.Tk):
         def add_subject(cls):
             subject = simpledialog.askstring("Add Subject", f"Enter subject name for Class {cls}:")
             if subject and subject.strip() and subject.strip() not in classes[cls]:
-                classes[cls].append(subject.strip())
-                self.save_data()
+                self.service.add_subject(self.current_user, cls, subject)
                 refresh()
 
         def add_new_class():
             cls = simpledialog.askstring("Add Class", "Enter class number (1-12):")
             if cls and cls.isdigit() and 1 <= int(cls) <= 12 and cls not in classes:
-                classes[cls] = []
-                self.save_data()
+                self.service.add_class(self.current_user, cls)
                 refresh()
             elif cls and cls in classes:
                 messagebox.showwarning("Exists", "This class is already added")
@@ -571,7 +3348,7 @@ class SchoolSystem(tk.Tk):
             for widget in win.winfo_children()[4:]:
                 widget.destroy()
 
-            terms = ["1st term", "2nd term", "finalterm"] if int(selected_class) <= 8 else ["1st term", "Sendups", "Preboard", "finalterm"]
+            terms = terms_for_class(selected_class)
             tk.Label(win, text="Select Term:", font=("Arial", 16)).pack(pady=(40,10))
             term_var = tk.StringVar()
             term_combo = ttk.Combobox(win, textvariable=term_var, values=terms, state="readonly", width=30, font=("Arial", 14))
@@ -580,6 +3357,9 @@ class SchoolSystem(tk.Tk):
             tk.Label(win, text="Enter Student ID:", font=("Arial", 16)).pack(pady=(40,10))
             student_id_entry = tk.Entry(win, width=50, font=("Arial", 14))
             student_id_entry.pack(pady=10)
+            attach_suggestions(student_id_entry, lambda query: [
+                (uid, f"{self.data['users'][uid]['name']}  ({uid})")
+                for uid in self.service.search_users(query, role="student", cls=selected_class, limit=8)])
 
             def open_result_entry():
                 student_id = student_id_entry.get().strip()
@@ -617,33 +3397,14 @@ class SchoolSystem(tk.Tk):
                 remarks_box.pack(pady=10, padx=80)
 
                 def save_result():
-                    result_data = {"class": selected_class, "subjects": {}, "overall": {}}
-                    total_max = total_obtained = 0
-
-                    for subject, (t_entry, o_entry) in entries.items():
-                        try:
-                            total = int(t_entry.get())
-                            obtained = int(o_entry.get())
-                            if obtained > total:
-                                messagebox.showerror("Error", f"Obtained marks cannot exceed total in {subject}")
-                                return
-                            result_data["subjects"][subject] = {"total": total, "obtained": obtained}
-                            total_max += total
-                            total_obtained += obtained
-                        except ValueError:
-                            messagebox.showerror("Error", "Please enter valid numbers for marks")
-                            return
-
-                    percentage = round((total_obtained / total_max) * 100, 2) if total_max > 0 else 0
-                    result_data["overall"] = {
-                        "total": total_max,
-                        "obtained": total_obtained,
-                        "percentage": percentage,
-                        "remarks": remarks_box.get("1.0", tk.END).strip()
-                    }
+                    marks = {subject: (t_entry.get(), o_entry.get()) for subject, (t_entry, o_entry) in entries.items()}
+                    try:
+                        self.service.save_result(self.current_user, student_id, selected_class, term, marks,
+                                                 remarks_box.get("1.0", tk.END).strip())
+                    except ServiceError as e:
+                        messagebox.showerror("Error", str(e))
+                        return
 
-                    self.data["results"].setdefault(student_id, {})[term] = result_data
-                    self.save_data()
                     messagebox.showinfo("Success", "Result has been saved successfully!")
                     result_win.destroy()
 
@@ -651,102 +3412,701 @@ class SchoolSystem(tk.Tk):
                          command=save_result).pack(pady=50)
 
             tk.Button(win, text="Proceed to Enter Marks", font=("Arial", 16, "bold"), bg="#27ae60", fg="white", width=40, height=2,
-                     command=open_result_entry).pack(pady=60)
+                     command=open_result_entry).pack(pady=(40, 10))
+
+            def open_class_grid():
+                if not term_var.get():
+                    messagebox.showerror("Error", "Please select a term first", parent=win)
+                    return
+                self.class_result_grid(selected_class, term_var.get())
+
+            tk.Button(win, text="Enter Whole Class (Grid)", font=("Arial", 16, "bold"), bg="#8e44ad", fg="white", width=40, height=2,
+                     command=open_class_grid).pack(pady=10)
 
         tk.Button(win, text="Next Step", font=("Arial", 16, "bold"), bg="#3498db", fg="white", width=30, command=proceed_to_term).pack(pady=30)
 
+    def class_result_grid(self, cls, term):
+        subjects = self.service.teacher_classes(self.current_user).get(cls, [])
+        if not subjects:
+            messagebox.showerror("No Subjects", f"Please add subjects to Class {cls} first")
+            return
+        students = sorted(self.service.class_students(cls), key=lambda s: (s[1].lower(), s[0]))
+        if not students:
+            messagebox.showerror("No Students", f"No students are registered in Class {cls}")
+            return
+
+        # Pre-fill marks that were already entered for this term
+        values, totals = {}, {}
+        for student_id, _ in students:
+            existing = self.data["results"].get(student_id, {}).get(term)
+            if existing:
+                for subject, marks in existing["subjects"].items():
+                    values[(student_id, subject)] = str(marks["obtained"])
+                    totals.setdefault(subject, str(marks["total"]))
+                if existing["overall"].get("remarks"):
+                    values[(student_id, ResultGrid.REMARKS)] = existing["overall"]["remarks"]
+
+        win = tk.Toplevel(self)
+        win.title(f"Class {cls} - {term} - Result Grid")
+        win.geometry("1250x800")
+        tk.Label(win, text=f"Class {cls} - {term}  ({len(students)} students)", font=("Arial", 20, "bold")).pack(pady=20)
+        tk.Label(win, text="Leave a row empty to skip that student. Up/Down arrows move between rows.", font=("Arial", 11), fg="gray").pack()
+
+        grid = ResultGrid(win, students, subjects, values, totals)
+        grid.pack(fill="both", expand=True, padx=30, pady=20)
+
+        def save_all():
+            rows = grid.filled_rows()
+            if not rows:
+                messagebox.showwarning("Nothing to Save", "No marks have been entered", parent=win)
+                return
+            try:
+                errors = self.service.save_results_batch(self.current_user, cls, term, rows)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e), parent=win)
+                return
+            if errors:
+                names = dict(students)
+                first = next(iter(errors))
+                grid.scroll_to(first)
+                messagebox.showerror("Nothing Saved", f"{len(errors)} row(s) need fixing:\n\n" +
+                                     "\n".join(f"{names.get(sid, sid)}: {msg}" for sid, msg in list(errors.items())[:10]), parent=win)
+                return
+            messagebox.showinfo("Success", f"Results saved for {len(rows)} students", parent=win)
+            win.destroy()
+
+        tk.Button(win, text="SAVE ALL RESULTS", font=("Arial", 18, "bold"), bg="#27ae60", fg="white", width=40, height=2,
+                 command=save_all).pack(pady=20)
+
+    def class_statistics(self):
+        classes = self.data["users"][self.current_user].get("classes", {})
+        if not classes:
+            messagebox.showerror("No Classes", "Please add classes first in 'Manage Classes & Subjects'")
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Class Statistics & Toppers")
+        win.geometry("1100x750")
+
+        tk.Label(win, text="Class Statistics & Toppers", font=("Arial", 20, "bold")).pack(pady=30)
+        picker = tk.Frame(win)
+        picker.pack(pady=10)
+        tk.Label(picker, text="Class:", font=("Arial", 14)).pack(side="left")
+        class_var = tk.StringVar()
+        class_combo = ttk.Combobox(picker, textvariable=class_var, values=sorted(classes.keys(), key=int), state="readonly", width=8, font=("Arial", 14))
+        class_combo.pack(side="left", padx=10)
+        tk.Label(picker, text="Term:", font=("Arial", 14)).pack(side="left", padx=(20, 0))
+        term_var = tk.StringVar()
+        term_combo = ttk.Combobox(picker, textvariable=term_var, state="readonly", width=15, font=("Arial", 14))
+        term_combo.pack(side="left", padx=10)
+
+        tree = ttk.Treeview(win, columns=("Subject", "Count", "Mean", "Min", "Max", "Topper"), show="headings")
+        for col, width in (("Subject", 200), ("Count", 80), ("Mean", 100), ("Min", 100), ("Max", 100), ("Topper", 350)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width)
+        tree.pack(fill="both", expand=True, padx=40, pady=20)
+        toppers_label = tk.Label(win, text="", font=("Arial", 14), justify="left")
+        toppers_label.pack(pady=(0, 10))
+        histogram_label = tk.Label(win, text="", font=("Courier", 12), justify="left")
+        histogram_label.pack(pady=(0, 20))
+
+        def on_class(event=None):
+            term_combo["values"] = terms_for_class(class_var.get())
+            term_var.set("")
+            show()
+
+        def show(event=None):
+            tree.delete(*tree.get_children())
+            toppers_label.config(text="")
+            histogram_label.config(text="")
+            cls, term = class_var.get(), term_var.get()
+            if not cls or not term:
+                return
+            users = self.data["users"]
+            for subject in [OVERALL] + self.analytics.subjects(cls, term):
+                stats = self.analytics.stats(cls, term, subject)
+                top = self.analytics.toppers(cls, term, 1, subject)
+                topper = f"{users.get(top[0][0], {}).get('name', top[0][0])} ({top[0][1]}%)" if top else "-"
+                tree.insert("", "end", values=("OVERALL" if subject == OVERALL else subject, stats["count"],
+                                               stats["mean"], stats["min"], stats["max"], topper))
+
+            toppers = self.analytics.toppers(cls, term, 3)
+            toppers_label.config(text="Top 3: " + "   ".join(f"{i}. {users.get(sid, {}).get('name', sid)} ({score}%)" for i, (sid, score) in enumerate(toppers, 1))
+                                 if toppers else "No results entered for this class and term yet")
+            histogram = self.analytics.stats(cls, term)["histogram"]
+            step = 100 // HISTOGRAM_BUCKETS
+            histogram_label.config(text="\n".join(f"{i * step:>3}-{i * step + step - 1 if i < HISTOGRAM_BUCKETS - 1 else 100:<3}% | {'#' * min(count, 60)} {count}"
+                                                  for i, count in enumerate(histogram)) if toppers else "")
+
+        class_combo.bind("<<ComboboxSelected>>", on_class)
+        term_combo.bind("<<ComboboxSelected>>", show)
+
     def student_dashboard(self):
-        self.clear_screen()
+        self.show_view("student", self.build_student_dashboard, self.refresh_student_dashboard)
+
+    def build_student_dashboard(self):
+        view, canvas, scrollable_frame = self.scrollable_view()
         
-        # Create scrollable canvas
-        canvas = tk.Canvas(self, bg="#f4f6f9", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(self, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg="#f4f6f9")
+        name_label = tk.Label(scrollable_frame, font=("Helvetica", 26, "bold"), bg="#f4f6f9")
+        name_label.pack(pady=80)
 
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        # Only one of these two is shown, depending on whether the student has results yet
+        results_frame = tk.Frame(scrollable_frame, bg="#f4f6f9")
+        results_frame.pack()
+        no_results = tk.Label(results_frame, text="No results have been entered yet.\nPlease check back later.", font=("Arial", 18), fg="gray")
+        term_section = tk.Frame(results_frame, bg="#f4f6f9")
+        tk.Label(term_section, text="Select Term to View Result", font=("Arial", 18)).pack(pady=40)
+        term_var = tk.StringVar()
+        term_combo = ttk.Combobox(term_section, textvariable=term_var, state="readonly", width=35, font=("Arial", 14))
+        term_combo.pack(pady=20)
 
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        def display_result():
+            term = term_var.get()
+            if not term:
+                return
+            data = self.data["results"].get(self.current_user, {}).get(term)
+            if not data:
+                return
+            view_win = tk.Toplevel(self)
+            view_win.title(f"Result - {term}")
+            view_win.geometry("900x700")
 
-        # Enable mousewheel scrolling
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
+            tree = ttk.Treeview(view_win, columns=("Subject", "Total", "Obtained", "Percentage"), show="headings")
+            tree.heading("Subject", text="Subject")
+            tree.heading("Total", text="Total Marks")
+            tree.heading("Obtained", text="Obtained")
+            tree.heading("Percentage", text="Percentage")
+            tree.column("Subject", width=300)
+            tree.column("Total", width=150)
+            tree.column("Obtained", width=150)
+            tree.column("Percentage", width=150)
+            tree.pack(fill="both", expand=True, padx=50, pady=50)
 
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        name = self.data["users"][self.current_user]["name"]
-        tk.Label(scrollable_frame, text=f"WELCOME STUDENT\n{name.upper()}", font=("Helvetica", 26, "bold"), bg="#f4f6f9").pack(pady=80)
+            for subject, marks in data["subjects"].items():
+                perc = round(marks["obtained"] / marks["total"] * 100, 2) if marks["total"] > 0 else 0
+                tree.insert("", "end", values=(subject, marks["total"], marks["obtained"], f"{perc}%"))
 
-        results = self.data["results"].get(self.current_user, {})
-        if not results:
-            tk.Label(scrollable_frame, text="No results have been entered yet.\nPlease check back later.", font=("Arial", 18), fg="gray").pack(pady=150)
-        else:
-            tk.Label(scrollable_frame, text="Select Term to View Result", font=("Arial", 18)).pack(pady=40)
-            term_var = tk.StringVar()
-            term_combo = ttk.Combobox(scrollable_frame, textvariable=term_var, values=list(results.keys()), state="readonly", width=35, font=("Arial", 14))
-            term_combo.pack(pady=20)
+            overall = data["overall"]
+            tree.insert("", "end", values=("TOTAL", overall["total"], overall["obtained"], f"{overall['percentage']}%"))
 
-            def display_result():
-                term = term_var.get()
-                if not term:
-                    return
-                data = results[term]
-                view_win = tk.Toplevel(self)
-                view_win.title(f"Result - {term}")
-                view_win.geometry("900x700")
-
-                tree = ttk.Treeview(view_win, columns=("Subject", "Total", "Obtained", "Percentage"), show="headings")
-                tree.heading("Subject", text="Subject")
-                tree.heading("Total", text="Total Marks")
-                tree.heading("Obtained", text="Obtained")
-                tree.heading("Percentage", text="Percentage")
-                tree.column("Subject", width=300)
-                tree.column("Total", width=150)
-                tree.column("Obtained", width=150)
-                tree.column("Percentage", width=150)
-                tree.pack(fill="both", expand=True, padx=50, pady=50)
-
-                for subject, marks in data["subjects"].items():
-                    perc = round(marks["obtained"] / marks["total"] * 100, 2) if marks["total"] > 0 else 0
-                    tree.insert("", "end", values=(subject, marks["total"], marks["obtained"], f"{perc}%"))
-
-                overall = data["overall"]
-                tree.insert("", "end", values=("TOTAL", overall["total"], overall["obtained"], f"{overall['percentage']}%"))
-
-                if overall["remarks"]:
-                    tk.Label(view_win, text=f"Remarks: {overall['remarks']}", font=("Arial", 14, "italic"), fg="#2c3e50").pack(pady=20)
-
-            tk.Button(scrollable_frame, text="VIEW RESULT", font=("Arial", 18, "bold"), bg="#27ae60", fg="white", width=35, height=2,
-                     command=display_result).pack(pady=50)
+            position = self.analytics.position(self.current_user, term)
+            if position:
+                rank, size, percentile = position
+                tk.Label(view_win, text=f"Class Position: {rank} of {size}  |  Percentile: {percentile}", font=("Arial", 14, "bold"), fg="#27ae60").pack(pady=(0, 10))
+
+            if overall["remarks"]:
+                tk.Label(view_win, text=f"Remarks: {overall['remarks']}", font=("Arial", 14, "italic"), fg="#2c3e50").pack(pady=20)
+
+        tk.Button(term_section, text="VIEW RESULT", font=("Arial", 18, "bold"), bg="#27ae60", fg="white", width=35, height=2,
+                 command=display_result).pack(pady=50)
 
         tk.Button(scrollable_frame, text="Change Password", font=("Arial", 16), bg="#3498db", fg="white", width=30, command=self.change_own_password).pack(pady=20)
         tk.Button(scrollable_frame, text="Logout", font=("Arial", 16), bg="#e74c3c", fg="white", width=30, command=self.show_login_screen).pack(pady=30)
 
         tk.Label(scrollable_frame, text="This Program is designed by Aniq Abbasi", 
                  font=("Arial", 11), fg="gray", bg="#f4f6f9").pack(side="bottom", pady=40)
+        return CachedView(view, canvas, name_label=name_label, no_results=no_results,
+                          term_section=term_section, term_var=term_var, term_combo=term_combo)
+
+    def refresh_student_dashboard(self, view):
+        name = self.data["users"][self.current_user]["name"]
+        view.name_label.config(text=f"WELCOME STUDENT\n{name.upper()}")
+        results = self.data["results"].get(self.current_user, {})
+        view.term_var.set("")
+        view.term_combo.config(values=list(results.keys()))
+        if results:
+            view.no_results.pack_forget()
+            view.term_section.pack()
+        else:
+            view.term_section.pack_forget()
+            view.no_results.pack(pady=150)
+        view.canvas.yview_moveto(0)
 
     def change_own_password(self):
+        # Re-verifying the logged in user is served from the session cache, not the slow hash
+        current = simpledialog.askstring("Change Password", "Enter your current password:", show="*")
+        if not current:
+            return
+        try:
+            self.service.authenticate(self.current_user, current)
+        except ServiceError:
+            messagebox.showerror("Error", "Current password is incorrect")
+            return
         new_pass = simpledialog.askstring("Change Password", "Enter new password:", show="*")
-        if new_pass and len(new_pass) >= 6:
-            self.data["users"][self.current_user]["password"] = hashlib.sha256(new_pass.encode()).hexdigest()
-            self.save_data()
-            messagebox.showinfo("Success", "Password changed successfully")
-        elif new_pass:
-            messagebox.showerror("Error", "Password must be at least 6 characters")
+        if not new_pass:
+            return
+        try:
+            self.service.change_password(self.current_user, new_pass)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Success", "Password changed successfully")
 
     def delete_own_account(self):
         if messagebox.askyesno("Delete Account", "Are you sure you want to delete your account?\nThis cannot be undone."):
-            self.data["users"].pop(self.current_user, None)
-            self.data["results"].pop(self.current_user, None)
-            self.save_data()
+            try:
+                self.service.delete_user(self.current_user)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             messagebox.showinfo("Account Deleted", "Your account has been deleted")
             self.show_login_screen()
 
+# ===================== BENCHMARKS =====================
+FIRST_NAMES = ["Ahmed", "Ali", "Ayesha", "Bilal", "Danish", "Eman", "Fatima", "Hamza", "Hassan", "Hira", "Imran", "Iqra",
+               "Junaid", "Kashif", "Laiba", "Maryam", "Moiz", "Nida", "Omar", "Rabia", "Saad", "Sana", "Talha", "Usman",
+               "Waqas", "Yusuf", "Zainab", "Zara", "Abdullah", "Mahnoor", "Noor", "Sarim", "Anaya", "Rehan", "Areeba"]
+LAST_NAMES = ["Abbasi", "Ahmed", "Akhtar", "Ali", "Aslam", "Baig", "Butt", "Chaudhry", "Farooq", "Hussain", "Iqbal", "Javed",
+              "Khan", "Malik", "Mirza", "Nawaz", "Qureshi", "Raza", "Rehman", "Saeed", "Shah", "Sheikh", "Siddiqui", "Tariq", "Zaidi"]
+
+def random_person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+SUBJECTS = ["English", "Urdu", "Mathematics", "Science", "Islamiat", "Computer", "Physics", "Chemistry", "Biology", "Pak Studies"]
+
+def generate_school(teachers, students_per_class, terms=3, logins_per_user=5, seed=1):
+    # A realistic school: every class 1-12 has teachers with a few subjects each, students
+    # get results in their teachers' subjects and there is a login history. All users share
+    # the password "password" (hashed once, hashing each would take hours at 100k users).
+    # With 12 or more teachers every class has subjects; the benchmarks size schools that way.
+    rng = random.Random(seed)
+    password = hash_password("password")
+    data = {"users": {}, "next_student_id": 1000001, "results": {}, "login_logs": []}
+    data["users"][ADMIN_ID] = {"role": "admin", "name": ADMIN_ID, "password": password, "hint": "No hint"}
+
+    class_subjects = {str(cls): set() for cls in range(1, 13)}
+    for i in range(max(teachers, 1)):
+        while True:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(string.ascii_uppercase)}. {rng.choice(LAST_NAMES)}"
+            teacher_id = teacher_id_for(name)
+            if teacher_id not in data["users"]:
+                break
+        record = new_teacher_record(name, "2024-08-01", "password", "", password_hash=password)
+        # Spread teachers over the classes so every class is covered
+        for cls in {str(i % 12 + 1), str(rng.randint(1, 12))}:
+            subjects = rng.sample(SUBJECTS, 3)
+            record["classes"][cls] = subjects
+            class_subjects[cls].update(subjects)
+        data["users"][teacher_id] = record
+
+    for cls, subjects in class_subjects.items():
+        subjects = sorted(subjects)
+        for _ in range(students_per_class):
+            name = random_person_name(rng)
+            student_id = student_id_for(name, data["next_student_id"])
+            data["next_student_id"] += 1
+            data["users"][student_id] = new_student_record(name, cls, "2025-04-01", "password", "", password_hash=password)
+            results = data["results"][student_id] = {}
+            for term in terms_for_class(cls)[:terms]:
+                marks = {subject: (100, min(100, max(0, int(rng.gauss(65, 15))))) for subject in subjects}
+                results[term] = build_result(cls, marks, rng.choice(["", "", "Good effort", "Needs improvement", "Excellent"]))
+
+    user_ids = list(data["users"])
+    start = datetime.datetime(2025, 4, 1, 8, 0, 0)
+    for i in range(len(user_ids) * logins_per_user):
+        uid = rng.choice(user_ids)
+        when = start + datetime.timedelta(minutes=i * 3)
+        data["login_logs"].append({"time": when.strftime("%Y-%m-%d %H:%M:%S"), "id": uid, "role": data["users"][uid]["role"]})
+    return data
+
+def write_school(data, path):
+    # Writes a generated school in the normal on-disk layout, replacing what is there
+    store = SchoolData.create(path)
+    store.update(data)
+    store.save(rewrite_logs=True)
+    return store
+
+def _timed(operation, repeat):
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        operation(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"first_ms": round(timings[0], 3), "best_ms": round(min(timings), 3), "mean_ms": round(sum(timings) / repeat, 3)}
+
+def run_benchmark_suite(sizes=(1000, 10000, 100000), repeat=5):
+    # Headless timings of the operations the desktop app makes, for schools of about `size` users.
+    # Login and registration include the password hash, which is slow on purpose.
+    import platform
+    import tempfile
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "started": datetime.datetime.now().isoformat(timespec="seconds"), "sizes": []}
+    for size in sizes:
+        teachers = max(1, size // 100)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "school_data.json")
+            started = time.perf_counter()
+            data = generate_school(teachers, max(1, (size - teachers) // 12))
+            generate_ms = (time.perf_counter() - started) * 1000
+            write_school(data, path)
+            entry = {"users": len(data["users"]), "teachers": teachers, "generate_ms": round(generate_ms, 1),
+                     "file_bytes": sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))}
+
+            teacher_id = next(uid for uid, info in data["users"].items() if info["role"] == "teacher")
+            cls, subjects = next(iter(data["users"][teacher_id]["classes"].items()))
+            students = [uid for uid, info in data["users"].items() if info["role"] == "student" and info["class"] == cls]
+            term = terms_for_class(cls)[0]
+            del data
+
+            entry["startup"] = _timed(lambda i: SchoolService(path).has_admin(), repeat)
+            service = SchoolService(path)
+            entry["login"] = _timed(lambda i: service.login(teacher_id, "password"), repeat)
+
+            def save_data(i):
+                service.data.touch_user(teacher_id)
+                service.commit()
+            entry["save_data"] = _timed(save_data, repeat)
+            entry["register_student"] = _timed(lambda i: service.register_student(f"Bench Student {i}", cls, "2026-01-01", "password"), repeat)
+
+            def save_result(i):
+                marks = {subject: (100, 50 + i) for subject in subjects}
+                service.save_result(teacher_id, students[i % len(students)], cls, term, marks)
+            entry["save_result"] = _timed(save_result, repeat)
+
+            def refresh_list(i):
+                # What Manage Students does: collect the keys and build the first screenful of rows
+                source = PagedRowSource(("ID", "Name", "Class", "DOJ"),
+                                        lambda: [uid for uid, info in service.data["users"].items() if info["role"] == "student"],
+                                        lambda uid: (uid, service.data["users"][uid]["name"], service.data["users"][uid]["class"], service.data["users"][uid]["doj"]))
+                source.page(0, 100)
+            entry["list_refresh"] = _timed(refresh_list, repeat)
+            entry["search"] = _timed(lambda i: service.search_users(["ali", "khan", "zara m", "1000"][i % 4], role="student", limit=8), repeat)
+            report["sizes"].append(entry)
+    return report
+
+def benchmark_startup(sizes=(1000, 10000, 50000), repeat=3):
+    # Time from opening the data file to being able to check a login, for the old
+    # single-file layout and the split layout, across synthetic school sizes.
+    import tempfile
+    report = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            synthetic = generate_school(max(12, size // 100), math.ceil(size / 12))
+            legacy_path = os.path.join(folder, f"legacy_{size}.json")
+            split_path = os.path.join(folder, f"split_{size}.json")
+            with open(legacy_path, "w") as file:
+                json.dump(synthetic, file, indent=4)
+            split = SchoolData(split_path)
+            split.update(synthetic)
+            split.save(rewrite_logs=True)
+
+            def best_of(load):
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    load()
+                    timings.append(time.perf_counter() - started)
+                return round(min(timings) * 1000, 2)
+
+            def load_legacy():
+                with open(legacy_path, "r") as file:
+                    "Aniq Abbasi" in json.load(file)["users"]
+
+            def load_split():
+                "Aniq Abbasi" in SchoolData.open(split_path)["users"]
+
+            legacy_ms, split_ms = best_of(load_legacy), best_of(load_split)
+            report.append({
+                "students": sum(1 for info in synthetic["users"].values() if info["role"] == "student"),
+                "legacy_file_bytes": os.path.getsize(legacy_path),
+                "index_file_bytes": os.path.getsize(split_path),
+                "legacy_startup_ms": legacy_ms,
+                "lazy_startup_ms": split_ms,
+                "speedup": round(legacy_ms / split_ms, 1) if split_ms else None
+            })
+    return report
+
+def benchmark_navigation(rounds=20):
+    # Logs each role in and out repeatedly, first rebuilding every screen on each visit (the old
+    # behaviour) and then with the view cache, and reports NavigationStats for both runs.
+    # Needs a display.
+    import tempfile
+    report = {}
+    with tempfile.TemporaryDirectory() as folder:
+        data_file = os.path.join(folder, "school_data.json")
+        service = SchoolService(data_file)
+        service.create_admin()
+        teacher_id = service.register_teacher("Bench Teacher", "2024-01-01", "bench-password")
+        student_id = service.register_student("Bench Student", "5", "2024-01-01", "bench-password")
+
+        app = SchoolSystem(data_file)
+        app.withdraw()
+        screens = [(ADMIN_ID, app.admin_dashboard), (teacher_id, app.teacher_dashboard), (student_id, app.student_dashboard)]
+        for mode, cached in (("rebuild", False), ("cached", True)):
+            app.cache_views = cached
+            app.nav_stats = NavigationStats()
+            for _ in range(rounds):
+                for user, dashboard in screens:
+                    app.current_user = user
+                    dashboard()
+                    app.show_login_screen()
+            report[mode] = app.nav_stats.summary()
+        app.destroy()
+    return report
+
+def benchmark_search(users=100000, repeat=200, seed=1):
+    # Builds the search index over a synthetic school with realistic names and times
+    # prefix, exact ID, number and misspelt lookups the way the type-ahead boxes make them
+    rng = random.Random(seed)
+    records = {}
+    for number in range(1000001, 1000001 + users):
+        name = random_person_name(rng)
+        records[student_id_for(name, number)] = {"role": "student", "name": name, "class": str(number % 12 + 1)}
+
+    started = time.perf_counter()
+    index = UserSearchIndex(records)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    index._build_grams()
+    grams_ms = (time.perf_counter() - started) * 1000
+
+    ids = list(records)
+    samples = {
+        "name_prefix": lambda: rng.choice(FIRST_NAMES)[:3],
+        "full_name": lambda: records[rng.choice(ids)]["name"],
+        "exact_id": lambda: rng.choice(ids),
+        "id_number": lambda: rng.choice(ids).split("-")[1][:5],
+        "misspelt": lambda: "".join(rng.sample(records[rng.choice(ids)]["name"], 2)) + records[rng.choice(ids)]["name"][2:],
+    }
+    report = {"users": users, "index_build_ms": round(build_ms, 1), "trigram_build_ms": round(grams_ms, 1), "lookups": {}}
+    for kind, make_query in samples.items():
+        timings, hits = [], 0
+        for _ in range(repeat):
+            query = make_query()
+            started = time.perf_counter()
+            found = index.search(query, role="student", limit=8)
+            timings.append(time.perf_counter() - started)
+            hits += bool(found)
+        timings.sort()
+        report["lookups"][kind] = {"mean_ms": round(sum(timings) / repeat * 1000, 3),
+                                   "p99_ms": round(timings[int(repeat * 0.99) - 1] * 1000, 3),
+                                   "hit_rate": round(hits / repeat, 2)}
+    return report
+
+def _stress_worker(data_file, teacher_id, pairs, registrations, output):
+    # One desk: saves its share of results and registers a few students, all at the same time as the others
+    service = SchoolService(data_file)
+    saved, registered = [], []
+    for n, (student_id, term) in enumerate(pairs):
+        obtained = (n * 7 + len(student_id)) % 101
+        service.save_result(teacher_id, student_id, "5", term, {"Mathematics": (100, obtained)}, f"pid {os.getpid()}")
+        saved.append((student_id, term, obtained))
+        if n < registrations:
+            registered.append(service.register_student(f"Stress {os.getpid()} {n}", "5", "2026-01-01", "student123"))
+    output.put((saved, registered))
+
+def run_stress_test(processes=4, results_per_process=50, registrations_per_process=5):
+    # N processes enter results into the same data files at once; afterwards every single
+    # result and registration must be on disk and no student number may be handed out twice.
+    import multiprocessing
+    import tempfile
+    with tempfile.TemporaryDirectory() as folder:
+        data_file = os.path.join(folder, "school_data.json")
+        service = SchoolService(data_file)
+        teacher_id = service.register_teacher("Stress Teacher", "2026-01-01", "teacher123")
+        service.add_class(teacher_id, "5")
+        service.add_subject(teacher_id, "5", "Mathematics")
+        students_needed = processes * results_per_process // len(terms_for_class("5")) + 1
+        student_ids = [service.register_student(f"Student {i}", "5", "2026-01-01", "student123") for i in range(students_needed)]
+        pairs = [(sid, term) for sid in student_ids for term in terms_for_class("5")]
+
+        output = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_stress_worker,
+                                           args=(data_file, teacher_id, pairs[w::processes][:results_per_process], registrations_per_process, output))
+                   for w in range(processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        reports = [output.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        final = SchoolData.open(data_file)
+        results = final["results"]
+        missing = [(sid, term) for saved, _ in reports for sid, term, obtained in saved
+                   if results.get(sid, {}).get(term, {}).get("subjects", {}).get("Mathematics", {}).get("obtained") != obtained]
+        registered = [uid for _, ids in reports for uid in ids]
+        numbers = [uid.rsplit("-", 1)[1] for uid, info in final["users"].items() if info["role"] == "student"]
+        return {
+            "processes": processes,
+            "results_saved": sum(len(saved) for saved, _ in reports),
+            "results_missing": len(missing),
+            "students_registered": len(registered),
+            "registrations_missing": len([uid for uid in registered if uid not in final["users"]]),
+            "duplicate_student_numbers": len(numbers) - len(set(numbers)),
+            "seconds": round(elapsed, 2)
+        }
+
+class APIClient:
+    # Minimal keep-alive JSON client used as the stand-in front-end for the load test
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.token = None
+
+    def call(self, method, path, payload=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = json.dumps(payload).encode() if payload is not None else None
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+
+    def login(self, user_id, password):
+        status, body = self.call("POST", "/login", {"user_id": user_id, "password": password})
+        if status != 200:
+            raise ServiceError(body.get("error", "login failed"))
+        self.token = body["token"]
+
+    def close(self):
+        self.conn.close()
+
+def run_load_test(clients=16, requests_per_client=200, students=500, workers=16):
+    # Starts the API on a throw-away data file and hammers it from many client threads at once
+    import tempfile
+    with tempfile.TemporaryDirectory() as folder:
+        service = SchoolService(os.path.join(folder, "school_data.json"))
+        service.create_admin()
+        teacher_id = service.register_teacher("Load Teacher", "2026-01-01", "teacher123")
+        service.add_class(teacher_id, "5")
+        for subject in ("English", "Mathematics", "Science"):
+            service.add_subject(teacher_id, "5", subject)
+        shared_hash = hash_password("student123")
+        with service.lock:
+            for i in range(students):
+                record = new_student_record(f"Student {i}", "5", "2026-01-01", "student123", "", password_hash=shared_hash)
+                student_id = student_id_for(record["name"], service.data["next_student_id"])
+                service.data["next_student_id"] += 1
+                service.data["users"][student_id] = record
+                service.data["results"][student_id] = {}
+        service.commit()
+        student_ids = [uid for uid, info in service.data["users"].items() if info["role"] == "student"]
+
+        server = make_api_server(service, port=0, workers=max(workers, clients))
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        latencies, errors = [], []
+        latency_lock = threading.Lock()
+
+        def client_run(index):
+            rng = random.Random(index)
+            client = APIClient(host, port)
+            client.login(teacher_id, "teacher123")
+            own = []
+            for n in range(requests_per_client):
+                student_id = rng.choice(student_ids)
+                started = time.perf_counter()
+                if n % 4 == 0:
+                    status, _ = client.call("GET", f"/results/{urllib.parse.quote(student_id)}")
+                elif n % 4 == 1:
+                    status, _ = client.call("GET", "/stats?class=5&term=" + urllib.parse.quote("1st term"))
+                else:
+                    marks = {s: [100, rng.randint(0, 100)] for s in ("English", "Mathematics", "Science")}
+                    status, _ = client.call("POST", "/results", {"student_id": student_id, "class": "5", "term": "1st term", "marks": marks})
+                own.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors.append(status)
+            client.close()
+            with latency_lock:
+                latencies.extend(own)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client_run, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        server.server_close()
+
+        latencies.sort()
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2)
+        return {
+            "clients": clients,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "seconds": round(elapsed, 2),
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "disk_writes": service.writer.writes
+        }
+
 if __name__ == "__main__":
-    app = SchoolSystem()
-    app.mainloop()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="School Management System")
+    parser.add_argument("--benchmark-startup", action="store_true", help="time data loading at startup for synthetic school sizes and print JSON")
+    parser.add_argument("--calibrate-password", type=float, metavar="MS", help="find the password hash cost that takes about MS milliseconds per login")
+    parser.add_argument("--benchmark-results-format", type=int, metavar="STUDENTS", help="compare results file size and load time of the dict and columnar formats")
+    parser.add_argument("--benchmark-navigation", type=int, nargs="?", const=20, metavar="ROUNDS", help="time screen switches with and without the view cache and print JSON")
+    parser.add_argument("--benchmark-search", type=int, nargs="?", const=100000, metavar="USERS", help="time search index lookups over this many users and print JSON")
+    parser.add_argument("--generate-data", metavar="PATH", help="write a synthetic school to PATH (see --teachers and --students-per-class)")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students-per-class", type=int, default=80)
+    parser.add_argument("--benchmark-suite", metavar="OUTPUT", nargs="?", const="-", help="time the main operations at 1k, 10k and 100k users and write JSON to OUTPUT (default stdout)")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated school sizes for --benchmark-suite")
+    parser.add_argument("--data-file", default="school_data.json", help="data file for --backup, --list-backups and --restore")
+    parser.add_argument("--backup", action="store_true", help="back up the records changed since the last backup")
+    parser.add_argument("--list-backups", action="store_true")
+    parser.add_argument("--restore", metavar="ID_OR_TIME", help='restore the backup with this id, or the last one before "YYYY-MM-DD HH:MM:SS", into --output')
+    parser.add_argument("--output", metavar="PATH", help="new data file for --restore")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP/JSON API instead of the desktop app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stress-test", type=int, metavar="PROCESSES", help="run this many processes entering results into the same data files")
+    parser.add_argument("--load-test", type=int, metavar="CLIENTS", help="load test the HTTP API with this many concurrent clients")
+    args = parser.parse_args()
+
+    if args.benchmark_startup:
+        print(json.dumps(benchmark_startup(), indent=4))
+    elif args.benchmark_results_format:
+        print(json.dumps(compare_results_formats(generate_school(max(12, args.benchmark_results_format // 100),
+                                                                math.ceil(args.benchmark_results_format / 12), logins_per_user=0)["results"]), indent=4))
+    elif args.calibrate_password:
+        print(json.dumps([calibrate_password_cost(args.calibrate_password, scheme) for scheme in ("pbkdf2_sha256", "scrypt")], indent=4))
+    elif args.benchmark_navigation:
+        print(json.dumps(benchmark_navigation(args.benchmark_navigation), indent=4))
+    elif args.backup:
+        print(json.dumps(SchoolService(args.data_file).backup(), indent=4))
+    elif args.list_backups:
+        for entry in BackupStore(args.data_file).list():
+            print(f"{entry['id']:>5}  {entry['time']}  {'full' if entry['full'] else 'incr'}  users {entry['users']:>6}  "
+                  f"students {entry['results']:>6}  log chunks {entry['logs']:>3}  {entry['stored_bytes']:>10} bytes")
+    elif args.restore:
+        if not args.output:
+            parser.error("--restore needs --output")
+        print(json.dumps(BackupStore(args.data_file).restore(args.restore, args.output), indent=4))
+    elif args.generate_data:
+        store = write_school(generate_school(args.teachers, args.students_per_class), args.generate_data)
+        print(f"Wrote {len(store['users'])} users to {args.generate_data}")
+    elif args.benchmark_suite:
+        report = run_benchmark_suite([int(size) for size in args.sizes.split(",")])
+        if args.benchmark_suite == "-":
+            print(json.dumps(report, indent=4))
+        else:
+            write_json_atomic(args.benchmark_suite, report)
+    elif args.benchmark_search:
+        print(json.dumps(benchmark_search(args.benchmark_search), indent=4))
+    elif args.stress_test:
+        print(json.dumps(run_stress_test(processes=args.stress_test), indent=4))
+    elif args.load_test:
+        print(json.dumps(run_load_test(clients=args.load_test), indent=4))
+    elif args.serve:
+        service = SchoolService()
+        if not service.has_admin():
+            service.create_admin()
+        server = make_api_server(service, args.host, args.port)
+        service.stats.start_dumps(service.stats_path)
+        service.start_backups()
+        print(f"School API listening on http://{args.host}:{args.port} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        app = SchoolSystem()
+        app.mainloop()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import tkinter as tk
+import unittest
+
+from school_system import ADMIN_ID, SchoolService, SchoolSystem
+
+
+class LogoutTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        data_file = os.path.join(self.folder.name, "school_data.json")
+        service = SchoolService(data_file)
+        service.create_admin()
+        self.student_id = service.register_student("Test Student", "5", "2024-01-01", "test-password")
+        try:
+            self.app = SchoolSystem(data_file)
+        except tk.TclError as e:
+            self.folder.cleanup()
+            self.skipTest(f"needs a display: {e}")
+        self.app.withdraw()
+
+    def tearDown(self):
+        self.app.service.stats.stop_dumps()
+        if self.app.service.backup_timer:
+            self.app.service.backup_timer.cancel()
+        self.app.destroy()
+        self.folder.cleanup()
+
+    def toplevels(self):
+        return [child for child in self.app.winfo_children() if isinstance(child, tk.Toplevel)]
+
+    def test_logout_closes_admin_windows(self):
+        self.app.current_user = ADMIN_ID
+        self.app.admin_dashboard()
+        self.app.manage_students()
+        self.app.manage_teachers()
+        self.assertEqual(len(self.toplevels()), 2)
+
+        self.app.show_login_screen()
+        self.assertEqual(self.toplevels(), [])
+        self.assertIsNone(self.app.current_user)
+
+    def test_logout_clears_cached_dashboard(self):
+        self.app.current_user = self.student_id
+        self.app.student_dashboard()
+        self.assertIn("TEST STUDENT", self.app.views["student"].name_label.cget("text"))
+
+        self.app.show_login_screen()
+        self.assertEqual(self.app.views["student"].name_label.cget("text"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
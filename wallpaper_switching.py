@@ -9,6 +9,9 @@
 
 import os
 import time
+import asyncio
+import logging
+import logging.handlers
 import platform
 import ctypes
 import subprocess
@@ -17,6 +20,25 @@ from pathlib import Path
 from PIL import Image
 import random
 import sys
+import argparse
+import tempfile
+import queue
+import select
+import struct
+import errno
+import ctypes.util
+import json
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict, namedtuple, deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+try:
+    import resource  # peak memory for --benchmark-decode; not available on Windows
+except ImportError:
+    resource = None
 
 # --- User Configuration ---
 # The path to your folder containing the wallpaper images.
@@ -26,28 +48,683 @@ WALLPAPER_FOLDER = Path("./wallpapers")
 
 # The time in seconds between each wallpaper change.
 CHANGE_INTERVAL_SECONDS = 15
+
+# Where prepared (resized) wallpapers are kept between runs, and how much disk they may use.
+CACHE_FOLDER = Path("./wallpaper_cache")
+CACHE_MAX_MB = 500
+
+# How often the wallpaper folder is rescanned when inotify is not available (Windows, macOS).
+WATCH_POLL_SECONDS = 5
+
+# Where the metadata index of the wallpaper library is kept, and how often it is rewritten
+# at most while the watcher is feeding it changes.
+LIBRARY_INDEX = CACHE_FOLDER / "library.json"
+LIBRARY_SAVE_SECONDS = 60
+
+# How images are rendered when several displays are connected: "primary" renders for the
+# primary display only (every display shows that image), "per-display" fits the image to
+# each display separately, and "span" stretches one image across all of them.
+DISPLAY_MODE = "primary"
+# "per-display" and "span" set one image covering the whole desktop, which needs the OS to span
+# it: GNOME's "spanned" picture option or Windows' WallpaperStyle 22. macOS cannot, so it only
+# supports "primary".
+SPANNING_SYSTEMS = ("Linux", "Windows")
+
+# "phased" shows the whole library in the two-pointer order. "aspect" prefers images whose
+# shape matches the screen (within ASPECT_TOLERANCE, as a log ratio), so fewer need black
+# bars; every ASPECT_OTHER_EVERY-th change still comes from the whole library.
+SELECTION_POLICY = "phased"
+ASPECT_TOLERANCE = 0.1
+ASPECT_OTHER_EVERY = 4
+
+# The image types the cycler picks up.
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Quality/speed trade-off for resizing: "best", "balanced" or "fast".
+RENDER_QUALITY = "balanced"
+
+# For each quality: the reducing_gap passed to Pillow and the final resampling filter.
+# A reducing_gap lets JPEGs decode directly at 1/2, 1/4 or 1/8 scale (Image.draft) and
+# other formats shrink by whole factors first; None decodes at full size.
+# "best" is slower than the earlier plain thumbnail() call, which already used Pillow's
+# default reducing_gap of 2.0; "balanced" is closest to it. --benchmark-decode compares
+# all three against that earlier call.
+QUALITY_PRESETS = {
+    "best": (None, Image.LANCZOS),
+    "balanced": (2.0, Image.LANCZOS),
+    "fast": (1.5, Image.BILINEAR),
+}
+
+# File format for prepared images: "png-fast", "png", "jpeg" or "bmp".
+# Use --benchmark-output to find the fastest one on this machine.
+OUTPUT_FORMAT = "png-fast"
+
+# For each output format: file suffix, Pillow format name and save options.
+OUTPUT_FORMATS = {
+    "png-fast": (".png", "PNG", {"compress_level": 1}),
+    "png": (".png", "PNG", {}),
+    "jpeg": (".jpg", "JPEG", {"quality": 95, "subsampling": 0}),
+    "bmp": (".bmp", "BMP", {}),
+}
+
+# The live log keeps the most recent changes in memory; the full history goes to a
+# rotating file, so memory and disk use stay flat however long the script runs.
+HISTORY_MAX_ENTRIES = 200
+HISTORY_FILE = Path("./wallpaper_history.log")
+HISTORY_FILE_MAX_BYTES = 1024 * 1024
+HISTORY_FILE_BACKUPS = 3
+
+# Width of the file name column in the live log; longer names are shortened.
+LOG_FILE_WIDTH = 40
+
+# How many upcoming home/lock pairs are prepared in the background while the current one shows.
+PREFETCH_PAIRS = 2
 # --------------------------
 
 
+class PreparedImageCache:
+    # An on-disk cache of prepared wallpapers that survives restarts.
+    # Entries are keyed by the source file (path, modification time, size) and the target
+    # resolution, so an edited photo or a new screen size is prepared again automatically.
+    # When the cache grows past its limit, the least recently used entries are removed.
+
+    def __init__(self, folder: Path, max_bytes: int):
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.folder / "index.json"
+        self.entries = OrderedDict()  # key -> {"file", "bytes", "source"}, least recently used first
+        self.total_bytes = 0
+        self.lock = threading.Lock()  # images are prepared on background threads too
+        self._load_index()
+
+    def _load_index(self):
+        # Reads the index written by the previous run, dropping entries whose file is gone.
+        try:
+            saved = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            saved = []
+        for key, entry in saved:
+            if (self.folder / entry["file"]).exists():
+                self.entries[key] = entry
+                self.total_bytes += entry["bytes"]
+
+    def _save_index(self):
+        # Writes the index atomically so a crash never leaves it half written.
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(list(self.entries.items())))
+        os.replace(tmp_path, self.index_path)
+
+    def key_for(self, original_path: Path, screen_size: tuple, variant: str = "") -> str:
+        # The variant names the render settings, so changing them never serves a stale file.
+        stat = original_path.stat()
+        source = f"{original_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{screen_size[0]}x{screen_size[1]}|{variant}"
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def get(self, key: str):
+        # Returns the prepared file for this key, or None if it has not been prepared yet.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            path = self.folder / entry["file"]
+            if not path.exists():
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return path
+
+    def path_for(self, key: str, suffix: str = ".png") -> Path:
+        return self.folder / f"{key}{suffix}"
+
+    def add(self, key: str, path: Path, source: Path, save: bool = True):
+        # Records a newly prepared file, then evicts old entries until the cache fits its limit.
+        # Bulk callers pass save=False and call close() once they are done.
+        with self.lock:
+            if key in self.entries:
+                self._drop(key, delete_file=False)
+            self.entries[key] = {"file": path.name, "bytes": path.stat().st_size,
+                                 "source": str(source.resolve())}
+            self.total_bytes += self.entries[key]["bytes"]
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                self._drop(next(iter(self.entries)))
+            if save:
+                self._save_index()
+
+    def invalidate(self, sources):
+        # Removes every prepared variant of source files that were edited or deleted, in one
+        # pass over the entries and one index write however many files changed.
+        # The keys already change with the file, so this only frees the space early.
+        sources = {str(source.resolve()) for source in sources}
+        with self.lock:
+            stale = [key for key, entry in self.entries.items() if entry.get("source") in sources]
+            for key in stale:
+                self._drop(key)
+            if stale:
+                self._save_index()
+        return len(stale)
+
+    def _drop(self, key: str, delete_file: bool = True):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["bytes"]
+        if delete_file:
+            try:
+                (self.folder / entry["file"]).unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        # Saves the recency order so the next run evicts the right entries.
+        with self.lock:
+            self._save_index()
+
+
+def scan_images(root: str, on_directory=None):
+    # Walks the folder tree with os.scandir and yields (path, stat) for every image file,
+    # one at a time, so even a huge library is never listed in memory all at once.
+    # on_directory is called with each folder as it is entered.
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        if on_directory is not None:
+            on_directory(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                            yield entry.path, entry.stat()
+                    except FileNotFoundError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+
+def describe_image(path: str):
+    # Returns (width, height, (red, green, blue)) for an image, or None if it is not a
+    # readable image. The size comes from the header; the average colour from a small
+    # draft decode (JPEGs decode at 1/8 scale), so this stays cheap even for huge photos.
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft("RGB", (64, 64))
+            average = img.convert("RGB").resize((1, 1), Image.BOX).getpixel((0, 0))
+            return width, height, average
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def aspect_matches(width: int, height: int, screen_size: tuple) -> bool:
+    # True when an image has nearly the screen's shape and will fill it without bars.
+    return abs(math.log((width / height) / (screen_size[0] / screen_size[1]))) <= ASPECT_TOLERANCE
+
+
+class LibraryIndex:
+    # A persistent index of the wallpaper library: for every image, its size, modification
+    # time, pixel dimensions and average colour. Startup loads this instead of walking the
+    # whole share, and a rescan only describes the files that are new or changed.
+
+    FIELDS = 7  # size, mtime_ns, width, height, red, green, blue
+
+    def __init__(self, root: Path, index_path: Path):
+        self.root = str(root)
+        self.index_path = index_path
+        self.images = {}  # path -> [size, mtime_ns, width, height, red, green, blue]
+        self.dirty = False
+        self.saved_at = 0.0
+
+    def load(self) -> bool:
+        # Returns False when there is no usable index for this folder yet.
+        try:
+            saved = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return False
+        if saved.get("root") != self.root:
+            return False
+        if saved.get("fields") != self.FIELDS:
+            # Written by an older version without image descriptors; describe again.
+            return False
+        self.images = saved["images"]
+        self.saved_at = time.monotonic()
+        return True
+
+    def save(self):
+        # Writes the index atomically so a crash never leaves it half written.
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"root": self.root, "fields": self.FIELDS, "images": self.images}, separators=(",", ":")))
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self, seconds: float = LIBRARY_SAVE_SECONDS):
+        # Batches index writes; a large library takes a moment to write out.
+        if self.dirty and time.monotonic() - self.saved_at >= seconds:
+            self.save()
+
+    def scan(self):
+        # Rebuilds the index from the folder, reusing the descriptors of unchanged files.
+        # New and changed files are described in batches on a process pool.
+        print(f"Scanning for images in: {Path(self.root).resolve()}")
+        previous, self.images = self.images, {}
+        started = time.perf_counter()
+        pending, pool = [], None
+        try:
+            for count, (path, stat) in enumerate(scan_images(self.root), 1):
+                entry = previous.get(path)
+                if (entry is not None and len(entry) == self.FIELDS
+                        and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns):
+                    self.images[path] = entry
+                else:
+                    pending.append((path, stat))
+                if len(pending) >= 512:
+                    pool = pool or ProcessPoolExecutor()
+                    self._describe_batch(pending, pool)
+                if count % 1000 == 0:
+                    print(f"\r  {count} files, {count / (time.perf_counter() - started):.0f} files/sec", end="", flush=True)
+            if pending:
+                pool = pool or ProcessPoolExecutor()
+                self._describe_batch(pending, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        print(f"\r  Indexed {len(self.images)} images in {time.perf_counter() - started:.1f}s.")
+        self.save()
+
+    def _describe_batch(self, pending: list, pool):
+        paths = [path for path, _ in pending]
+        for (path, stat), description in zip(pending, pool.map(describe_image, paths, chunksize=16)):
+            self._store(path, stat, description)
+        pending.clear()
+
+    def _store(self, path: str, stat, description) -> bool:
+        if description is None:
+            self.images.pop(path, None)
+            return False
+        width, height, (red, green, blue) = description
+        self.images[path] = [stat.st_size, stat.st_mtime_ns, width, height, red, green, blue]
+        self.dirty = True
+        return True
+
+    def read(self, path: str):
+        # Returns (stat, description) for one file, or None if it is gone. Touches nothing in
+        # the index, so it can run on a worker thread while the index is in use.
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat, describe_image(path)
+
+    def put(self, path: str, found) -> bool:
+        # Stores what read() found. Returns False if the file is gone or not an image.
+        if found is None:
+            self.remove(path)
+            return False
+        return self._store(path, *found)
+
+    def update(self, path: str) -> bool:
+        # Re-reads one file after the watcher saw it change. Returns False if it is not an image.
+        return self.put(path, self.read(path))
+
+    def remove(self, path: str):
+        if self.images.pop(path, None) is not None:
+            self.dirty = True
+
+    def matches_screen(self, path: str, screen_size: tuple) -> bool:
+        entry = self.images[path]
+        return aspect_matches(entry[2], entry[3], screen_size)
+
+    def signatures(self) -> dict:
+        # What the watcher compares the folder against to find changes made while we were off.
+        return {path: (entry[1], entry[0]) for path, entry in self.images.items()}
+
+
+class FolderWatcher:
+    # Watches the wallpaper folder tree and reports image files that were added, rewritten
+    # or removed, as ("updated", path), ("removed", path) and ("removed_folder", path) on a
+    # queue. On Linux it uses inotify through ctypes with one watch per folder; elsewhere it
+    # compares snapshots every few seconds. Before watching, it reports how the folder
+    # differs from the known state, which catches changes made while the script was off.
+    # When the kernel drops events (queue overflow) it sends ("rescan", snapshot) so the
+    # reader can compare the whole folder again, and a folder that cannot be watched (the
+    # max_user_watches limit) is polled instead, reported once as ("warning", message).
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self, folder: Path, known: dict = None, poll_seconds: float = WATCH_POLL_SECONDS):
+        self.folder = str(folder)
+        self.known = known or {}  # path -> (mtime_ns, size)
+        self.poll_seconds = poll_seconds
+        self.events = queue.Queue()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.libc = None
+        self.watches = {}  # inotify watch descriptor -> folder
+        self.polled = {}  # folder inotify could not watch -> snapshot of its tree
+        self.inotify_fd = self._open_inotify()
+        self.mode = "inotify" if self.inotify_fd is not None else "polling"
+
+    def _open_inotify(self):
+        # Returns an inotify descriptor, or None to fall back to polling.
+        if platform.system() != "Linux":
+            return None
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return fd if fd >= 0 else None
+
+    def _add_watch(self, directory: str):
+        mask = (self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO
+                | self.IN_CREATE | self.IN_DELETE)
+        if any(directory.startswith(root + os.sep) for root in self.polled):
+            return  # inside a tree that is already polled
+        wd = self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(directory), mask)
+        if wd >= 0:
+            self.watches[wd] = directory
+            return
+        error = ctypes.get_errno()
+        if error in (errno.ENOENT, errno.ENOTDIR):
+            return  # removed before it could be watched
+        self.polled[directory] = self._snapshot(root=directory)
+        self.events.put(("warning", f"Cannot watch {directory} ({os.strerror(error)}); "
+                                    f"checking it every {self.poll_seconds:g}s instead."))
+
+    def start(self):
+        target = self._watch_inotify if self.mode == "inotify" else self._watch_polling
+        self.thread = threading.Thread(target=target, name="folder-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def _snapshot(self, on_directory=None, root: str = None) -> dict:
+        # Maps each image in the tree to (modification time, size).
+        return {path: (stat.st_mtime_ns, stat.st_size)
+                for path, stat in scan_images(root or self.folder, on_directory)}
+
+    def _poll_unwatched(self):
+        for root, previous in list(self.polled.items()):
+            current = self._snapshot(root=root)
+            self._report_differences(previous, current)
+            self.polled[root] = current
+
+    def _rescan(self):
+        # Events were lost: send the whole folder and watch any folder that is new.
+        current = self._snapshot(self._add_watch)
+        for root in self.polled:
+            self.polled[root] = {path: signature for path, signature in current.items()
+                                 if path.startswith(root + os.sep)}
+        self.events.put(("rescan", current))
+
+    def _report_differences(self, previous: dict, current: dict):
+        for path, signature in current.items():
+            if previous.get(path) != signature:
+                self.events.put(("updated", path))
+        for path in previous.keys() - current.keys():
+            self.events.put(("removed", path))
+
+    def _watch_inotify(self):
+        # Watches every folder (added while scanning, so nothing slips between the scan and
+        # the watch), then reads events; the one-second select timeout lets stop() end it.
+        self._report_differences(self.known, self._snapshot(self._add_watch))
+        self.known = None
+        next_poll = time.monotonic() + self.poll_seconds
+        while not self.stopping.is_set():
+            if self.polled and time.monotonic() >= next_poll:
+                self._poll_unwatched()
+                next_poll = time.monotonic() + self.poll_seconds
+            ready, _, _ = select.select([self.inotify_fd], [], [], 1.0)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    self._rescan()
+                    continue
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                if not name or wd not in self.watches:
+                    continue
+                path = os.path.join(self.watches[wd], name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        # A new folder: watch it and everything already inside it.
+                        for image_path, _ in scan_images(path, self._add_watch):
+                            self.events.put(("updated", image_path))
+                    elif mask & self.IN_MOVED_FROM:
+                        self.events.put(("removed_folder", path))
+                elif os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    if mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                        self.events.put(("removed", path))
+                    elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                        self.events.put(("updated", path))
+
+    def _watch_polling(self):
+        # Compares snapshots of the folder tree and reports the differences.
+        previous = self.known
+        self.known = None
+        while True:
+            current = self._snapshot()
+            self._report_differences(previous, current)
+            previous = current
+            if self.stopping.wait(self.poll_seconds):
+                return
+
+
+# One connected display: its size and its position on the virtual desktop.
+Display = namedtuple("Display", "name width height x y primary")
+
+XRANDR_OUTPUT = re.compile(r"^(\S+) connected (primary )?(\d+)x(\d+)\+(\d+)\+(\d+)")
+
+
+def parse_xrandr(output: str) -> list:
+    # Reads the active displays from `xrandr --query` output, left to right. Connected
+    # outputs without a mode are skipped; without a primary, the first one is primary.
+    displays = []
+    for line in output.splitlines():
+        match = XRANDR_OUTPUT.match(line)
+        if match:
+            name, primary, width, height, x, y = match.groups()
+            displays.append(Display(name, int(width), int(height), int(x), int(y), bool(primary)))
+    displays.sort(key=lambda display: (display.x, display.y))
+    if displays and not any(display.primary for display in displays):
+        displays[0] = displays[0]._replace(primary=True)
+    return displays
+
+
+def parse_display_list(text: str) -> list:
+    # Builds displays from "WIDTHxHEIGHT+X+Y,..." (for --displays); the first is primary.
+    displays = []
+    for number, part in enumerate(text.split(","), 1):
+        match = re.fullmatch(r"(\d+)x(\d+)\+(\d+)\+(\d+)", part.strip())
+        if not match:
+            raise ValueError(f"Display '{part}' is not in the form WIDTHxHEIGHT+X+Y.")
+        width, height, x, y = map(int, match.groups())
+        displays.append(Display(f"display-{number}", width, height, x, y, number == 1))
+    return displays
+
+
+def parse_resolution(text: str) -> tuple:
+    # Reads "WIDTHxHEIGHT" for --resolution.
+    match = re.fullmatch(r"\s*(\d+)\s*[xX]\s*(\d+)\s*", text)
+    if not match or 0 in (int(match.group(1)), int(match.group(2))):
+        raise argparse.ArgumentTypeError(f"'{text}' is not a resolution like 1920x1080.")
+    return int(match.group(1)), int(match.group(2))
+
+
+def canvas_geometry(displays: list) -> tuple:
+    # The bounding box of the displays on the virtual desktop: (left, top, width, height).
+    left = min(display.x for display in displays)
+    top = min(display.y for display in displays)
+    right = max(display.x + display.width for display in displays)
+    bottom = max(display.y + display.height for display in displays)
+    return left, top, right - left, bottom - top
+
+
+def fit_to_screen(original_path: Path, screen_size: tuple, quality: str = RENDER_QUALITY) -> Image.Image:
+    # Resizes an image to fit the screen without distortion by adding black bars.
+    reducing_gap, resample = QUALITY_PRESETS[quality]
+    img = Image.open(original_path)
+
+    # For JPEGs, ask the decoder for the smallest 1/2, 1/4 or 1/8 scale that is still at
+    # least reducing_gap times the fitted size, so a 40 MP photo is never decoded at full size.
+    if reducing_gap is not None and img.format == "JPEG":
+        scale = min(screen_size[0] / img.width, screen_size[1] / img.height) * reducing_gap
+        img.draft("RGB", (int(img.width * scale), int(img.height * scale)))
+    
+    # This preserves the aspect ratio while scaling down.
+    img.thumbnail(screen_size, resample, reducing_gap=reducing_gap)
+    
+    # Create a new black background with the exact screen resolution.
+    background = Image.new('RGB', screen_size, (0, 0, 0))
+    
+    # Calculate the position to paste the scaled image so it's centered.
+    paste_x = (screen_size[0] - img.width) // 2
+    paste_y = (screen_size[1] - img.height) // 2
+    
+    # Paste the scaled image onto the center of the black background.
+    background.paste(img, (paste_x, paste_y))
+    return background
+
+
+def render_wallpaper(original_path: Path, screen_size: tuple, output_path: Path,
+                     quality: str = RENDER_QUALITY, output_format: str = OUTPUT_FORMAT) -> Path:
+    # Fits an image to the screen and saves it in the chosen format.
+    # This is a plain function so that --prerender can run it in worker processes.
+    _, pillow_format, options = OUTPUT_FORMATS[output_format]
+    fit_to_screen(original_path, screen_size, quality).save(output_path, pillow_format, **options)
+    return output_path
+
+
+def render_for_displays(original_path: Path, displays: tuple, mode: str, output_path: Path,
+                        quality: str = RENDER_QUALITY, output_format: str = OUTPUT_FORMAT) -> Path:
+    # Renders one image for a set of displays. A single display gets a plain render; for
+    # several, the output covers the whole virtual desktop so the OS can span it.
+    if len(displays) == 1:
+        return render_wallpaper(original_path, (displays[0].width, displays[0].height),
+                                output_path, quality, output_format)
+    left, top, width, height = canvas_geometry(displays)
+    if mode == "span":
+        canvas = fit_to_screen(original_path, (width, height), quality)
+    else:
+        # Each display gets its own fit; displays with the same resolution share one render.
+        canvas = Image.new('RGB', (width, height), (0, 0, 0))
+        fitted = {}
+        for display in displays:
+            size = (display.width, display.height)
+            if size not in fitted:
+                fitted[size] = fit_to_screen(original_path, size, quality)
+            canvas.paste(fitted[size], (display.x - left, display.y - top))
+    _, pillow_format, options = OUTPUT_FORMATS[output_format]
+    canvas.save(output_path, pillow_format, **options)
+    return output_path
+
+
+def _prerender_job(job: tuple) -> tuple:
+    # Worker side of --prerender: renders one image and reports back instead of raising,
+    # so one broken file does not stop the whole run. The parent owns the cache index.
+    key, original_path, displays, mode, output_path, quality, output_format = job
+    try:
+        render_for_displays(original_path, displays, mode, output_path, quality, output_format)
+        return key, output_path, None
+    except Exception as e:
+        return key, original_path, str(e)
+
+
+def _render_before_presets(original_path: Path, screen_size: tuple, output_path: Path):
+    # The render as it was before the quality presets, kept as the --benchmark-decode baseline:
+    # a plain thumbnail() call with Pillow's defaults, saved as a default PNG.
+    img = Image.open(original_path)
+    img.thumbnail(screen_size, Image.LANCZOS)
+    background = Image.new('RGB', screen_size, (0, 0, 0))
+    background.paste(img, ((screen_size[0] - img.width) // 2, (screen_size[1] - img.height) // 2))
+    background.save(output_path, "PNG")
+
+
+def _benchmark_quality(image_paths: list, screen_size: tuple, quality: str) -> tuple:
+    # Renders the images with one quality preset (or "baseline", the render from before the
+    # presets) and returns (seconds, peak RSS in MB). Runs in a fresh process so each
+    # preset's peak memory is measured on its own. All of them save a default PNG.
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        for i, original_path in enumerate(image_paths):
+            output_path = Path(folder) / f"{i}.png"
+            if quality == "baseline":
+                _render_before_presets(original_path, screen_size, output_path)
+            else:
+                render_wallpaper(original_path, screen_size, output_path, quality, "png")
+        seconds = time.perf_counter() - started
+    if resource is None:
+        return seconds, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return seconds, peak / (1024 * 1024 if platform.system() == "Darwin" else 1024)
+
+
 class WallpaperCycler:
     # This class manages the entire wallpaper switching process.
     # It handles image selection, preparation, and application in a unique, phased sequence.
 
-    def __init__(self, image_folder: Path, interval: int):
+    def __init__(self, image_folder: Path, interval: int, rescan: bool = False, displays: list = None):
         # This method sets up the initial state of the cycler.
-        self.image_paths = self._scan_for_images(image_folder)
+        self.image_folder = image_folder
+        # The sequence holds plain path strings from the library index; a Path is only
+        # made for the images actually being shown.
+        self.library = LibraryIndex(image_folder, LIBRARY_INDEX)
+        self.image_paths = self._scan_for_images(rescan)
         if not self.image_paths:
             print(f"Error: No images found in '{image_folder}'. Please add images and try again.")
             sys.exit(1)
         
         # Shuffle the list once at the start for a unique sequence each time the script runs.
         random.shuffle(self.image_paths)
+        # Started by start_cycling; picks up images added to or removed from the folder.
+        self.watcher = None
 
         self.interval = interval
-        self.history_log = []
-        self.screen_width, self.screen_height = self._get_screen_resolution()
-        self.temp_dir = Path("./temp_wallpapers")
-        self.temp_dir.mkdir(exist_ok=True) # A temporary directory for resized images.
+        self.history_log = deque(maxlen=HISTORY_MAX_ENTRIES)
+        self.history_file = self._open_history_file()
+        self.status_line = ""  # the "Next change at ..." line under the live log
+        # Displays are discovered once; pass a list to run against a known (or mocked) layout.
+        self.display_mode = DISPLAY_MODE
+        self.set_displays(displays or self._detect_displays())
+        self.quality = RENDER_QUALITY
+        self.output_format = OUTPUT_FORMAT
+        # Prepared images are cached on disk, so each photo is only resized once per resolution.
+        self.cache = PreparedImageCache(CACHE_FOLDER, CACHE_MAX_MB * 1024 * 1024)
+
+        # Upcoming wallpapers are prepared on a small thread pool (Pillow releases the GIL
+        # while decoding and resizing), so a change only has to make the OS call.
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=max(1, min(4, os.cpu_count() or 1)))
+        # original path -> Future of its prepared path, only while it is being prepared;
+        # once done, the result lives in the cache.
+        self.prefetching = {}
+        self.prefetch_lock = threading.Lock()  # done-callbacks run on the pool threads
 
         # The Novel Phased Iterator Logic: two pointers that move through the list.
         # One starts at the beginning, the other starts in the middle.
@@ -58,11 +735,241 @@ class WallpaperCycler:
         if self.home_screen_pointer == self.lock_screen_pointer and len(self.image_paths) > 1:
             self.lock_screen_pointer = (self.lock_screen_pointer + 1) % len(self.image_paths)
 
-    def _scan_for_images(self, folder: Path) -> list:
-        # Scans the specified folder for supported image files (.jpg, .png, etc.).
-        print(f"Scanning for images in: {folder.resolve()}")
-        supported_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
-        return [p for p in folder.iterdir() if p.suffix.lower() in supported_extensions]
+        # The aspect policy runs the same two-pointer order over the images shaped like the
+        # screen. Everything it needs is in the library index, so a change stays O(1).
+        self.selection_policy = SELECTION_POLICY
+        self.matching_paths = None
+        self.matching_home = self.matching_lock = 0
+        self.changes = 0
+
+    def _scan_for_images(self, rescan: bool = False) -> list:
+        # Loads the library index saved by the last run, or walks the folder tree when there
+        # is none. Changes made in between are picked up by the watcher once cycling starts.
+        self.index_loaded = not rescan and self.library.load()
+        if not self.index_loaded:
+            self.library.scan()
+        else:
+            print(f"Loaded {len(self.library.images)} images from the library index.")
+        return list(self.library.images)
+
+    def _reconcile_library(self):
+        # The modes that run without the watcher compare a loaded index with the folder first,
+        # the same catch-up the watcher does (a stat walk; only new or changed files are decoded).
+        if self.index_loaded:
+            previous = self.library.signatures()
+            current = {path: (stat.st_mtime_ns, stat.st_size) for path, stat in scan_images(self.library.root)}
+            updated = [path for path, signature in current.items() if previous.get(path) != signature]
+            self._apply_changes(previous.keys() - current.keys(), {path: self.library.read(path) for path in updated})
+            self.index_loaded = False
+            if self.library.dirty:
+                self.library.save()
+        if not self.image_paths:
+            print(f"Error: No images found in '{self.image_folder}'. Please add images and try again.")
+            sys.exit(1)
+
+    def _add_image(self, image_path: str):
+        # Puts a new image into the sequence (and the aspect-matched one, if it fits).
+        self.home_screen_pointer, self.lock_screen_pointer = self._insert_into(
+            self.image_paths, self.home_screen_pointer, self.lock_screen_pointer, image_path)
+        self._sync_matching(image_path)
+
+    def _remove_image(self, image_path: str):
+        self._remove_images({image_path})
+
+    def _remove_images(self, image_paths: set):
+        # Takes images out of the library and every sequence they are in, one pass per sequence
+        # however many there are.
+        for image_path in image_paths:
+            self.library.remove(image_path)
+        with self.prefetch_lock:
+            for image_path in image_paths:
+                self.prefetching.pop(Path(image_path), None)
+        self.home_screen_pointer, self.lock_screen_pointer = self._delete_from(
+            self.image_paths, self.home_screen_pointer, self.lock_screen_pointer, image_paths)
+        if self.matching_paths is not None:
+            self.matching_home, self.matching_lock = self._delete_from(
+                self.matching_paths, self.matching_home, self.matching_lock, image_paths)
+
+    def _insert_into(self, sequence: list, home: int, lock: int, image_path: str) -> tuple[int, int]:
+        # Inserts an image at a random place in a sequence. Pointers at or after that
+        # place move up by one, so they keep pointing at the same images.
+        index = random.randint(0, len(sequence))
+        sequence.insert(index, image_path)
+        if home >= index:
+            home += 1
+        if lock >= index:
+            lock += 1
+        return self._normalized(len(sequence), home, lock)
+
+    def _delete_from(self, sequence: list, home: int, lock: int, image_paths: set) -> tuple[int, int]:
+        # Takes images out of a sequence. Pointers move down past the removed images; a
+        # pointer on one now points at the first image that followed it.
+        kept = []
+        for index, path in enumerate(sequence):
+            if index == home:
+                home = len(kept)
+            if index == lock:
+                lock = len(kept)
+            if path not in image_paths:
+                kept.append(path)
+        sequence[:] = kept
+        return self._normalized(len(sequence), home, lock)
+
+    def _normalized(self, count: int, home: int, lock: int) -> tuple[int, int]:
+        # Keeps both pointers inside the list and, with two or more images, apart.
+        if count == 0:
+            return 0, 0
+        home %= count
+        lock %= count
+        if home == lock and count > 1:
+            lock = (lock + 1) % count
+        return home, lock
+
+    def _matching(self) -> list:
+        # The images shaped like the screen, in sequence order, built from the library
+        # index the first time the aspect policy needs them.
+        if self.matching_paths is None:
+            screen_size = self._target_size()
+            self.matching_paths = [path for path in self.image_paths
+                                   if self.library.matches_screen(path, screen_size)]
+            self.matching_home, self.matching_lock = self._normalized(
+                len(self.matching_paths), 0, len(self.matching_paths) // 2)
+        return self.matching_paths
+
+    def _sync_matching(self, image_path: str):
+        # Keeps the aspect-matched sequence in step after an image was added, changed or removed.
+        if self.matching_paths is None:
+            return
+        inside = image_path in self.matching_paths
+        fits = (image_path in self.library.images
+                and self.library.matches_screen(image_path, self._target_size()))
+        if inside and not fits:
+            self.matching_home, self.matching_lock = self._delete_from(
+                self.matching_paths, self.matching_home, self.matching_lock, {image_path})
+        elif fits and not inside:
+            self.matching_home, self.matching_lock = self._insert_into(
+                self.matching_paths, self.matching_home, self.matching_lock, image_path)
+
+    def _from_matching(self, change: int) -> bool:
+        # Whether a change comes from the aspect-matched images rather than the whole library.
+        return (self.selection_policy == "aspect" and len(self._matching()) >= 2
+                and change % ASPECT_OTHER_EVERY != ASPECT_OTHER_EVERY - 1)
+
+    async def _apply_folder_changes(self):
+        # Applies what the watcher saw since the last cycle, without rescanning the folder.
+        # New and rewritten files are decoded on worker threads so the scheduler keeps its time.
+        if self.watcher is None:
+            return
+        latest = {}  # path -> last event seen for it
+        while True:
+            try:
+                kind, image_path = self.watcher.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "removed_folder":
+                prefix = image_path + os.sep
+                for removed_path in [p for p in self.image_paths if p.startswith(prefix)]:
+                    latest[removed_path] = "removed"
+                for pending_path in [p for p in latest if p.startswith(prefix)]:
+                    latest[pending_path] = "removed"
+            elif kind == "rescan":
+                # The watcher lost events; image_path is a snapshot of the whole folder.
+                previous = self.library.signatures()
+                for path, signature in image_path.items():
+                    if previous.get(path) != signature:
+                        latest[path] = "updated"
+                    else:
+                        latest.pop(path, None)
+                latest.update((path, "removed") for path in previous.keys() - image_path.keys())
+            elif kind == "warning":
+                self._print_above_status(f"Warning: {image_path}")
+                self.history_file.warning(image_path)
+            else:
+                latest[image_path] = kind
+        if not latest:
+            return
+        updated = [path for path, kind in latest.items() if kind == "updated"]
+        loop = asyncio.get_running_loop()
+        found = await asyncio.gather(*(loop.run_in_executor(None, self.library.read, path) for path in updated))
+        self._apply_changes({path for path, kind in latest.items() if kind == "removed"}, dict(zip(updated, found)))
+        self.library.save_if_due()
+
+    def _apply_changes(self, removed: set, found: dict):
+        # removed: images gone from the folder; found: LibraryIndex.read() of each new or
+        # rewritten file. Whatever was prepared from a changed file is stale, so all of it is
+        # dropped with one cache index write; the gone images leave the sequences in one pass.
+        stale = {path for path in removed if path in self.library.images}
+        gone = set(stale)
+        for path, result in found.items():
+            known = path in self.library.images
+            if known:
+                stale.add(path)
+            if self.library.put(path, result):
+                if known:
+                    self._sync_matching(path)
+                else:
+                    self._add_image(path)
+            elif known:
+                gone.add(path)
+        if stale:
+            with self.prefetch_lock:
+                for path in stale:
+                    self.prefetching.pop(Path(path), None)
+            self.cache.invalidate(map(Path, stale))
+        if gone:
+            self._remove_images(gone)
+
+    def _detect_displays(self) -> list:
+        # Asks xrandr for the display layout; elsewhere, or if that fails, falls back to the
+        # primary screen size.
+        if platform.system() == "Linux":
+            try:
+                result = subprocess.run(["xrandr", "--query"], capture_output=True, text=True,
+                                        timeout=5, check=True)
+                displays = parse_xrandr(result.stdout)
+                if displays:
+                    return displays
+            except (OSError, subprocess.SubprocessError):
+                pass
+        width, height = self._get_screen_resolution()
+        return [Display("default", width, height, 0, 0, True)]
+
+    def set_displays(self, displays: list):
+        # Switches to a display layout. The primary display's size is the "screen" size.
+        self.displays = list(displays)
+        primary = next((display for display in self.displays if display.primary), self.displays[0])
+        self.screen_width, self.screen_height = primary.width, primary.height
+        # The aspect-matched images depend on the target shape.
+        self.matching_paths = None
+
+    def _target_displays(self) -> tuple:
+        # The displays a prepared image is rendered for.
+        if self.display_mode == "primary" or len(self.displays) == 1:
+            return (Display("primary", self.screen_width, self.screen_height, 0, 0, True),)
+        return tuple(self.displays)
+
+    def _target_size(self) -> tuple:
+        # The shape images should match: the whole desktop when spanning, else the primary display.
+        if self.display_mode == "span" and len(self.displays) > 1:
+            return canvas_geometry(self.displays)[2:]
+        return self.screen_width, self.screen_height
+
+    def _target_description(self) -> str:
+        targets = self._target_displays()
+        if len(targets) == 1:
+            return f"{targets[0].width}x{targets[0].height}"
+        width, height = canvas_geometry(targets)[2:]
+        return f"{len(targets)} displays ({self.display_mode}, {width}x{height})"
+
+    def _cache_key(self, original_path: Path) -> str:
+        # One cache entry per image and render target. A single display keeps the plain
+        # per-resolution key; multi-display renders also record the mode and layout.
+        targets = self._target_displays()
+        if len(targets) == 1:
+            return self.cache.key_for(original_path, (targets[0].width, targets[0].height), self._render_variant())
+        layout = ",".join(f"{d.width}x{d.height}+{d.x}+{d.y}" for d in targets)
+        return self.cache.key_for(original_path, canvas_geometry(targets)[2:],
+                                  f"{self._render_variant()}|{self.display_mode}|{layout}")
 
     def _get_screen_resolution(self):
         # Gets the primary screen resolution in a cross-platform way.
@@ -78,34 +985,233 @@ class WallpaperCycler:
             print("Warning: Could not detect screen resolution. Using fallback 1920x1080.")
             return 1920, 1080
 
+    def _render_variant(self) -> str:
+        # The settings that change a prepared file, for the cache key.
+        return f"{self.quality}|{self.output_format}"
+
+    def _output_path(self, key: str) -> Path:
+        return self.cache.path_for(key, OUTPUT_FORMATS[self.output_format][0])
+
     def _prepare_image(self, original_path: Path) -> Path:
         # Resizes an image to fit the screen without distortion by adding black bars.
-        screen_size = (self.screen_width, self.screen_height)
-        img = Image.open(original_path)
-        
-        # This preserves the aspect ratio while scaling down.
-        img.thumbnail(screen_size, Image.LANCZOS)
-        
-        # Create a new black background with the exact screen resolution.
-        background = Image.new('RGB', screen_size, (0, 0, 0))
-        
-        # Calculate the position to paste the scaled image so it's centered.
-        paste_x = (screen_size[0] - img.width) // 2
-        paste_y = (screen_size[1] - img.height) // 2
-        
-        # Paste the scaled image onto the center of the black background.
-        background.paste(img, (paste_x, paste_y))
-        
-        # Save this prepared image to our temporary directory.
-        prepared_path = self.temp_dir / f"prepared_{original_path.name}"
-        background.save(prepared_path, "PNG")
+        # An image prepared on an earlier loop (or an earlier run) is used as is.
+        key = self._cache_key(original_path)
+        cached_path = self.cache.get(key)
+        if cached_path is not None:
+            return cached_path
+
+        # Save this prepared image into the cache.
+        prepared_path = render_for_displays(original_path, self._target_displays(), self.display_mode,
+                                            self._output_path(key), self.quality, self.output_format)
+        self.cache.add(key, prepared_path, original_path)
         
         return prepared_path
 
-    def _set_wallpaper(self, image_path: Path, screen_type: str):
+    def prerender(self, workers: int = None):
+        # Prepares every image in the library ahead of time on all cores, skipping the ones
+        # already cached for this resolution. Workers only render files; this process
+        # records them in the cache index, which is written once at the end.
+        self._reconcile_library()
+        targets = self._target_displays()
+        workers = workers or os.cpu_count() or 1
+        jobs = []
+        for original_path in map(Path, list(self.image_paths)):
+            try:
+                key = self._cache_key(original_path)
+            except OSError:
+                # Removed since the folder was compared with the index.
+                self._remove_image(str(original_path))
+                continue
+            if self.cache.get(key) is None:
+                jobs.append((key, original_path, targets, self.display_mode, self._output_path(key),
+                             self.quality, self.output_format))
+
+        skipped = len(self.image_paths) - len(jobs)
+        print(f"Pre-rendering {len(jobs)} images for {self._target_description()} "
+              f"with {workers} workers ({skipped} already cached).")
+        if not jobs:
+            return
+
+        sources = {job[0]: job[1] for job in jobs}
+        done, failed = 0, []
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, min(16, len(jobs) // (workers * 4)))
+            for key, path, error in pool.map(_prerender_job, jobs, chunksize=chunksize):
+                done += 1
+                if error is None:
+                    self.cache.add(key, path, sources[key], save=False)
+                else:
+                    failed.append((path, error))
+                elapsed = time.perf_counter() - started
+                print(f"\r  {done}/{len(jobs)} images, {done / elapsed:.1f} images/sec", end="", flush=True)
+        self.cache.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"\nDone in {elapsed:.1f}s ({len(jobs) / elapsed:.1f} images/sec), "
+              f"{len(self.cache.entries)} images cached, {self.cache.total_bytes / 1024 / 1024:.0f} MB.")
+        if len(self.cache.entries) < len(self.image_paths):
+            print(f"Warning: CACHE_MAX_MB ({CACHE_MAX_MB}) is too small to keep the whole library.")
+        for path, error in failed:
+            print(f"  Failed: {path}: {error}")
+
+    def benchmark_decode(self, sample: int = 10):
+        # Compares the quality presets with the render from before them ("baseline") on a
+        # sample of the library, for time and peak memory.
+        self._reconcile_library()
+        image_paths = [Path(path) for path in self.image_paths[:sample]]
+        screen_size = (self.screen_width, self.screen_height)
+        print(f"Rendering {len(image_paths)} images at {screen_size[0]}x{screen_size[1]} with each quality setting.")
+        print(f"{'Quality':<10} {'Total (s)':>10} {'Per image (ms)':>15} {'Peak RSS (MB)':>14}")
+        for quality in ["baseline", *QUALITY_PRESETS]:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                seconds, peak_mb = pool.submit(_benchmark_quality, image_paths, screen_size, quality).result()
+            peak = f"{peak_mb:.0f}" if peak_mb is not None else "n/a"
+            print(f"{quality:<10} {seconds:>10.2f} {seconds * 1000 / len(image_paths):>15.1f} {peak:>14}")
+
+    def benchmark_output(self, sample: int = 3, apply: bool = False):
+        # Times each output format: encoding a prepared image, its file size, and (only when
+        # apply is True) how long the OS takes to set it as the wallpaper.
+        self._reconcile_library()
+        screen_size = (self.screen_width, self.screen_height)
+        images = [fit_to_screen(path, screen_size, self.quality) for path in map(Path, self.image_paths[:sample])]
+        print(f"Encoding {len(images)} images at {screen_size[0]}x{screen_size[1]} in each output format.")
+        print(f"{'Format':<10} {'Encode (ms)':>12} {'Size (KB)':>10} {'Apply (ms)':>11} {'Total (ms)':>11}")
+        results = {}
+        with tempfile.TemporaryDirectory() as folder:
+            for output_format, (suffix, pillow_format, options) in OUTPUT_FORMATS.items():
+                encode = apply_time = size = 0
+                applied = apply
+                for i, image in enumerate(images):
+                    path = Path(folder) / f"{output_format}-{i}{suffix}"
+                    started = time.perf_counter()
+                    image.save(path, pillow_format, **options)
+                    encode += time.perf_counter() - started
+                    size += path.stat().st_size
+                    if applied:
+                        started = time.perf_counter()
+                        applied = self._apply_wallpaper(path, "Home Screen")
+                        apply_time += time.perf_counter() - started
+                if apply and not applied:
+                    # The OS call does not work here; compare the encoders alone from now on.
+                    apply = False
+                encode_ms = encode * 1000 / len(images)
+                apply_ms = apply_time * 1000 / len(images) if applied else None
+                results[output_format] = (encode_ms, apply_ms)
+                apply_text = f"{apply_ms:.1f}" if apply_ms is not None else "n/a"
+                print(f"{output_format:<10} {encode_ms:>12.1f} {size / 1024 / len(images):>10.0f} "
+                      f"{apply_text:>11} {encode_ms + (apply_ms or 0):>11.1f}")
+        if apply:
+            # The timed files were temporary; leave the desktop on a prepared image that stays
+            # in the cache rather than on a file that no longer exists.
+            self._apply_wallpaper(self._prepare_image(Path(self.image_paths[0])), "Home Screen")
+        # Apply times only count if every format could be applied.
+        with_apply = all(apply_ms is not None for _, apply_ms in results.values())
+        fastest = min(results, key=lambda name: results[name][0] + (results[name][1] if with_apply else 0))
+        print(f"Fastest on this machine: {fastest} (set OUTPUT_FORMAT = \"{fastest}\" or pass --format {fastest}).")
+        return fastest
+
+    def _prefetch_upcoming(self, pairs: int):
+        # Starts preparing the images of the next few pairs, in the order they will be shown,
+        # unless they are already being prepared or still in the cache.
+        for pair in self._upcoming_pairs(pairs):
+            for image_path in pair:
+                with self.prefetch_lock:
+                    if image_path in self.prefetching:
+                        continue
+                if self._cached_path(image_path) is None:
+                    self._submit_prepare(image_path)
+
+    def _cached_path(self, image_path: Path):
+        # The prepared file if it is in the cache now (the LRU may have evicted it since).
+        try:
+            return self.cache.get(self._cache_key(image_path))
+        except OSError:
+            # Gone or unreadable; preparing it reports the error when it is shown.
+            return None
+
+    def _submit_prepare(self, image_path: Path):
+        future = self.prefetch_pool.submit(self._prepare_image, image_path)
+        with self.prefetch_lock:
+            self.prefetching[image_path] = future
+        # Runs straight away if the preparation has already finished.
+        future.add_done_callback(lambda done: self._prefetch_done(image_path, done))
+        return future
+
+    def _prefetch_done(self, image_path: Path, future):
+        with self.prefetch_lock:
+            if self.prefetching.get(image_path) is future:
+                del self.prefetching[image_path]
+
+    def _prepared_future(self, image_path: Path):
+        # The preparation in progress when there is one, the cached file when it was
+        # prefetched, and otherwise a new preparation on the pool.
+        with self.prefetch_lock:
+            future = self.prefetching.get(image_path)
+        if future is not None:
+            return future
+        cached_path = self._cached_path(image_path)
+        if cached_path is not None:
+            future = Future()
+            future.set_result(cached_path)
+            return future
+        return self._submit_prepare(image_path)
+
+    async def _set_wallpaper(self, image_path: Path, screen_type: str) -> bool:
+        # Waits for the prepared image without blocking the event loop, then hands it to the OS.
+        try:
+            prepared_image_path = await asyncio.wrap_future(self._prepared_future(image_path))
+        except Exception as e:
+            # The file was deleted, corrupt or too large to decode. Skip it this time; a
+            # deleted one leaves the sequence. Either way the scheduler keeps running.
+            message = f"Error: Could not prepare '{image_path.name}'. Details: {type(e).__name__}: {e}"
+            self._print_above_status(message)
+            self.history_file.warning(message)
+            if not image_path.exists() and str(image_path) in self.library.images:
+                self._remove_image(str(image_path))
+            return False
+        return await self._apply_wallpaper_async(prepared_image_path, screen_type)
+
+    def _configure_spanning(self):
+        # A multi-display render covers the whole desktop, so the OS has to span it across
+        # the displays rather than zoom it onto each one.
+        if len(self._target_displays()) == 1:
+            return
+        if platform.system() == "Windows":
+            # WallpaperStyle 22 is "Span"; it takes effect with the next SystemParametersInfoW call.
+            try:
+                import winreg
+                with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Control Panel\Desktop", 0, winreg.KEY_SET_VALUE) as key:
+                    winreg.SetValueEx(key, "WallpaperStyle", 0, winreg.REG_SZ, "22")
+                    winreg.SetValueEx(key, "TileWallpaper", 0, winreg.REG_SZ, "0")
+            except OSError as e:
+                print(f"Warning: Could not set the wallpaper to span displays. Details: {e}")
+            return
+        if platform.system() != "Linux":
+            return
+        for schema in ("org.gnome.desktop.background", "org.gnome.desktop.screensaver"):
+            try:
+                subprocess.run(["gsettings", "set", schema, "picture-options", "spanned"], check=True)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Warning: Could not set {schema} to span displays. Details: {e}")
+
+    def _apply_command(self, abs_path: str, screen_type: str):
+        # The command that sets the wallpaper on macOS and Linux (None elsewhere).
+        system = platform.system()
+        if system == "Darwin": # macOS
+            # For macOS, an AppleScript command sets the desktop picture.
+            script = f'tell application "System Events" to set picture of every desktop to "{abs_path}"'
+            return ["osascript", "-e", script]
+        if system == "Linux":
+            # For Linux (GNOME/Cinnamon), we use gsettings.
+            if screen_type == "Lock Screen":
+                return ["gsettings", "set", "org.gnome.desktop.screensaver", "picture-uri", f"file://{abs_path}"]
+            return ["gsettings", "set", "org.gnome.desktop.background", "picture-uri", f"file://{abs_path}"]
+        return None
+
+    def _apply_wallpaper(self, prepared_image_path: Path, screen_type: str):
         # Sets the wallpaper using OS-specific commands.
         system = platform.system()
-        prepared_image_path = self._prepare_image(image_path)
         abs_path = str(prepared_image_path.resolve())
 
         try:
@@ -114,83 +1220,185 @@ class WallpaperCycler:
                 # NOTE: Programmatically changing the Windows LOCK SCREEN is very complex.
                 # For simplicity, this script will only change the DESKTOP wallpaper.
                 ctypes.windll.user32.SystemParametersInfoW(20, 0, abs_path, 3)
-            
-            elif system == "Darwin": # macOS
-                # For macOS, an AppleScript command sets the desktop picture.
-                script = f'tell application "System Events" to set picture of every desktop to "{abs_path}"'
-                subprocess.run(["osascript", "-e", script], check=True)
-
-            elif system == "Linux":
-                # For Linux (GNOME/Cinnamon), we use gsettings.
-                if screen_type == "Lock Screen":
-                    subprocess.run(["gsettings", "set", "org.gnome.desktop.screensaver", "picture-uri", f"file://{abs_path}"], check=True)
-                else: # Home Screen
-                    subprocess.run(["gsettings", "set", "org.gnome.desktop.background", "picture-uri", f"file://{abs_path}"], check=True)
+            else:
+                command = self._apply_command(abs_path, screen_type)
+                if command is not None:
+                    subprocess.run(command, check=True)
             return True
         except Exception as e:
             print(f"\nError: Failed to set wallpaper on {system}. Details: {e}")
             return False
 
-    def _select_next_wallpaper_pair(self) -> tuple[Path, Path]:
-        # This is the core logic: gets the next pair of wallpapers and advances the pointers.
-        home_wallpaper = self.image_paths[self.home_screen_pointer]
-        lock_wallpaper = self.image_paths[self.lock_screen_pointer]
-        
+    async def _apply_wallpaper_async(self, prepared_image_path: Path, screen_type: str) -> bool:
+        # The same as _apply_wallpaper, but the command runs as an asyncio subprocess so the
+        # home and lock screen commands can run at the same time.
+        command = self._apply_command(str(prepared_image_path.resolve()), screen_type)
+        if command is None:
+            return await asyncio.to_thread(self._apply_wallpaper, prepared_image_path, screen_type)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+            _, errors = await process.communicate()
+        except OSError as e:
+            self._print_above_status(f"Error: Failed to set wallpaper on {platform.system()}. Details: {e}")
+            return False
+        if process.returncode != 0:
+            details = errors.decode(errors="replace").strip() or f"exit status {process.returncode}"
+            self._print_above_status(f"Error: Failed to set wallpaper on {platform.system()}. Details: {details}")
+            return False
+        return True
+
+    def _advance_pointers(self, home: int, lock: int, count: int = None) -> tuple[int, int]:
         # Advance the pointers for the next cycle, wrapping around if needed.
-        self.home_screen_pointer = (self.home_screen_pointer + 1) % len(self.image_paths)
-        self.lock_screen_pointer = (self.lock_screen_pointer + 1) % len(self.image_paths)
+        count = count or len(self.image_paths)
+        home = (home + 1) % count
+        lock = (lock + 1) % count
         
         # If the pointers happen to land on the same spot, push one forward again.
-        if self.home_screen_pointer == self.lock_screen_pointer:
-            self.lock_screen_pointer = (self.lock_screen_pointer + 1) % len(self.image_paths)
+        if home == lock:
+            lock = (lock + 1) % count
+        return home, lock
+
+    def _select_next_wallpaper_pair(self) -> tuple[Path, Path]:
+        # This is the core logic: gets the next pair of wallpapers and advances the pointers.
+        if self._from_matching(self.changes):
+            home_wallpaper = Path(self.matching_paths[self.matching_home])
+            lock_wallpaper = Path(self.matching_paths[self.matching_lock])
+            self.matching_home, self.matching_lock = self._advance_pointers(
+                self.matching_home, self.matching_lock, len(self.matching_paths))
+        else:
+            home_wallpaper = Path(self.image_paths[self.home_screen_pointer])
+            lock_wallpaper = Path(self.image_paths[self.lock_screen_pointer])
+            
+            self.home_screen_pointer, self.lock_screen_pointer = self._advance_pointers(self.home_screen_pointer, self.lock_screen_pointer)
+        self.changes += 1
             
         return home_wallpaper, lock_wallpaper
+
+    def _upcoming_pairs(self, count: int) -> list:
+        # The pairs _select_next_wallpaper_pair will return next, without moving the pointers.
+        if self.selection_policy == "aspect":
+            self._matching()
+        home, lock = self.home_screen_pointer, self.lock_screen_pointer
+        matching_home, matching_lock = self.matching_home, self.matching_lock
+        pairs = []
+        if not self.image_paths:
+            return pairs
+        for change in range(self.changes, self.changes + count):
+            if self._from_matching(change):
+                pairs.append((Path(self.matching_paths[matching_home]), Path(self.matching_paths[matching_lock])))
+                matching_home, matching_lock = self._advance_pointers(
+                    matching_home, matching_lock, len(self.matching_paths))
+            else:
+                pairs.append((Path(self.image_paths[home]), Path(self.image_paths[lock])))
+                home, lock = self._advance_pointers(home, lock)
+        return pairs
         
+    def _open_history_file(self):
+        # Every change is also written to a rotating file, one tab-separated line each.
+        logger = logging.getLogger("wallpaper_history")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            try:
+                handler = logging.handlers.RotatingFileHandler(
+                    HISTORY_FILE, maxBytes=HISTORY_FILE_MAX_BYTES, backupCount=HISTORY_FILE_BACKUPS,
+                    encoding="utf-8")
+            except OSError as e:
+                print(f"Warning: Could not open the history file '{HISTORY_FILE}'. Details: {e}")
+                return logger
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        return logger
+
     def _log_activity(self, screen_type: str, filename: str, start_time: datetime, end_time: datetime):
-        # Adds a record of the wallpaper change to our history.
-        self.history_log.append({
+        # Adds a record of the wallpaper change to our history and returns it.
+        entry = {
             "Screen": screen_type,
             "File": filename,
             "Start Time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
             "End Time": end_time.strftime("%Y-%m-%d %H:%M:%S")
-        })
+        }
+        self.history_log.append(entry)
+        self.history_file.info("\t".join(entry.values()))
+        return entry
+
+    def _log_row(self, values: list) -> str:
+        # One line of the live log. The columns have fixed widths, so a new row can be
+        # printed on its own without measuring the whole history.
+        screen, filename, start, end = values
+        if len(filename) > LOG_FILE_WIDTH:
+            filename = filename[:LOG_FILE_WIDTH - 3] + "..."
+        return f"{screen:<12} | {filename:<{LOG_FILE_WIDTH}} | {start:<20} | {end:<20}"
 
-    def _display_log_table(self):
-        # Clears the console and prints the history log in a neat table.
+    def _display_log_header(self):
+        # Clears the console once and prints the title and column headers of the live log.
         os.system('cls' if os.name == 'nt' else 'clear')
         
-        print("=" * 85)
-        print(" " * 27 + "WALLPAPER_SWITCHING.PY - Live Log")
-        print("=" * 85)
-        
-        headers = ["Screen", "Wallpaper File", "Display Start Time", "Display End Time"]
-        
-        # Calculate column widths dynamically for a clean look.
-        col_widths = {
-            "Screen": 12,
-            "File": max([len(h["File"]) for h in self.history_log] + [len(headers[1])]),
-            "Start Time": 20,
-            "End Time": 20
-        }
-
-        # Print table header.
-        header_line = (f"{headers[0]:<{col_widths['Screen']}} | "
-                       f"{headers[1]:<{col_widths['File']}} | "
-                       f"{headers[2]:<{col_widths['Start Time']}} | "
-                       f"{headers[3]:<{col_widths['End Time']}}")
+        header_line = self._log_row(["Screen", "Wallpaper File", "Display Start Time", "Display End Time"])
+        print("=" * len(header_line))
+        print(" " * ((len(header_line) - 33) // 2) + "WALLPAPER_SWITCHING.PY - Live Log")
+        print("=" * len(header_line))
         print(header_line)
         print("-" * len(header_line))
-        
-        # Print log entries.
+        # The recent history, e.g. after the list was cleared by a terminal resize.
         for entry in self.history_log:
-            row_line = (f"{entry['Screen']:<{col_widths['Screen']}} | "
-                        f"{entry['File']:<{col_widths['File']}} | "
-                        f"{entry['Start Time']:<{col_widths['Start Time']}} | "
-                        f"{entry['End Time']:<{col_widths['End Time']}}")
-            print(row_line)
-            
-        print("\n" + "=" * 85)
-        print(f"Next change in {self.interval} seconds... (Press Ctrl+C to exit)")
+            print(self._log_row(list(entry.values())))
+        self.status_line = ""
+
+    def _print_above_status(self, text: str):
+        # Prints a line of the log, keeping the status line underneath it.
+        print("\r" + " " * len(self.status_line) + "\r" + text)
+        print(self.status_line, end="", flush=True)
+
+    def _display_log_entries(self, entries: list, next_change: datetime):
+        # Appends only the new rows to the live log, then updates the status line.
+        print("\r" + " " * len(self.status_line) + "\r", end="")
+        for entry in entries:
+            print(self._log_row(list(entry.values())))
+        self.status_line = f"Next change at {next_change:%H:%M:%S}... (Press Ctrl+C to exit)"
+        print(self.status_line, end="", flush=True)
+
+    async def _cycle(self):
+        # The scheduler. Changes are due at fixed times (start + n * interval), so the
+        # time spent preparing and applying images never pushes later changes back.
+        loop = asyncio.get_running_loop()
+        next_due = loop.time()
+        while True:
+            # Pick up images added to or removed from the folder since the last change.
+            await self._apply_folder_changes()
+            if self.image_paths:
+                start_time = datetime.now()
+                end_time = start_time + timedelta(seconds=self.interval)
+                
+                # Get the next pair of unique wallpapers.
+                home_img, lock_img = self._select_next_wallpaper_pair()
+                
+                # Set the Home and Lock Screen wallpapers. On Linux they are separate settings,
+                # so both commands run at once; elsewhere the lock screen call comes last.
+                if platform.system() == "Linux":
+                    await asyncio.gather(self._set_wallpaper(home_img, "Home Screen"),
+                                         self._set_wallpaper(lock_img, "Lock Screen"))
+                else:
+                    await self._set_wallpaper(home_img, "Home Screen")
+                    await self._set_wallpaper(lock_img, "Lock Screen")
+                entries = [self._log_activity("Home Screen", home_img.name, start_time, end_time),
+                           self._log_activity("Lock Screen", lock_img.name, start_time, end_time)]
+                
+                # Prepare the next pairs in the background while this one is displayed.
+                self._prefetch_upcoming(PREFETCH_PAIRS)
+            else:
+                entries = []
+                self._print_above_status("No images left in the folder. Waiting for new ones...")
+
+            # Wait for the next due time. If the machine was asleep or a change overran,
+            # skip the missed slots instead of catching up with a burst of changes.
+            next_due += self.interval
+            now = loop.time()
+            if next_due <= now:
+                next_due += math.ceil((now - next_due) / self.interval) * self.interval
+            self._display_log_entries(entries, datetime.now() + timedelta(seconds=next_due - now))
+            await asyncio.sleep(next_due - now)
 
     def start_cycling(self):
         # The main execution loop that runs continuously.
@@ -211,37 +1419,31 @@ class WallpaperCycler:
 """)
         print(f"--- Starting WALLPAPER_SWITCHING.PY ---")
         print(f"Found {len(self.image_paths)} images. Screen resolution: {self.screen_width}x{self.screen_height}.")
+        if len(self.displays) > 1:
+            layout = ", ".join(f"{d.name} {d.width}x{d.height}+{d.x}+{d.y}" for d in self.displays)
+            print(f"Displays: {layout}. Rendering for {self._target_description()}.")
+            self._configure_spanning()
+        self.watcher = FolderWatcher(self.image_folder, self.library.signatures())
+        self.watcher.start()
+        print(f"Watching {self.image_folder} for changes ({self.watcher.mode}).")
+        if self.selection_policy == "aspect":
+            print(f"Preferring the {len(self._matching())} images shaped like the screen.")
+        # Prepare the first pairs while the banner is on screen.
+        self._prefetch_upcoming(PREFETCH_PAIRS + 1)
         time.sleep(2)
+        self._display_log_header()
 
         try:
-            while True:
-                start_time = datetime.now()
-                end_time = start_time + timedelta(seconds=self.interval)
-                
-                # Get the next pair of unique wallpapers.
-                home_img, lock_img = self._select_next_wallpaper_pair()
-                
-                # Set Home Screen Wallpaper.
-                self._set_wallpaper(home_img, "Home Screen")
-                self._log_activity("Home Screen", home_img.name, start_time, end_time)
-                
-                # Set Lock Screen Wallpaper.
-                self._set_wallpaper(lock_img, "Lock Screen")
-                self._log_activity("Lock Screen", lock_img.name, start_time, end_time)
-                
-                # Update the display with the new log entries.
-                self._display_log_table()
-                
-                # Wait for the specified interval.
-                time.sleep(self.interval)
+            asyncio.run(self._cycle())
 
         except KeyboardInterrupt:
-            print("\n\nScript stopped by user. Cleaning up temporary files...")
-            # Clean up the temporary directory on exit.
-            for temp_file in self.temp_dir.iterdir():
-                temp_file.unlink()
-            self.temp_dir.rmdir()
-            print("Cleanup complete. Goodbye!")
+            print("\n\nScript stopped by user. Saving the image cache...")
+            self.watcher.stop()
+            self.library.save()
+            self.prefetch_pool.shutdown(wait=True, cancel_futures=True)
+            # Prepared images are kept for the next run; only the cache index needs saving.
+            self.cache.close()
+            print(f"Cache saved ({len(self.cache.entries)} images). Goodbye!")
             sys.exit(0)
         except Exception as e:
             print(f"\nAn unexpected error occurred: {e}")
@@ -249,9 +1451,67 @@ class WallpaperCycler:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cycle desktop and lock screen wallpapers.")
+    parser.add_argument("--prerender", action="store_true",
+                        help="prepare every image in the library ahead of time, then exit")
+    parser.add_argument("--workers", type=int, help="worker processes for --prerender (default: all cores)")
+    parser.add_argument("--rescan", action="store_true",
+                        help="rebuild the library index instead of loading it (use before --prerender "
+                             "if images were added while the script was not running)")
+    parser.add_argument("--policy", choices=["phased", "aspect"], default=SELECTION_POLICY,
+                        help="phased: whole library in order; aspect: prefer images shaped like the screen")
+    parser.add_argument("--resolution", type=parse_resolution,
+                        help="render for WIDTHxHEIGHT instead of the detected screen")
+    parser.add_argument("--displays", metavar="LAYOUT",
+                        help="use this display layout instead of detecting it, e.g. 1920x1080+0+0,2560x1440+1920+0")
+    parser.add_argument("--display-mode", choices=["primary", "per-display", "span"], default=DISPLAY_MODE,
+                        help="with several displays: render for the primary one, fit each one, or span them all "
+                             "(per-display and span need Linux/GNOME or Windows)")
+    parser.add_argument("--quality", choices=list(QUALITY_PRESETS), default=RENDER_QUALITY,
+                        help="resize quality/speed trade-off")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default=OUTPUT_FORMAT,
+                        help="file format for prepared images")
+    parser.add_argument("--benchmark-output", type=int, nargs="?", const=3, metavar="SAMPLE",
+                        help="time encoding and applying each output format on SAMPLE images (default 3), then exit")
+    parser.add_argument("--apply", action="store_true",
+                        help="with --benchmark-output, also time setting each file as the wallpaper "
+                             "(changes your desktop wallpaper)")
+    parser.add_argument("--benchmark-decode", type=int, nargs="?", const=10, metavar="SAMPLE",
+                        help="time each quality setting on SAMPLE images (default 10), then exit")
+    args = parser.parse_args()
+
+    for option, sample in (("--benchmark-output", args.benchmark_output), ("--benchmark-decode", args.benchmark_decode)):
+        if sample is not None and sample < 1:
+            parser.error(f"{option} needs a sample of at least 1 image")
+    if args.display_mode != "primary" and platform.system() not in SPANNING_SYSTEMS:
+        parser.error(f"--display-mode {args.display_mode} is not supported on {platform.system()}; use primary")
+
+    displays = None
+    if args.resolution:
+        width, height = args.resolution
+        displays = [Display("override", width, height, 0, 0, True)]
+    elif args.displays:
+        try:
+            displays = parse_display_list(args.displays)
+        except ValueError as e:
+            parser.error(str(e))
+
     # Create an instance of our cycler and start the process.
     cycler = WallpaperCycler(
         image_folder=WALLPAPER_FOLDER,
-        interval=CHANGE_INTERVAL_SECONDS
+        interval=CHANGE_INTERVAL_SECONDS,
+        rescan=args.rescan,
+        displays=displays
     )
-    cycler.start_cycling()
\ No newline at end of file
+    cycler.display_mode = args.display_mode
+    cycler.quality = args.quality
+    cycler.selection_policy = args.policy
+    cycler.output_format = args.format
+    if args.benchmark_output is not None:
+        cycler.benchmark_output(args.benchmark_output, apply=args.apply)
+    elif args.benchmark_decode is not None:
+        cycler.benchmark_decode(args.benchmark_decode)
+    elif args.prerender:
+        cycler.prerender(args.workers)
+    else:
+        cycler.start_cycling()
\ No newline at end of file